@@ -0,0 +1,102 @@
+import itertools
+
+
+class AsyncMongomockCursor:
+    """Awaitable facade of a mongomock cursor, with the AsyncCursor methods the app uses"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def skip(self, skip):
+        self._cursor = self._cursor.skip(skip)
+        return self
+
+    def limit(self, limit):
+        self._cursor = self._cursor.limit(limit)
+        return self
+
+    def batch_size(self, batch_size):
+        return self
+
+    async def to_list(self, length=None):
+        return list(itertools.islice(self._cursor, length) if length else self._cursor)
+
+    async def close(self):
+        pass
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self._cursor:
+            yield document
+
+
+class AsyncMongomockCollection:
+    """
+    Awaitable facade of a mongomock collection.
+
+    find() returns a cursor synchronously and aggregate() must be awaited, as
+    with AsyncCollection; every other method becomes a coroutine function.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs):
+        return AsyncMongomockCursor(self._collection.find(*args, **kwargs))
+
+    async def aggregate(self, pipeline, **kwargs):
+        return AsyncMongomockCursor(self._collection.aggregate(pipeline, **kwargs))
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if not callable(attribute):
+            return attribute
+
+        async def call(*args, **kwargs):
+            return attribute(*args, **kwargs)
+        return call
+
+
+class AsyncMongomockDatabase:
+    """Awaitable facade of a mongomock database"""
+
+    def __init__(self, database):
+        self._database = database
+
+    def __getitem__(self, name):
+        return AsyncMongomockCollection(self._database[name])
+
+    def get_collection(self, name):
+        return self[name]
+
+    async def command(self, command, *args, **kwargs):
+        return self._database.command(command, *args, **kwargs)
+
+
+class AsyncMongomockClient:
+    """
+    Async client for mongomock:// URLs, standing in for AsyncMongoClient in tests.
+
+    Wraps the sync mongomock client, so documents written by the sync services
+    are visible to the async reads and the other way round. The in-memory calls
+    never wait on I/O, so they run directly on the event loop.
+    """
+
+    def __init__(self, sync_client):
+        self._client = sync_client
+
+    def __getitem__(self, name):
+        return AsyncMongomockDatabase(self._client[name])
+
+    def get_database(self, name):
+        return self[name]
+
+    async def close(self):
+        # The wrapped client belongs to app.core.database and stays open
+        pass
@@ -0,0 +1,97 @@
+import threading
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+class PeriodicTask:
+    """Run a function every `interval` seconds on a daemon thread"""
+
+    def __init__(self, name, func, interval, on_stop=None, run_on_start=False):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.run_on_start = run_on_start
+        # Called once after the loop ends, e.g. for a final flush
+        self.on_stop = on_stop
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.on_stop:
+            try:
+                self.on_stop()
+            except Exception as e:
+                print(f"Warning: {self.name} shutdown hook failed: {str(e)}")
+
+    def _run(self):
+        if self.run_on_start:
+            self._run_once()
+        while not self._stop_event.wait(self.interval):
+            self._run_once()
+
+    def _run_once(self):
+        try:
+            self.func()
+        except Exception as e:
+            # Log and keep the loop alive; the next run retries
+            print(f"Warning: Background task {self.name} failed: {str(e)}")
+
+
+def claim_lease(collection, lease_id, seconds, now=None):
+    """
+    Take the lease of a task run by every process but meant to run in one at a time.
+
+    The lease lives on the document lease_id of collection (created if
+    missing), which can carry the task's own state too.
+
+    Returns:
+        The document, or None if another process holds an unexpired lease
+    """
+    now = now or datetime.now()
+    try:
+        return collection.find_one_and_update(
+            {'_id': lease_id, '$or': [{'lease_until': None}, {'lease_until': {'$lt': now}}]},
+            {'$set': {'lease_until': now + timedelta(seconds=seconds)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # The document exists and its lease is held
+        return None
+
+
+def release_lease(collection, lease_id, **fields):
+    """Give a lease back, setting any state fields with it"""
+    collection.update_one({'_id': lease_id}, {'$set': {'lease_until': None, **fields}})
+
+
+_tasks = []
+
+
+def register_background_task(task: PeriodicTask):
+    """Register a task to be started and stopped with the app"""
+    _tasks.append(task)
+    return task
+
+
+def start_background_tasks():
+    for task in _tasks:
+        task.start()
+
+
+def stop_background_tasks():
+    # Stop in reverse registration order
+    for task in reversed(_tasks):
+        task.stop()
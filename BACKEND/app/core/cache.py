@@ -0,0 +1,349 @@
+import asyncio
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from starlette.concurrency import run_in_threadpool
+
+# Returned by backends on a cache miss (None is a valid cached value)
+MISS = object()
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_DEFAULT_TTL = int(os.getenv("CACHE_DEFAULT_TTL", "30"))
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry TTL and tag index"""
+
+    # Calls never wait on I/O, so aget_or_set makes them on the event loop
+    blocking = False
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags = {}  # tag -> set of keys
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISS
+            expires_at, value, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return MISS
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, tags=()):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_tags(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, set()):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisCacheBackend:
+    """
+    Redis-backed cache shared by all workers.
+
+    Takes any client with the redis-py get/set/sadd/smembers/expire/delete/pipeline
+    interface, so a local stand-in (e.g. fakeredis) can replace a real server.
+    """
+
+    blocking = True
+
+    def __init__(self, redis_client, prefix='videohub:cache:'):
+        self.redis = redis_client
+        self.prefix = prefix
+
+    def _key(self, key):
+        return f"{self.prefix}{key}"
+
+    def _tag_key(self, tag):
+        return f"{self.prefix}tag:{tag}"
+
+    def get(self, key):
+        data = self.redis.get(self._key(key))
+        if data is None:
+            return MISS
+        return pickle.loads(data)
+
+    def set(self, key, value, ttl, tags=()):
+        pipe = self.redis.pipeline()
+        pipe.set(self._key(key), pickle.dumps(value), ex=int(ttl))
+        for tag in tags:
+            pipe.sadd(self._tag_key(tag), key)
+            # Tag sets outlive their entries a little; stale members are harmless
+            pipe.expire(self._tag_key(tag), int(ttl) * 2)
+        pipe.execute()
+
+    def delete(self, key):
+        self.redis.delete(self._key(key))
+
+    def invalidate_tags(self, tags):
+        for tag in tags:
+            keys = self.redis.smembers(self._tag_key(tag))
+            names = [self._key(k.decode() if isinstance(k, bytes) else k) for k in keys]
+            self.redis.delete(self._tag_key(tag), *names)
+
+    def clear(self):
+        for name in self.redis.scan_iter(f"{self.prefix}*"):
+            self.redis.delete(name)
+
+
+class NullCacheBackend:
+    """Disables caching (CACHE_BACKEND=none)"""
+
+    blocking = False
+
+    def get(self, key):
+        return MISS
+
+    def set(self, key, value, ttl, tags=()):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def invalidate_tags(self, tags):
+        pass
+
+    def clear(self):
+        pass
+
+
+class ResponseCache:
+    """
+    Read-through cache for expensive read endpoints.
+
+    Concurrent misses on the same key are coalesced: one caller runs the loader
+    while the others wait for its result. Cached values are shared between
+    requests and must not be mutated.
+    """
+
+    def __init__(self, backend, default_ttl=CACHE_DEFAULT_TTL):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self._key_locks = {}  # key -> [lock, waiters]
+        self._async_key_locks = {}  # key -> [asyncio lock, waiters], for aget_or_set
+        self._locks_guard = threading.Lock()
+        # A load is not cached if one of its tags was invalidated while it ran:
+        # invalidations are numbered, and while loads are in flight the number
+        # of the latest invalidation of each tag is kept for them to check
+        self._invalidations = 0
+        self._tag_invalidated_at = {}  # tag -> number of its latest invalidation
+        self._loads_in_flight = 0
+
+    @contextmanager
+    def _lock_for(self, key):
+        with self._locks_guard:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._key_locks.pop(key, None)
+
+    @asynccontextmanager
+    async def _async_lock_for(self, key):
+        entry = self._async_key_locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._async_key_locks.pop(key, None)
+
+    def get_or_set(self, key, loader, ttl=None, tags=()):
+        """
+        Return the cached value for key, or load, cache and return it.
+
+        Args:
+            key: Cache key
+            loader: Zero-argument function producing the value
+            ttl: Seconds to keep the value (default CACHE_DEFAULT_TTL)
+            tags: Invalidation tags, or a function of the loaded value returning them
+        """
+        value = self._safe_get(key)
+        if value is not MISS:
+            return value
+
+        with self._lock_for(key):
+            # Another caller may have loaded it while we waited
+            value = self._safe_get(key)
+            if value is not MISS:
+                return value
+
+            started = self._start_load()
+            try:
+                value = loader()
+                value_tags = tags(value) if callable(tags) else tags
+                if self._fresh_since(started, value_tags):
+                    self._safe_set(key, value, ttl, value_tags)
+            finally:
+                self._end_load()
+            return value
+
+    async def aget_or_set(self, key, loader, ttl=None, tags=()):
+        """
+        get_or_set for handlers on the event loop: loader returns an awaitable.
+
+        Misses are coalesced per key like get_or_set, waiting without blocking
+        the loop. Calls to a blocking backend (Redis) run in the threadpool.
+        """
+        value = await self._aget(key)
+        if value is not MISS:
+            return value
+
+        async with self._async_lock_for(key):
+            value = await self._aget(key)
+            if value is not MISS:
+                return value
+
+            started = self._start_load()
+            try:
+                value = await loader()
+                value_tags = tags(value) if callable(tags) else tags
+                if self._fresh_since(started, value_tags):
+                    if self.backend.blocking:
+                        await run_in_threadpool(self._safe_set, key, value, ttl, value_tags)
+                    else:
+                        self._safe_set(key, value, ttl, value_tags)
+            finally:
+                self._end_load()
+            return value
+
+    def invalidate(self, *tags):
+        """Drop every cached entry carrying any of the given tags"""
+        with self._locks_guard:
+            self._invalidations += 1
+            # Only loads running now could cache a value this invalidation dropped
+            if self._loads_in_flight:
+                for tag in tags:
+                    self._tag_invalidated_at[tag] = self._invalidations
+        try:
+            self.backend.invalidate_tags(tags)
+        except Exception as e:
+            print(f"Warning: Cache invalidation failed for {tags}: {str(e)}")
+
+    def _start_load(self):
+        """Register a load; returns the number of the latest invalidation"""
+        with self._locks_guard:
+            self._loads_in_flight += 1
+            return self._invalidations
+
+    def _fresh_since(self, started, tags):
+        """Whether none of tags was invalidated after invalidation number started"""
+        with self._locks_guard:
+            return all(self._tag_invalidated_at.get(tag, 0) <= started for tag in tags)
+
+    def _end_load(self):
+        with self._locks_guard:
+            self._loads_in_flight -= 1
+            if not self._loads_in_flight:
+                self._tag_invalidated_at.clear()
+
+    async def _aget(self, key):
+        if self.backend.blocking:
+            return await run_in_threadpool(self._safe_get, key)
+        return self._safe_get(key)
+
+    def _safe_get(self, key):
+        # A cache outage degrades to uncached reads instead of failing requests
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            print(f"Warning: Cache get failed for {key}: {str(e)}")
+            return MISS
+
+    def _safe_set(self, key, value, ttl, tags):
+        try:
+            self.backend.set(key, value, ttl or self.default_ttl, tags)
+        except Exception as e:
+            print(f"Warning: Cache set failed for {key}: {str(e)}")
+
+
+def create_cache_backend(name=CACHE_BACKEND):
+    """Build the backend selected by CACHE_BACKEND (memory, redis or none)"""
+    if name == 'redis':
+        import redis
+        return RedisCacheBackend(redis.Redis.from_url(CACHE_REDIS_URL))
+    if name == 'none':
+        return NullCacheBackend()
+    return MemoryCacheBackend()
+
+
+response_cache = ResponseCache(create_cache_backend())
+
+
+# Invalidation tags
+def video_tag(video_id):
+    return f"video:{video_id}"
+
+
+VIDEO_FEEDS_TAG = 'videos:feeds'
+CATEGORIES_TAG = 'categories'
+TAGS_TAG = 'tags'
+PLANS_TAG = 'plans'
+
+
+def category_tag(category_id):
+    return f"category:{category_id}"
+
+
+def tag_tag(tag_id):
+    return f"tag:{tag_id}"
+
+
+def plan_tag(plan_id):
+    return f"plan:{plan_id}"
+
+
+def recommendations_tag(user_id):
+    return f"recommendations:{user_id}"
+
+
+def account_tag(user_id):
+    return f"account:{user_id}"
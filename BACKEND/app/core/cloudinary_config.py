@@ -1,6 +1,9 @@
 import cloudinary
 import cloudinary.uploader
+import cloudinary.api
+import cloudinary.utils
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,34 +14,65 @@ cloudinary.config(
     api_secret=os.getenv("CLOUDINARY_API_SECRET")
 )
 
-def upload_to_cloudinary(file, resource_type="auto", folder="videohub"):
-    """Upload a file to Cloudinary and return metadata"""
+# Size of each part sent by chunked uploads (Cloudinary requires at least 5MB)
+CLOUDINARY_CHUNK_SIZE = int(os.getenv("CLOUDINARY_CHUNK_SIZE", str(20 * 1024 * 1024)))
+
+
+def _extract_metadata(result):
+    """Pick the URL and media metadata out of a Cloudinary upload result"""
+    return {
+        'secure_url': result['secure_url'],
+        'url': result.get('url'),
+        'format': result.get('format'),
+        'resource_type': result.get('resource_type'),
+        'width': result.get('width'),
+        'height': result.get('height'),
+        'duration': result.get('duration'),  # Video duration in seconds
+        'bit_rate': result.get('bit_rate'),
+        'bytes': result.get('bytes'),
+        'public_id': result.get('public_id')
+    }
+
+
+def upload_to_cloudinary(file, resource_type="auto", folder="videohub", **options):
+    """Upload a file to Cloudinary and return metadata (options are passed to the upload API)"""
     try:
         result = cloudinary.uploader.upload(
             file,
             resource_type=resource_type,
-            folder=folder
+            folder=folder,
+            **options
         )
         
         # Return URL and metadata
-        metadata = {
-            'secure_url': result['secure_url'],
-            'url': result.get('url'),
-            'format': result.get('format'),
-            'resource_type': result.get('resource_type'),
-            'width': result.get('width'),
-            'height': result.get('height'),
-            'duration': result.get('duration'),  # Video duration in seconds
-            'bit_rate': result.get('bit_rate'),
-            'bytes': result.get('bytes'),
-            'public_id': result.get('public_id')
-        }
-        
-        return metadata
+        return _extract_metadata(result)
+    except Exception as e:
+        raise Exception(f"Failed to upload to Cloudinary: {str(e)}")
+
+
+def upload_large_to_cloudinary(file, resource_type="video", folder="videohub", chunk_size=CLOUDINARY_CHUNK_SIZE):
+    """Upload a file (path or file object) to Cloudinary in chunks and return metadata (blocking)"""
+    try:
+        result = cloudinary.uploader.upload_large(
+            file,
+            resource_type=resource_type,
+            folder=folder,
+            chunk_size=chunk_size
+        )
+        return _extract_metadata(result)
     except Exception as e:
         raise Exception(f"Failed to upload to Cloudinary: {str(e)}")
 
 
+def get_cloudinary_metadata(public_id, resource_type="video"):
+    """Fetch metadata of an asset already on Cloudinary"""
+    try:
+        result = cloudinary.api.resource(public_id, resource_type=resource_type)
+        return _extract_metadata(result)
+    except Exception as e:
+        raise Exception(f"Failed to read metadata from Cloudinary: {str(e)}")
+
+
 def delete_from_cloudinary(public_id, resource_type="auto"):
     """Delete a file from Cloudinary by public_id"""
     try:
@@ -48,6 +82,38 @@ def delete_from_cloudinary(public_id, resource_type="auto"):
         raise Exception(f"Failed to delete from Cloudinary: {str(e)}")
 
 
+def signed_cloudinary_url(public_id, resource_type="video", expires_in=3600):
+    """
+    Expiring URL of an asset.
+
+    Plain delivery signatures never expire, so this is a signed download API
+    URL that Cloudinary refuses after expires_in seconds.
+    """
+    try:
+        return cloudinary.utils.private_download_url(
+            public_id,
+            "",
+            resource_type=resource_type,
+            type="upload",
+            expires_at=int(time.time() + expires_in)
+        )
+    except Exception as e:
+        raise Exception(f"Failed to sign Cloudinary URL: {str(e)}")
+
+
+# Most public IDs the Admin API deletes in one call
+CLOUDINARY_DELETE_BATCH_SIZE = 100
+
+
+def delete_many_from_cloudinary(public_ids, resource_type="image"):
+    """Delete up to CLOUDINARY_DELETE_BATCH_SIZE files in one Admin API call"""
+    try:
+        result = cloudinary.api.delete_resources(list(public_ids), resource_type=resource_type)
+        return result.get('deleted', {})
+    except Exception as e:
+        raise Exception(f"Failed to delete from Cloudinary: {str(e)}")
+
+
 def extract_public_id_from_url(url):
     """Extract public_id from Cloudinary URL"""
     try:
@@ -1,15 +1,45 @@
 import os
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from pymongo import MongoClient, AsyncMongoClient
 from pathlib import Path
 
 
-env_path = Path(__file__).parent.parent.parent / '.env' 
+env_path = Path(__file__).parent.parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
 url = os.getenv("MONGODB_CONNECTION")
 print("MongoDB connection string:", url)  # Debug print
-client = MongoClient(url)
+
+# Database every service and the index bootstrap use, on both clients
+DATABASE_NAME = os.getenv("MONGODB_DATABASE", "videohub")
+
+# Connection pool settings, shared by the sync and async clients
+MONGODB_CLIENT_OPTIONS = {
+    'maxPoolSize': int(os.getenv("MONGODB_MAX_POOL_SIZE", "100")),
+    'minPoolSize': int(os.getenv("MONGODB_MIN_POOL_SIZE", "0")),
+    'maxIdleTimeMS': int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000")),
+    'connectTimeoutMS': int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "10000")),
+    'serverSelectionTimeoutMS': int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "10000")),
+    'socketTimeoutMS': int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "30000")),
+    # Fail fast instead of queueing forever when every pooled connection is busy
+    'waitQueueTimeoutMS': int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+}
+
+# Worker threads available to sync (def) route handlers. Starlette defaults to 40,
+# which is exhausted long before a 100-connection Mongo pool is.
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", str(MONGODB_CLIENT_OPTIONS['maxPoolSize'])))
+
+
+def create_client(connection_url=None):
+    """Create a sync client; mongomock:// URLs give an in-memory client for tests"""
+    connection_url = connection_url or url
+    if connection_url and connection_url.startswith('mongomock://'):
+        import mongomock
+        return mongomock.MongoClient()
+    return MongoClient(connection_url, **MONGODB_CLIENT_OPTIONS)
+
+
+client = create_client()
 
 try:
     client.admin.command('ping')
@@ -17,3 +47,49 @@ try:
 except Exception as e:
     print("❌ Could not connect to MongoDB:", e)
 
+
+# Which client serves what:
+# - async (app.repositories): the hot request paths, i.e. feeds, video details,
+#   likes, comments and watch progress reports, awaited on the event loop
+# - sync `client`: background tasks and jobs (buffer flushes, rollups, cascades,
+#   media jobs) in their own threads, and the remaining def handlers (accounts,
+#   follows, playlists, history and liked-video lists, admin, uploads) in the
+#   threadpool. Uploads stay there anyway, as the storage SDKs block.
+# Move a handler to a repository when it becomes hot.
+_async_client = None
+
+
+def get_async_client():
+    """
+    Get the shared async client for handlers running on the event loop.
+
+    Created lazily so it binds to the running loop; uses the same pool settings as `client`.
+    For mongomock:// URLs it wraps the in-memory `client`, so both see the same data.
+    """
+    global _async_client
+    if _async_client is None:
+        if url and url.startswith('mongomock://'):
+            from app.core.async_mongomock import AsyncMongomockClient
+            _async_client = AsyncMongomockClient(client)
+        else:
+            _async_client = AsyncMongoClient(url, **MONGODB_CLIENT_OPTIONS)
+    return _async_client
+
+
+def get_async_db():
+    """Get the DATABASE_NAME database from the async client"""
+    return get_async_client()[DATABASE_NAME]
+
+
+async def close_async_client():
+    """Close the async client (called on shutdown)"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+
+def configure_threadpool(size=THREADPOOL_SIZE):
+    """Resize the threadpool used to run sync route handlers (must run inside the event loop)"""
+    from anyio import to_thread
+    to_thread.current_default_thread_limiter().total_tokens = size
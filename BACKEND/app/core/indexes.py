@@ -0,0 +1,282 @@
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+
+# Declared indexes per collection: (name, keys, options)
+# Names are explicit so reconciliation can tell declared indexes from ad-hoc ones.
+INDEX_SPECS = {
+    'users': [
+        ('email_unique', [('email', ASCENDING)], {'unique': True}),
+        # Mega channels, whose videos are merged into timelines on read
+        ('followers_count', [('followers_count', DESCENDING)], {}),
+    ],
+    'videos': [
+        ('status_created_at', [('status', ASCENDING), ('created_at', DESCENDING)], {}),
+        ('status_views', [('status', ASCENDING), ('views', DESCENDING)], {}),
+        ('uploader_created_at', [('uploader_id', ASCENDING), ('created_at', DESCENDING)], {}),
+        ('status_search_tokens', [('status', ASCENDING), ('search_tokens', ASCENDING)], {}),
+        # Recommendation candidates: published videos in a category/tag, most viewed first
+        ('status_categories_views', [('status', ASCENDING), ('categories', ASCENDING), ('views', DESCENDING)], {}),
+        ('status_tags_views', [('status', ASCENDING), ('tags', ASCENDING), ('views', DESCENDING)], {}),
+    ],
+    'likes': [
+        ('user_video_unique', [('user_id', ASCENDING), ('video_id', ASCENDING)], {'unique': True}),
+        ('user_type_created_at', [('user_id', ASCENDING), ('like_type', ASCENDING), ('created_at', DESCENDING)], {}),
+        ('video_created_at', [('video_id', ASCENDING), ('created_at', DESCENDING)], {}),
+        ('type_created_at', [('like_type', ASCENDING), ('created_at', DESCENDING)], {}),
+        ('updated_at', [('updated_at', ASCENDING)], {}),
+    ],
+    'watch_history': [
+        ('user_video_unique', [('user_id', ASCENDING), ('video_id', ASCENDING)], {'unique': True}),
+        ('user_last_watched_at', [('user_id', ASCENDING), ('last_watched_at', DESCENDING)], {}),
+    ],
+    'followers': [
+        ('follower_following_status', [('follower_id', ASCENDING), ('following_id', ASCENDING), ('status', ASCENDING)], {'unique': True}),
+        ('following_status', [('following_id', ASCENDING), ('status', ASCENDING)], {}),
+    ],
+    'comments': [
+        ('created_at', [('created_at', DESCENDING)], {}),
+        ('video_parent_created_at', [('video_id', ASCENDING), ('parent_comment_id', ASCENDING), ('created_at', DESCENDING)], {}),
+        ('parent_created_at', [('parent_comment_id', ASCENDING), ('created_at', ASCENDING)], {}),
+    ],
+    'saved_videos': [
+        ('user_video_unique', [('user_id', ASCENDING), ('video_id', ASCENDING)], {'unique': True}),
+        ('user_saved_at', [('user_id', ASCENDING), ('saved_at', DESCENDING)], {}),
+    ],
+    'views': [
+        ('started_at', [('started_at', DESCENDING)], {}),
+        ('video_started_at', [('video_id', ASCENDING), ('started_at', DESCENDING)], {}),
+        ('user_started_at', [('user_id', ASCENDING), ('started_at', DESCENDING)], {}),
+    ],
+    'playlists': [
+        ('user_created_at', [('user_id', ASCENDING), ('created_at', DESCENDING)], {}),
+        ('privacy_created_at', [('privacy', ASCENDING), ('created_at', DESCENDING)], {}),
+    ],
+    'video_rankings': [
+        ('trending_score', [('trending_score', DESCENDING)], {}),
+        ('hot_score', [('hot_score', DESCENDING)], {}),
+        ('computed_at', [('computed_at', ASCENDING)], {}),
+    ],
+    'time_subscriptions': [
+        ('user_unique', [('user_id', ASCENDING)], {'unique': True}),
+    ],
+    'subscription_history': [
+        ('user_created_at', [('user_id', ASCENDING), ('created_at', DESCENDING)], {}),
+    ],
+    'categories': [
+        ('slug_unique', [('slug', ASCENDING)], {'unique': True}),
+    ],
+    'tags': [
+        ('slug_unique', [('slug', ASCENDING)], {'unique': True}),
+    ],
+    'video_counters': [
+        ('video_id', [('video_id', ASCENDING)], {}),
+    ],
+    'video_stats_hourly': [
+        ('video_bucket', [('video_id', ASCENDING), ('bucket', DESCENDING)], {}),
+        # Hourly detail is kept 30 days; the daily rollups are kept for good
+        ('bucket_ttl', [('bucket', ASCENDING)], {'expireAfterSeconds': 30 * 24 * 3600}),
+    ],
+    'video_stats_daily': [
+        ('video_bucket', [('video_id', ASCENDING), ('bucket', DESCENDING)], {}),
+    ],
+    'timeline_entries': [
+        ('user_video_unique', [('user_id', ASCENDING), ('video_id', ASCENDING)], {'unique': True}),
+        ('user_created_at_video', [('user_id', ASCENDING), ('created_at', DESCENDING), ('video_id', DESCENDING)], {}),
+        ('user_uploader', [('user_id', ASCENDING), ('uploader_id', ASCENDING)], {}),
+        ('video_id', [('video_id', ASCENDING)], {}),
+    ],
+    'jobs': [
+        ('status_run_at', [('status', ASCENDING), ('run_at', ASCENDING)], {}),
+        # Finished jobs are kept a week for status polling
+        ('finished_at_ttl', [('finished_at', ASCENDING)], {'expireAfterSeconds': 7 * 24 * 3600}),
+    ],
+}
+
+# Indexes dropped by name by reconcile_indexes, after being taken out of INDEX_SPECS
+RETIRED_INDEXES = {
+    # Expired every entry 30 days after fan-out, emptying the timelines of
+    # readers following channels that post rarely; trim_timeline bounds them
+    'timeline_entries': ['added_at_ttl'],
+}
+
+
+def _key_of(keys):
+    """Normalize index keys so declared and existing indexes can be compared"""
+    return tuple((field, direction) for field, direction in keys)
+
+
+def _options_of(options):
+    """The index options reconciliation enforces (uniqueness and TTL), normalized"""
+    return {'unique': bool(options.get('unique')), 'expireAfterSeconds': options.get('expireAfterSeconds')}
+
+
+def _existing_by_key(collection):
+    """Existing indexes keyed by normalized keys: {keys: (name, enforced options)}"""
+    return {
+        _key_of(info['key']): (name, _options_of(info))
+        for name, info in collection.index_information().items()
+    }
+
+
+def _reconcile_options(db, collection, existing_name, name, keys, options, current):
+    """
+    Bring an existing index with the declared keys to the declared options.
+
+    A changed TTL is applied in place with collMod. Adding or dropping a unique
+    constraint (or a TTL) cannot be done in place, so the index is rebuilt
+    under the declared name; if that fails (duplicates in the data) the old
+    index is restored.
+    """
+    declared = _options_of(options)
+    if declared['unique'] == current['unique'] and None not in (declared['expireAfterSeconds'], current['expireAfterSeconds']):
+        db.command('collMod', collection.name, index={
+            'name': existing_name, 'expireAfterSeconds': declared['expireAfterSeconds']
+        })
+        return
+    collection.drop_index(existing_name)
+    try:
+        collection.create_index(keys, name=name, **options)
+    except OperationFailure:
+        restore = {option: value for option, value in current.items() if value}
+        collection.create_index(keys, name=existing_name, **restore)
+        raise
+
+
+def ensure_indexes(db, specs=None):
+    """
+    Create every declared index that is missing (run at startup).
+
+    Existing indexes are never dropped or rebuilt here, so workers starting
+    together can't race on them: declared indexes whose uniqueness or TTL
+    differ and retired indexes still present are only reported, for
+    reconcile_indexes to fix. An existing index with the same keys but another
+    name counts as present. Failures (e.g. duplicates blocking a unique index)
+    are reported instead of raised so the app still starts.
+
+    Returns:
+        Dict with 'created', 'mismatched', 'retired' and 'failed' lists of
+        "collection.index_name" strings
+    """
+    specs = specs or INDEX_SPECS
+    created = []
+    mismatched = []
+    failed = []
+
+    for collection_name, indexes in specs.items():
+        collection = db[collection_name]
+        existing = _existing_by_key(collection)
+
+        for name, keys, options in indexes:
+            if _key_of(keys) in existing:
+                if existing[_key_of(keys)][1] != _options_of(options):
+                    mismatched.append(f"{collection_name}.{name}")
+                continue
+            try:
+                collection.create_index(keys, name=name, **options)
+                created.append(f"{collection_name}.{name}")
+            except OperationFailure as e:
+                print(f"Warning: Failed to create index {collection_name}.{name}: {str(e)}")
+                failed.append(f"{collection_name}.{name}")
+
+    retired = [
+        f"{collection_name}.{name}"
+        for collection_name, names in RETIRED_INDEXES.items()
+        for name in sorted(set(names) & set(db[collection_name].index_information()))
+    ]
+    return {"created": created, "mismatched": mismatched, "retired": retired, "failed": failed}
+
+
+def reconcile_indexes(db, specs=None):
+    """
+    Create missing indexes, fix the uniqueness and TTL of existing indexes with
+    the declared keys, and drop retired indexes.
+
+    Rebuilding an index drops it first, so this is a one-off maintenance step
+    (python -m app.core.indexes --reconcile) rather than part of startup.
+
+    Returns:
+        Dict with 'created', 'updated', 'dropped' and 'failed' lists of
+        "collection.index_name" strings
+    """
+    specs = specs or INDEX_SPECS
+    updated = []
+    dropped = []
+    failed = []
+
+    for collection_name, names in RETIRED_INDEXES.items():
+        collection = db[collection_name]
+        for name in set(names) & set(collection.index_information()):
+            try:
+                collection.drop_index(name)
+                dropped.append(f"{collection_name}.{name}")
+            except OperationFailure as e:
+                print(f"Warning: Failed to drop index {collection_name}.{name}: {str(e)}")
+                failed.append(f"{collection_name}.{name}")
+
+    for collection_name, indexes in specs.items():
+        collection = db[collection_name]
+        existing = _existing_by_key(collection)
+
+        for name, keys, options in indexes:
+            if _key_of(keys) not in existing:
+                continue
+            existing_name, current = existing[_key_of(keys)]
+            if current == _options_of(options):
+                continue
+            try:
+                _reconcile_options(db, collection, existing_name, name, keys, options, current)
+                updated.append(f"{collection_name}.{name}")
+            except OperationFailure as e:
+                print(f"Warning: Failed to update index {collection_name}.{name}: {str(e)}")
+                failed.append(f"{collection_name}.{name}")
+
+    result = ensure_indexes(db, specs)
+    return {"created": result['created'], "updated": updated, "dropped": dropped, "failed": failed + result['failed']}
+
+
+def get_index_report(db, specs=None):
+    """
+    Compare declared indexes with what exists in the database.
+
+    Returns:
+        Dict keyed by collection with 'missing' (declared but absent),
+        'mismatched' (present with other uniqueness or TTL options),
+        'undeclared' (present but not declared) and 'unused' (no recorded
+        accesses since the server started, from $indexStats) index names
+    """
+    specs = specs or INDEX_SPECS
+    report = {}
+
+    for collection_name, indexes in specs.items():
+        collection = db[collection_name]
+        existing = _existing_by_key(collection)
+        declared_keys = {_key_of(keys) for _, keys, _ in indexes}
+
+        try:
+            usage = {stat['name']: stat['accesses']['ops'] for stat in collection.aggregate([{'$indexStats': {}}])}
+        except OperationFailure:
+            usage = {}
+
+        report[collection_name] = {
+            'missing': [name for name, keys, _ in indexes if _key_of(keys) not in existing],
+            'mismatched': [name for name, keys, options in indexes
+                           if _key_of(keys) in existing and existing[_key_of(keys)][1] != _options_of(options)],
+            'undeclared': [name for keys, (name, _) in existing.items()
+                           if name != '_id_' and keys not in declared_keys],
+            'unused': [name for name, ops in usage.items() if name != '_id_' and ops == 0],
+        }
+
+    return report
+
+
+if __name__ == '__main__':
+    import sys
+    from pprint import pprint
+    from app.core.database import client, DATABASE_NAME
+
+    # python -m app.core.indexes [--reconcile]: report, or reconcile, the indexes
+    if '--reconcile' in sys.argv[1:]:
+        pprint(reconcile_indexes(client[DATABASE_NAME]))
+    else:
+        pprint(get_index_report(client[DATABASE_NAME]))
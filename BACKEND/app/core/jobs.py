@@ -0,0 +1,203 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+from app.core.database import client, DATABASE_NAME
+from app.core.background import PeriodicTask, register_background_task
+
+db = client[DATABASE_NAME]
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Seconds an idle worker waits before polling for new jobs
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+# Retry n waits JOB_RETRY_BASE_SECONDS * 2^(n-1), capped at JOB_RETRY_MAX_SECONDS
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "600"))
+# A running job whose lease expires (worker crashed) is picked up again
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "1800"))
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+_handlers = {}
+# The job running on the current worker thread, for progress reports
+_current = threading.local()
+
+
+def register_job_handler(job_type, on_failure=None):
+    """
+    Decorator registering the function that runs jobs of a type.
+
+    The handler receives the job payload and returns a result (stored on the job).
+    Raising marks the attempt as failed; it is retried with backoff until
+    max_attempts is reached, then on_failure(payload, error) is called once.
+    """
+    def decorator(func):
+        _handlers[job_type] = (func, on_failure)
+        return func
+    return decorator
+
+
+def enqueue_job(job_type, payload, user_id=None, max_attempts=JOB_MAX_ATTEMPTS, db_client=None):
+    """
+    Store a job for the worker pool and return its ID.
+
+    Args:
+        job_type: Name of a registered handler
+        payload: Handler arguments (must be BSON-encodable)
+        user_id: Owner allowed to poll the job status
+        max_attempts: Attempts before the job is marked failed
+        db_client: Database to use (defaults to the app database)
+    """
+    now = datetime.utcnow()
+    result = (db_client or db)['jobs'].insert_one({
+        'type': job_type,
+        'payload': payload,
+        'user_id': user_id,
+        'status': JOB_QUEUED,
+        'attempts': 0,
+        'max_attempts': max_attempts,
+        'run_at': now,
+        'locked_until': None,
+        'result': None,
+        'error': None,
+        'progress': None,
+        'created_at': now,
+        'updated_at': now,
+        'finished_at': None
+    })
+    return str(result.inserted_id)
+
+
+def get_job(job_id, db_client=None):
+    """Get a job's status by ID (None if unknown)"""
+    if not ObjectId.is_valid(job_id):
+        return None
+    job = (db_client or db)['jobs'].find_one({'_id': ObjectId(job_id)})
+    if job:
+        job['id'] = str(job['_id'])
+        job.pop('_id')
+        job.pop('locked_until', None)
+    return job
+
+
+def report_job_progress(progress):
+    """
+    Store progress of the job running on this thread (a no-op outside a job).
+
+    Progress is kept across retries, so a handler can read it back with
+    get_job_progress to skip the steps a failed attempt already finished.
+    """
+    job = getattr(_current, 'job', None)
+    if job is None:
+        return
+    job['progress'] = progress
+    job_worker.db['jobs'].update_one(
+        {'_id': job['_id']},
+        {'$set': {'progress': progress, 'updated_at': datetime.utcnow()}}
+    )
+
+
+def get_job_progress():
+    """Progress stored by earlier attempts of the job running on this thread (None if none)"""
+    job = getattr(_current, 'job', None)
+    return job.get('progress') if job else None
+
+
+def retry_delay(attempts):
+    """Backoff before the next attempt after `attempts` failures"""
+    return min(JOB_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), JOB_RETRY_MAX_SECONDS)
+
+
+class JobWorker:
+    """
+    Claims due jobs from the jobs collection and runs their handlers.
+
+    Claiming is a single find_one_and_update, so any number of worker threads
+    and processes can share the collection without running a job twice.
+    """
+
+    def __init__(self, db_client):
+        self.db = db_client
+
+    def claim_next(self):
+        now = datetime.utcnow()
+        return self.db['jobs'].find_one_and_update(
+            {'$or': [
+                {'status': JOB_QUEUED, 'run_at': {'$lte': now}},
+                {'status': JOB_RUNNING, 'locked_until': {'$lt': now}}
+            ]},
+            {
+                '$set': {
+                    'status': JOB_RUNNING,
+                    'locked_until': now + timedelta(seconds=JOB_LEASE_SECONDS),
+                    'started_at': now,
+                    'updated_at': now
+                },
+                '$inc': {'attempts': 1}
+            },
+            sort=[('run_at', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def run_job(self, job):
+        handler, _ = _handlers.get(job['type'], (None, None))
+        _current.job = job
+        try:
+            if handler is None:
+                raise Exception(f"No handler registered for job type {job['type']}")
+            result = handler(job.get('payload') or {})
+        except Exception as e:
+            self._fail(job, e)
+            return
+        finally:
+            _current.job = None
+
+        now = datetime.utcnow()
+        self.db['jobs'].update_one(
+            {'_id': job['_id']},
+            {'$set': {
+                'status': JOB_SUCCEEDED,
+                'result': result,
+                'error': None,
+                'locked_until': None,
+                'finished_at': now,
+                'updated_at': now
+            }}
+        )
+
+    def _fail(self, job, error):
+        now = datetime.utcnow()
+        update = {'error': str(error), 'locked_until': None, 'updated_at': now}
+        if job['attempts'] >= job.get('max_attempts', JOB_MAX_ATTEMPTS):
+            print(f"Warning: Job {job['_id']} ({job['type']}) failed permanently: {str(error)}")
+            update.update({'status': JOB_FAILED, 'finished_at': now})
+            _, on_failure = _handlers.get(job['type'], (None, None))
+            if on_failure:
+                try:
+                    on_failure(job.get('payload') or {}, error)
+                except Exception as e:
+                    print(f"Warning: Failure hook of job {job['_id']} failed: {str(e)}")
+        else:
+            update.update({'status': JOB_QUEUED, 'run_at': now + timedelta(seconds=retry_delay(job['attempts']))})
+        self.db['jobs'].update_one({'_id': job['_id']}, {'$set': update})
+
+    def run_pending(self):
+        """Run due jobs until none are left"""
+        while True:
+            job = self.claim_next()
+            if job is None:
+                return
+            self.run_job(job)
+
+
+job_worker = JobWorker(db)
+
+if os.getenv("JOB_WORKERS_ENABLED", "true").lower() != "false":
+    for worker_number in range(JOB_WORKERS):
+        # Each worker thread drains the queue, then polls again after the interval
+        register_background_task(PeriodicTask(f'job-worker-{worker_number}', job_worker.run_pending, JOB_POLL_INTERVAL_SECONDS))
@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+# bcrypt cost; changing it rehashes each password at its owner's next login
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+# Worker processes doing the hashing (bcrypt is pure CPU)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hashes queued or running at once; callers beyond this get a 503 right away
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 8)))
+PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "10"))
+
+
+def _crypt_context(rounds):
+    # min and max rounds pin the cost, so hashes made with another cost need an update
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+# Built per process: the pool workers import this module, not the app
+_contexts = {}
+
+
+def _context(rounds):
+    if rounds not in _contexts:
+        _contexts[rounds] = _crypt_context(rounds)
+    return _contexts[rounds]
+
+
+def _hash(password, rounds):
+    return _context(rounds).hash(password)
+
+
+def _verify_and_update(password, hashed_password, rounds):
+    return _context(rounds).verify_and_update(password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated process pool.
+
+    Route threads only wait on the result, so a login burst uses the hashing
+    workers' CPU instead of starving the threadpool and the GIL. At most
+    max_pending hashes are queued; past that callers fail fast with a 503.
+    """
+
+    def __init__(self, rounds=PASSWORD_BCRYPT_ROUNDS, workers=PASSWORD_HASH_WORKERS,
+                 max_pending=PASSWORD_HASH_MAX_PENDING, timeout=PASSWORD_HASH_TIMEOUT_SECONDS):
+        self.rounds = rounds
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                # Spawned, not forked: the app process holds Mongo clients and threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(status_code=503, detail="Server busy, please retry")
+        try:
+            return self._get_executor().submit(func, *args).result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise HTTPException(status_code=503, detail="Server busy, please retry")
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password, self.rounds)
+
+    def verify_and_update(self, password: str, hashed_password: str):
+        """
+        Check a password against its stored hash.
+
+        Returns:
+            (valid, new_hash): new_hash is set when the stored hash was made
+            with other parameters and should be replaced
+        """
+        return self._run(_verify_and_update, password, hashed_password, self.rounds)
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher()
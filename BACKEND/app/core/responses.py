@@ -0,0 +1,72 @@
+import base64
+from decimal import Decimal
+from typing import Any
+import orjson
+from bson import Binary, Code, DBRef, Decimal128, Regex, Timestamp
+from bson.objectid import ObjectId
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+# Non-string dict keys (ints, ObjectIds) are written as strings; numpy arrays and
+# scalars from the recommendation scoring are serialized natively
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _decimal_to_number(value: Decimal):
+    # Same rule as FastAPI's jsonable_encoder: whole numbers stay ints
+    return int(value) if value.as_tuple().exponent >= 0 else float(value)
+
+
+def bson_default(obj: Any):
+    """
+    orjson fallback for the types Mongo documents and schemas carry.
+
+    orjson handles str/int/float/bool/None, dicts, lists, datetimes, enums and UUIDs
+    itself (including the dict/int subclasses bson returns, like SON and Int64);
+    everything else is converted here.
+
+    Raises:
+        TypeError: For unsupported types, as orjson expects
+    """
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return _decimal_to_number(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return _decimal_to_number(obj)
+    if isinstance(obj, Timestamp):
+        return obj.as_datetime()
+    if isinstance(obj, Binary) and obj.subtype in (3, 4):
+        return str(obj.as_uuid(obj.subtype))
+    if isinstance(obj, (bytes, bytearray)):
+        return base64.b64encode(obj).decode()
+    if isinstance(obj, Regex):
+        return obj.pattern
+    if isinstance(obj, Code):
+        return str(obj)
+    if isinstance(obj, DBRef):
+        return obj.as_doc().to_dict()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def json_dumps(content: Any) -> bytes:
+    """Serialize content (Mongo documents included) to JSON bytes"""
+    return orjson.dumps(content, default=bson_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+
+    It is the app's default response class. Routes that return large lists
+    should return it directly: FastAPI then skips its jsonable_encoder pass,
+    and documents can keep their ObjectIds and datetimes as they come from Mongo.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
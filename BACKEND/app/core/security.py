@@ -1,23 +1,34 @@
-from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from bson.objectid import ObjectId
+from app.core.database import client, DATABASE_NAME
+from app.core.cache import MemoryCacheBackend, MISS, response_cache, account_tag
+from app.core.password_hashing import password_hasher
+import base64
+import hashlib
+import hmac
+import json
 import os
+import time
 
 load_dotenv()
 
 oauth2_scheme = HTTPBearer(auto_error=False)
 
 #HASH PASSOWRD
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
+# bcrypt runs in the password hashing process pool, off the request threads
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.verify_and_update(plain_password, hashed_password)[0]
+
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    """(valid, new_hash); new_hash replaces a hash made with outdated parameters"""
+    return password_hasher.verify_and_update(plain_password, hashed_password)
 
 
 #JWT
@@ -33,44 +44,150 @@ def create_access_token(data: dict , expires_delta: timedelta = None) -> str:
 
     return encoded_jwt
 
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+
+# Header of the tokens this module issues; others take the python-jose path
+_FAST_PATH_HEADER = {"alg": "HS256", "typ": "JWT"}
+
+
+def _decode_fast(token: str):
+    """
+    Verify one of our own HS256 tokens with hmac instead of python-jose.
+
+    Returns the payload, or None when the token is not in the shape we issue
+    (the caller then falls back to jwt.decode). Raises JWTError when the token
+    is ours but invalid or expired.
+    """
+    if not SECRET_KEY:
+        return None
+    try:
+        header_segment, payload_segment, signature_segment = token.split('.')
+        header = json.loads(_b64url_decode(header_segment))
+        if header != _FAST_PATH_HEADER:
+            return None
+        signature = _b64url_decode(signature_segment)
+        payload = json.loads(_b64url_decode(payload_segment))
+    except (ValueError, TypeError):
+        raise JWTError("Malformed token")
+
+    expected = hmac.new(SECRET_KEY.encode(), f"{header_segment}.{payload_segment}".encode(), hashlib.sha256).digest()
+    if not hmac.compare_digest(signature, expected):
+        raise JWTError("Signature verification failed")
+    if not isinstance(payload, dict) or set(payload) & {'nbf', 'iat', 'aud', 'iss'}:
+        # Claims we never set; let python-jose validate them properly
+        return None
+    exp = payload.get('exp')
+    if not isinstance(exp, (int, float)) or exp <= time.time():
+        raise JWTError("Signature has expired")
+    return payload
+
+
 def decode_access_token(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode_fast(token)
+        if payload is None:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
     except JWTError:
         return None
 
 
+# PRINCIPALS
+# Verified tokens, keyed by a hash of the token and expiring with it
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+TOKEN_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+# Ban/role checks against the users collection (cached, invalidated by the admin routes)
+ACCOUNT_STATUS_CHECK = os.getenv("ACCOUNT_STATUS_CHECK", "true").lower() != "false"
+ACCOUNT_STATUS_TTL_SECONDS = int(os.getenv("ACCOUNT_STATUS_TTL_SECONDS", "60"))
+
+_token_cache = MemoryCacheBackend(max_entries=TOKEN_CACHE_MAX_ENTRIES)
+
+
+def _verify_token(token: str):
+    """Claims of a valid token, from the token cache when it was verified before"""
+    key = hashlib.sha256(token.encode()).hexdigest()
+    principal = _token_cache.get(key)
+    if principal is not MISS:
+        return principal
+
+    payload = decode_access_token(token)
+    if payload is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    user_id = payload.get("user_id")
+    email = payload.get("email")
+    if user_id is None or email is None:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    principal = {"user_id": user_id, "email": email, "is_admin": payload.get("is_admin", False)}
+
+    # Never cached past the token's own expiry
+    ttl = min(TOKEN_CACHE_TTL_SECONDS, payload["exp"] - time.time())
+    if ttl > 0:
+        _token_cache.set(key, principal, ttl)
+    return principal
+
+
+def get_account_status(user_id: str):
+    """
+    Ban and admin flags of a user, cached for ACCOUNT_STATUS_TTL_SECONDS.
+
+    Returns None for unknown or deleted users.
+    """
+    def load():
+        if not ObjectId.is_valid(user_id):
+            return None
+        user = client[DATABASE_NAME]['users'].find_one({'_id': ObjectId(user_id)}, {'is_banned': 1, 'role': 1})
+        if user is None:
+            return None
+        return {"is_banned": user.get("is_banned", False), "is_admin": user.get("role", "user") == "admin"}
+
+    return response_cache.get_or_set(
+        f"account:{user_id}", load, ttl=ACCOUNT_STATUS_TTL_SECONDS, tags=[account_tag(user_id)]
+    )
+
+
+def invalidate_account_status(user_id: str):
+    """Call after changing a user's ban or role so the next request sees it"""
+    response_cache.invalidate(account_tag(user_id))
+
+
+def resolve_principal(token: str) -> dict:
+    """
+    Resolve a bearer token to the current user's principal.
+
+    The token is verified once and then served from the token cache; the ban
+    and role check reads the cached account status, so the common case costs
+    no database round trip. The stored role wins over the token's is_admin
+    claim, so promotions and demotions apply without a new login.
+    """
+    principal = dict(_verify_token(token))
+    if ACCOUNT_STATUS_CHECK:
+        status = get_account_status(principal["user_id"])
+        if status is None:
+            raise HTTPException(status_code=401, detail="Account not found")
+        if status["is_banned"]:
+            raise HTTPException(status_code=403, detail="Account banned")
+        principal["is_admin"] = status["is_admin"]
+    return principal
+
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
     if credentials is None:
         raise HTTPException(status_code=401, detail="Authorization required")
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
-        email = payload.get("email")
-        is_admin = payload.get("is_admin", False)
-        if user_id is None or email is None:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
-        return {"user_id": user_id, "email": email, "is_admin": is_admin}
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    return resolve_principal(credentials.credentials)
+
+# Optional user dependency, for routes that also serve anonymous visitors
+def get_optional_user(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
+    if credentials is None:
+        return None
+    return resolve_principal(credentials.credentials)
 
 # Admin user dependency
 def get_admin_user(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
     if credentials is None:
         raise HTTPException(status_code=401, detail="Authorization required")
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
-        email = payload.get("email")
-        is_admin = payload.get("is_admin", False)
-        if user_id is None or email is None or not is_admin:
-            raise HTTPException(status_code=403, detail="Admin privileges required")
-        return {"user_id": user_id, "email": email, "is_admin": True}
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    
\ No newline at end of file
+    principal = resolve_principal(credentials.credentials)
+    if not principal["is_admin"]:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return principal
@@ -0,0 +1,101 @@
+import os
+import threading
+from app.core.storage.base import StorageBackend, asset_ref, build_metadata
+from app.core.storage.fake_storage import FakeStorage
+from app.core.storage.local_storage import LocalStorage
+from app.core.storage.s3_storage import S3Storage
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "cloudinary")
+# Backend per asset class, e.g. STORAGE_BACKEND_VIDEO=s3 to keep videos on cheaper storage
+STORAGE_BACKEND_BY_TYPE = {
+    'video': os.getenv("STORAGE_BACKEND_VIDEO") or STORAGE_BACKEND,
+    'image': os.getenv("STORAGE_BACKEND_IMAGE") or STORAGE_BACKEND,
+}
+# Received uploads wait here for the job workers, so every worker host must
+# read it: 's3', or 'local' with LOCAL_STORAGE_ROOT on a volume they share
+UPLOAD_STAGING_BACKEND = os.getenv("UPLOAD_STAGING_BACKEND", "local")
+
+# Document fields holding the asset reference of each URL field
+ASSET_FIELDS = {
+    'video_url': 'video_asset',
+    'thumbnail_url': 'thumbnail_asset',
+    'profile_picture': 'profile_picture_asset',
+    'cover_image': 'cover_image_asset',
+}
+
+
+def create_storage(name=STORAGE_BACKEND):
+    """Build a storage backend by name (cloudinary, local, s3 or fake)"""
+    if name == 'fake':
+        return FakeStorage()
+    if name == 'local':
+        return LocalStorage()
+    if name == 's3':
+        from app.core.storage.s3_storage import create_s3_client
+        return S3Storage(create_s3_client())
+    # Imported here so the other backends run without the Cloudinary SDK
+    from app.core.storage.cloudinary_storage import CloudinaryStorage
+    return CloudinaryStorage()
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_storage(name=None):
+    """The shared backend of a name (default STORAGE_BACKEND)"""
+    name = name or STORAGE_BACKEND
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = create_storage(name)
+        return _backends[name]
+
+
+def storage_for(resource_type):
+    """The backend new assets of a class ('video' or 'image') are stored on"""
+    return get_storage(STORAGE_BACKEND_BY_TYPE.get(resource_type, STORAGE_BACKEND))
+
+
+def staging_storage():
+    """The backend received uploads are staged on until a job worker stores them"""
+    return get_storage(UPLOAD_STAGING_BACKEND)
+
+
+def asset_ref_from_url(url, resource_type):
+    """
+    Asset reference of a URL, for documents that only have the URL (legacy
+    documents, or URLs supplied by clients). None if no backend recognizes it.
+    """
+    if not url:
+        return None
+    names = list(dict.fromkeys([*STORAGE_BACKEND_BY_TYPE.values(), STORAGE_BACKEND]))
+    if 'cloudinary' in url and 'cloudinary' not in names:
+        # Assets uploaded before the backend was switched
+        names.append('cloudinary')
+    for name in names:
+        key = get_storage(name).key_from_url(url)
+        if key:
+            return asset_ref(name, key, resource_type)
+    return None
+
+
+def get_asset_ref(document, url_field, resource_type):
+    """The stored asset reference of a document's URL field, falling back to the URL"""
+    return document.get(ASSET_FIELDS[url_field]) or asset_ref_from_url(document.get(url_field), resource_type)
+
+
+def with_asset_refs(document, resource_types):
+    """
+    Asset fields for the URL fields set on a document ({url_field: resource_type}).
+
+    Returns a dict to $set next to the URLs (None for URLs no backend stores,
+    replacing any stale reference); an explicitly given asset field wins.
+    """
+    refs = {}
+    for url_field, resource_type in resource_types.items():
+        if url_field in document and not document.get(ASSET_FIELDS[url_field]):
+            refs[ASSET_FIELDS[url_field]] = asset_ref_from_url(document[url_field], resource_type)
+    return refs
+
+
+storage = get_storage()
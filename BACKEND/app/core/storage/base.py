@@ -0,0 +1,90 @@
+import mimetypes
+import os
+
+
+def guess_format(name):
+    """File extension without the dot (None if there is none)"""
+    return os.path.splitext(name)[1].lstrip('.').lower() or None
+
+
+def guess_content_type(name, resource_type="auto"):
+    content_type, _ = mimetypes.guess_type(name)
+    if content_type:
+        return content_type
+    return {'video': 'video/mp4', 'image': 'image/jpeg'}.get(resource_type, 'application/octet-stream')
+
+
+def build_metadata(backend, key, resource_type, secure_url, url=None, format=None, size=None, **extra):
+    """
+    Upload/probe result in the shape every backend returns.
+
+    Besides the URLs and media metadata it carries `asset`, the structured
+    reference stored on documents next to the URL.
+    """
+    return {
+        'secure_url': secure_url,
+        'url': url or secure_url,
+        'format': format,
+        'resource_type': resource_type,
+        'width': extra.get('width'),
+        'height': extra.get('height'),
+        'duration': extra.get('duration'),
+        'bit_rate': extra.get('bit_rate'),
+        'bytes': size,
+        'public_id': key,
+        'asset': asset_ref(backend, key, resource_type),
+    }
+
+
+def asset_ref(backend, key, resource_type):
+    """Structured reference to a stored asset, as stored on documents"""
+    return {'backend': backend, 'key': key, 'resource_type': resource_type}
+
+
+class StorageBackend:
+    """
+    Interface of media storage backends.
+
+    Assets are addressed by key; documents keep an asset reference (backend,
+    key, resource_type) next to each URL so deletes and probes never parse
+    URLs. All calls block; run them off the event loop.
+    """
+
+    name = None
+    # Most keys accepted by one delete_many call
+    delete_batch_size = 100
+
+    def upload(self, file_path, resource_type="auto", folder="videohub", **options):
+        """Store a file from disk; returns metadata (see build_metadata)"""
+        raise NotImplementedError
+
+    def upload_stream(self, stream, filename, resource_type="auto", folder="videohub", **options):
+        """Store a file-like object without spooling it first; returns metadata"""
+        raise NotImplementedError
+
+    def open(self, key, resource_type="auto"):
+        """Readable binary file object of an asset's content (close it when done)"""
+        raise NotImplementedError
+
+    def delete(self, key, resource_type="image"):
+        """Delete one asset; returns {'result': 'ok' or 'not found'}"""
+        raise NotImplementedError
+
+    def delete_many(self, keys, resource_type="image"):
+        """Delete a batch of assets; returns {key: 'deleted' or 'not_found'}"""
+        return {
+            key: 'deleted' if self.delete(key, resource_type).get('result') == 'ok' else 'not_found'
+            for key in keys
+        }
+
+    def signed_url(self, key, resource_type="video", expires_in=3600):
+        """Time-limited URL to read an asset"""
+        raise NotImplementedError
+
+    def get_metadata(self, key, resource_type="video"):
+        """Probe metadata of an already stored asset"""
+        raise NotImplementedError
+
+    def key_from_url(self, url):
+        """Key of an asset stored by this backend, given its URL (None if not ours)"""
+        return None
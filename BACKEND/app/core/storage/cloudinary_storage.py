@@ -0,0 +1,53 @@
+from urllib.request import urlopen
+from app.core.cloudinary_config import (
+    upload_to_cloudinary,
+    upload_large_to_cloudinary,
+    delete_from_cloudinary,
+    delete_many_from_cloudinary,
+    get_cloudinary_metadata,
+    signed_cloudinary_url,
+    extract_public_id_from_url,
+    CLOUDINARY_DELETE_BATCH_SIZE
+)
+from app.core.storage.base import StorageBackend, asset_ref
+
+
+class CloudinaryStorage(StorageBackend):
+    """Media storage on Cloudinary"""
+
+    name = 'cloudinary'
+    delete_batch_size = CLOUDINARY_DELETE_BATCH_SIZE
+
+    def _with_asset(self, metadata):
+        metadata['asset'] = asset_ref(self.name, metadata['public_id'], metadata.get('resource_type'))
+        return metadata
+
+    def upload(self, file_path, resource_type="auto", folder="videohub", **options):
+        if resource_type == "video":
+            # Videos go up in chunks so large files never sit in memory
+            return self._with_asset(upload_large_to_cloudinary(file_path, resource_type=resource_type, folder=folder))
+        return self._with_asset(upload_to_cloudinary(file_path, resource_type=resource_type, folder=folder, **options))
+
+    def upload_stream(self, stream, filename, resource_type="auto", folder="videohub", **options):
+        if resource_type == "video":
+            # upload_large reads the stream one chunk at a time
+            return self._with_asset(upload_large_to_cloudinary(stream, resource_type=resource_type, folder=folder))
+        return self._with_asset(upload_to_cloudinary(stream, resource_type=resource_type, folder=folder, **options))
+
+    def open(self, key, resource_type="auto"):
+        return urlopen(self.signed_url(key, resource_type=resource_type, expires_in=300))
+
+    def delete(self, key, resource_type="image"):
+        return delete_from_cloudinary(key, resource_type=resource_type)
+
+    def delete_many(self, keys, resource_type="image"):
+        return delete_many_from_cloudinary(keys, resource_type=resource_type)
+
+    def signed_url(self, key, resource_type="video", expires_in=3600):
+        return signed_cloudinary_url(key, resource_type=resource_type, expires_in=expires_in)
+
+    def get_metadata(self, key, resource_type="video"):
+        return self._with_asset(get_cloudinary_metadata(key, resource_type=resource_type))
+
+    def key_from_url(self, url):
+        return extract_public_id_from_url(url)
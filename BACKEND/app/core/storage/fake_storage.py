@@ -0,0 +1,71 @@
+import io
+import threading
+import uuid
+from app.core.storage.base import StorageBackend, build_metadata, guess_format
+
+FAKE_STORAGE_BASE_URL = "https://storage.invalid"
+
+
+class FakeStorage(StorageBackend):
+    """
+    In-memory storage for tests and local runs without network access.
+
+    Uploads are recorded with their content and size and get fake URLs;
+    deletions are recorded in `deleted`.
+    """
+
+    name = 'fake'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.assets = {}  # key -> metadata
+        self.contents = {}  # key -> bytes
+        self.deleted = []  # (key, resource_type)
+
+    def _store(self, folder, filename, resource_type, content):
+        key = f"{folder}/{uuid.uuid4().hex}"
+        metadata = build_metadata(
+            self.name, key, resource_type, f"{FAKE_STORAGE_BASE_URL}/{resource_type}/upload/{key}",
+            url=f"http://storage.invalid/{resource_type}/upload/{key}",
+            format=guess_format(filename), size=len(content)
+        )
+        with self._lock:
+            self.assets[key] = metadata
+            self.contents[key] = content
+        return metadata
+
+    def upload(self, file_path, resource_type="auto", folder="videohub", **options):
+        with open(file_path, 'rb') as source:
+            return self._store(folder, file_path, resource_type, source.read())
+
+    def upload_stream(self, stream, filename, resource_type="auto", folder="videohub", **options):
+        return self._store(folder, filename, resource_type, b''.join(iter(lambda: stream.read(1024 * 1024), b'')))
+
+    def open(self, key, resource_type="auto"):
+        with self._lock:
+            content = self.contents.get(key)
+        if content is None:
+            raise Exception(f"Asset not found: {key}")
+        return io.BytesIO(content)
+
+    def delete(self, key, resource_type="image"):
+        with self._lock:
+            self.deleted.append((key, resource_type))
+            found = self.assets.pop(key, None) is not None
+            self.contents.pop(key, None)
+        return {'result': 'ok' if found else 'not found'}
+
+    def signed_url(self, key, resource_type="video", expires_in=3600):
+        return f"{FAKE_STORAGE_BASE_URL}/{resource_type}/upload/{key}?expires_in={int(expires_in)}"
+
+    def get_metadata(self, key, resource_type="video"):
+        with self._lock:
+            metadata = self.assets.get(key)
+        if metadata is None:
+            raise Exception(f"Asset not found: {key}")
+        return metadata
+
+    def key_from_url(self, url):
+        if not url or not url.startswith(f"{FAKE_STORAGE_BASE_URL}/"):
+            return None
+        return url.split('/upload/', 1)[-1].split('?')[0]
@@ -0,0 +1,98 @@
+import hashlib
+import hmac
+import os
+import shutil
+import time
+import uuid
+from urllib.parse import urlencode
+from app.core.storage.base import StorageBackend, build_metadata, guess_format
+
+LOCAL_STORAGE_ROOT = os.getenv("LOCAL_STORAGE_ROOT", "media")
+# Where LOCAL_STORAGE_ROOT is served from: the app's /media route by default,
+# or a static file server in front of it (which must then check video signatures)
+LOCAL_STORAGE_BASE_URL = os.getenv("LOCAL_STORAGE_BASE_URL", "http://localhost:8000/media").rstrip('/')
+LOCAL_STORAGE_COPY_BUFFER = 1024 * 1024
+
+
+class LocalStorage(StorageBackend):
+    """
+    Media storage on the local filesystem, for offline runs and load tests.
+
+    Keys are paths under the root ({folder}/{uuid}.{ext}). Signed URLs carry an
+    expiry and an HMAC of key and expiry, checked with verify_signature by the
+    /media route, which requires them for videos.
+    """
+
+    name = 'local'
+    delete_batch_size = 1000
+
+    def __init__(self, root=LOCAL_STORAGE_ROOT, base_url=LOCAL_STORAGE_BASE_URL, secret=None):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url
+        self.secret = (secret or os.getenv("SECRET_KEY") or "").encode()
+
+    def path(self, key):
+        """Filesystem path of a key (keys can't escape the root)"""
+        path = os.path.abspath(os.path.join(self.root, key))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def _new_key(self, folder, filename):
+        extension = guess_format(filename)
+        return f"{folder.strip('/')}/{uuid.uuid4().hex}" + (f".{extension}" if extension else "")
+
+    def _metadata(self, key, resource_type):
+        url = f"{self.base_url}/{key}"
+        return build_metadata(
+            self.name, key, resource_type, url,
+            format=guess_format(key), size=os.path.getsize(self.path(key))
+        )
+
+    def upload(self, file_path, resource_type="auto", folder="videohub", **options):
+        key = self._new_key(folder, file_path)
+        os.makedirs(os.path.dirname(self.path(key)), exist_ok=True)
+        shutil.copyfile(file_path, self.path(key))
+        return self._metadata(key, resource_type)
+
+    def upload_stream(self, stream, filename, resource_type="auto", folder="videohub", **options):
+        key = self._new_key(folder, filename)
+        os.makedirs(os.path.dirname(self.path(key)), exist_ok=True)
+        with open(self.path(key), 'wb') as target:
+            shutil.copyfileobj(stream, target, LOCAL_STORAGE_COPY_BUFFER)
+        return self._metadata(key, resource_type)
+
+    def open(self, key, resource_type="auto"):
+        return open(self.path(key), 'rb')
+
+    def delete(self, key, resource_type="image"):
+        try:
+            os.remove(self.path(key))
+            return {'result': 'ok'}
+        except FileNotFoundError:
+            return {'result': 'not found'}
+
+    def _signature(self, key, expires):
+        return hmac.new(self.secret, f"{key}:{expires}".encode(), hashlib.sha256).hexdigest()
+
+    def signed_url(self, key, resource_type="video", expires_in=3600):
+        expires = int(time.time() + expires_in)
+        query = urlencode({'expires': expires, 'signature': self._signature(key, expires)})
+        return f"{self.base_url}/{key}?{query}"
+
+    def verify_signature(self, key, expires, signature):
+        """Check a signed URL's expiry and signature"""
+        if int(expires) < time.time():
+            return False
+        return hmac.compare_digest(self._signature(key, int(expires)), signature)
+
+    def get_metadata(self, key, resource_type="video"):
+        if not os.path.isfile(self.path(key)):
+            raise Exception(f"Asset not found: {key}")
+        return self._metadata(key, resource_type)
+
+    def key_from_url(self, url):
+        prefix = f"{self.base_url}/"
+        if not url or not url.startswith(prefix):
+            return None
+        return url[len(prefix):].split('?')[0]
@@ -0,0 +1,106 @@
+import os
+import uuid
+from app.core.storage.base import StorageBackend, build_metadata, guess_format, guess_content_type
+
+S3_BUCKET = os.getenv("S3_BUCKET", "videohub")
+# Set for S3-compatible servers (MinIO, R2, ...); unset for AWS
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_REGION = os.getenv("S3_REGION") or None
+# Public URL of the bucket (a CDN or the endpoint); defaults to path-style endpoint URLs
+S3_PUBLIC_BASE_URL = os.getenv("S3_PUBLIC_BASE_URL") or None
+
+
+class S3Storage(StorageBackend):
+    """
+    Media storage on S3 or an S3-compatible server such as MinIO.
+
+    Takes any boto3-style client; uploads use the managed transfer, which
+    switches to multipart for large files.
+    """
+
+    name = 's3'
+    # DeleteObjects accepts up to 1000 keys
+    delete_batch_size = 1000
+
+    def __init__(self, s3_client, bucket=S3_BUCKET, public_base_url=S3_PUBLIC_BASE_URL):
+        self.s3 = s3_client
+        self.bucket = bucket
+        if public_base_url is None:
+            # Path-style on custom endpoints, virtual-hosted style on AWS
+            if S3_ENDPOINT_URL:
+                public_base_url = f"{S3_ENDPOINT_URL.rstrip('/')}/{bucket}"
+            else:
+                public_base_url = f"https://{bucket}.s3.amazonaws.com"
+        self.public_base_url = public_base_url.rstrip('/')
+
+    def _new_key(self, folder, filename):
+        extension = guess_format(filename)
+        return f"{folder.strip('/')}/{uuid.uuid4().hex}" + (f".{extension}" if extension else "")
+
+    def _metadata(self, key, resource_type, size):
+        return build_metadata(
+            self.name, key, resource_type, f"{self.public_base_url}/{key}",
+            format=guess_format(key), size=size
+        )
+
+    def upload(self, file_path, resource_type="auto", folder="videohub", **options):
+        key = self._new_key(folder, file_path)
+        self.s3.upload_file(file_path, self.bucket, key, ExtraArgs={
+            'ContentType': guess_content_type(file_path, resource_type)
+        })
+        return self._metadata(key, resource_type, os.path.getsize(file_path))
+
+    def upload_stream(self, stream, filename, resource_type="auto", folder="videohub", **options):
+        key = self._new_key(folder, filename)
+        self.s3.upload_fileobj(stream, self.bucket, key, ExtraArgs={
+            'ContentType': guess_content_type(filename, resource_type)
+        })
+        return self.get_metadata(key, resource_type)
+
+    def open(self, key, resource_type="auto"):
+        # The body streams from S3 as it is read
+        return self.s3.get_object(Bucket=self.bucket, Key=key)['Body']
+
+    def delete(self, key, resource_type="image"):
+        # S3 deletes are idempotent and don't report missing keys
+        self.s3.delete_object(Bucket=self.bucket, Key=key)
+        return {'result': 'ok'}
+
+    def delete_many(self, keys, resource_type="image"):
+        result = self.s3.delete_objects(
+            Bucket=self.bucket,
+            Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': False}
+        )
+        errors = result.get('Errors') or []
+        if errors:
+            raise Exception(f"Failed to delete from S3: {errors[0].get('Key')}: {errors[0].get('Message')}")
+        return {deleted['Key']: 'deleted' for deleted in result.get('Deleted', [])}
+
+    def signed_url(self, key, resource_type="video", expires_in=3600):
+        return self.s3.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': key},
+            ExpiresIn=int(expires_in)
+        )
+
+    def get_metadata(self, key, resource_type="video"):
+        head = self.s3.head_object(Bucket=self.bucket, Key=key)
+        return self._metadata(key, resource_type, head.get('ContentLength'))
+
+    def key_from_url(self, url):
+        prefix = f"{self.public_base_url}/"
+        if not url or not url.startswith(prefix):
+            return None
+        return url[len(prefix):].split('?')[0]
+
+
+def create_s3_client():
+    """boto3 client from the S3_* settings (credentials from the usual AWS sources)"""
+    import boto3
+    return boto3.client(
+        's3',
+        endpoint_url=S3_ENDPOINT_URL,
+        region_name=S3_REGION,
+        aws_access_key_id=os.getenv("S3_ACCESS_KEY_ID") or None,
+        aws_secret_access_key=os.getenv("S3_SECRET_ACCESS_KEY") or None
+    )
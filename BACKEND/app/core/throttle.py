@@ -0,0 +1,56 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class SlidingWindowThrottle:
+    """
+    Counts events per key over a sliding window, in process memory.
+
+    Each worker process throttles on its own, so the effective limit is the
+    limit times the number of workers. Least recently used keys are evicted
+    beyond max_keys to keep memory bounded under a spray of keys.
+    """
+
+    def __init__(self, limit, window_seconds, max_keys=100000):
+        self.limit = limit
+        self.window = window_seconds
+        self.max_keys = max_keys
+        self._events = OrderedDict()  # key -> deque of monotonic timestamps
+        self._lock = threading.Lock()
+
+    def _prune(self, key, now):
+        events = self._events.get(key)
+        if events is None:
+            return None
+        while events and events[0] <= now - self.window:
+            events.popleft()
+        if not events:
+            del self._events[key]
+            return None
+        return events
+
+    def retry_after(self, key):
+        """Seconds until key may try again (0 if it is under the limit)"""
+        now = time.monotonic()
+        with self._lock:
+            events = self._prune(key, now)
+            if events is None or len(events) < self.limit:
+                return 0
+            return max(1, math.ceil(events[0] + self.window - now))
+
+    def hit(self, key):
+        now = time.monotonic()
+        with self._lock:
+            events = self._prune(key, now)
+            if events is None:
+                events = self._events[key] = deque(maxlen=self.limit)
+            events.append(now)
+            self._events.move_to_end(key)
+            while len(self._events) > self.max_keys:
+                self._events.popitem(last=False)
+
+    def reset(self, key):
+        with self._lock:
+            self._events.pop(key, None)
@@ -2,13 +2,21 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from dotenv import load_dotenv
-from app.core.database import client
+from app.core.database import client, get_async_db, close_async_client, configure_threadpool, DATABASE_NAME
+from app.core.indexes import ensure_indexes
+from app.core.background import start_background_tasks, stop_background_tasks
+from app.core.responses import ORJSONResponse
+from app.core.password_hashing import password_hasher
+from app.utils.upload_utils import UploadLimitMiddleware
+from app.services.video.stream_services import close_http_client
 
 # Import routers
 from app.routes.user import user_routes, payment_transaction_routes, subscription_routes, watch_history_routes, follower_routes, saved_video_routes
-from app.routes.utility import playlist_routes, category_routes, tag_routes
+from app.routes.utility import playlist_routes, category_routes, tag_routes, job_routes, media_routes
 from app.routes.video import comment_routes, like_routes, video_routes, view_routes
 from app.routes.admin import admin_routes
+# Registers the media and cascade deletion job handlers with the job workers
+from app.services.utility import media_jobs, cascade_jobs
 # Note: Old admin subscription routes removed - using new time-based system
 
 load_dotenv()
@@ -16,8 +24,12 @@ load_dotenv()
 app = FastAPI(
     title="VideoHUB API",
     description="Video streaming platform API",
+    default_response_class=ORJSONResponse,
 )
 
+# Cuts oversized upload bodies off while they are received (inside CORS, so its errors carry CORS headers)
+app.add_middleware(UploadLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -38,8 +50,37 @@ def read_root():
 
 # Health check
 @app.get("/health")
-def health_check():
-    return {"status": "healthy"}
+async def health_check():
+    # Runs on the event loop, so it stays responsive when the threadpool is saturated
+    try:
+        await get_async_db().command('ping')
+        database = "connected"
+    except Exception:
+        database = "unavailable"
+    return {"status": "healthy", "database": database}
+
+
+@app.on_event("startup")
+async def on_startup():
+    configure_threadpool()
+    if os.getenv("MONGODB_ENSURE_INDEXES", "true").lower() != "false":
+        result = ensure_indexes(client[DATABASE_NAME])
+        if result['created']:
+            print(f"Created indexes: {', '.join(result['created'])}")
+        if result['mismatched'] or result['retired']:
+            # Rebuilds and drops are left to: python -m app.core.indexes --reconcile
+            print(f"Warning: Indexes to reconcile: {', '.join(result['mismatched'] + result['retired'])}")
+    start_background_tasks()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Final flush of buffered writes happens here
+    stop_background_tasks()
+    password_hasher.shutdown()
+    await close_http_client()
+    await close_async_client()
+    client.close()
 
 
 # Register routers
@@ -55,6 +96,8 @@ app.include_router(saved_video_routes.router)
 app.include_router(playlist_routes.router)
 app.include_router(category_routes.router)
 app.include_router(tag_routes.router)
+app.include_router(job_routes.router)
+app.include_router(media_routes.router)
 
 # Video routes
 app.include_router(comment_routes.router)
@@ -0,0 +1,37 @@
+from bson.objectid import ObjectId
+from app.core.database import get_async_db
+
+# Async reads and writes of comments, awaited by the comment handlers
+
+
+async def insert_comment(comment):
+    """Insert a comment; returns its ID string"""
+    result = await get_async_db()['comments'].insert_one(comment)
+    return str(result.inserted_id)
+
+
+async def find_comment(comment_id):
+    """A comment by ID (None if the ID is invalid or there is no such comment)"""
+    if not ObjectId.is_valid(str(comment_id)):
+        return None
+    return await get_async_db()['comments'].find_one({'_id': ObjectId(str(comment_id))})
+
+
+async def find_comments(query, sort, skip=0, limit=50):
+    """A page of comments matching a filter"""
+    cursor = get_async_db()['comments'].find(query).sort(sort)
+    if skip:
+        cursor = cursor.skip(skip)
+    return await cursor.limit(limit).to_list()
+
+
+async def update_comment_fields(comment_id, fields):
+    """Set fields of a comment; returns the number of modified comments"""
+    result = await get_async_db()['comments'].update_one({'_id': ObjectId(str(comment_id))}, {'$set': fields})
+    return result.modified_count
+
+
+async def delete_comment_by_id(comment_id):
+    """Delete a comment; returns the number of deleted comments"""
+    result = await get_async_db()['comments'].delete_one({'_id': ObjectId(str(comment_id))})
+    return result.deleted_count
@@ -0,0 +1,46 @@
+from pymongo import ReturnDocument
+from app.core.database import get_async_db
+
+# Async reads and flips of the per-(user, video) like documents
+
+
+async def find_like(user_id, video_id):
+    """A user's like document for a video (None if they never reacted)"""
+    return await get_async_db()['likes'].find_one({'user_id': user_id, 'video_id': video_id})
+
+
+async def toggle_reaction(user_id, video_id, like_type, now, session=None):
+    """
+    Toggle a reaction in one atomic upsert: set like_type, or clear it if it is already set.
+
+    Returns:
+        The like document before the flip (None if there was none)
+    """
+    is_same = {'$eq': ['$like_type', like_type]}
+    return await get_async_db()['likes'].find_one_and_update(
+        {'user_id': user_id, 'video_id': video_id},
+        [{'$set': {
+            'like_type': {'$cond': [is_same, None, like_type]},
+            # A new or switched reaction starts now; toggling off keeps its time
+            'created_at': {'$cond': [is_same, '$created_at', now]},
+            'updated_at': now
+        }}],
+        upsert=True,
+        return_document=ReturnDocument.BEFORE,
+        session=session
+    )
+
+
+async def clear_reaction(user_id, video_id, like_types, now, session=None):
+    """
+    Clear a reaction of one of like_types, leaving a tombstone (like_type None).
+
+    Returns:
+        The like document before it was cleared (None if there was no such reaction)
+    """
+    return await get_async_db()['likes'].find_one_and_update(
+        {'user_id': user_id, 'video_id': video_id, 'like_type': {'$in': list(like_types)}},
+        {'$set': {'like_type': None, 'updated_at': now}},
+        return_document=ReturnDocument.BEFORE,
+        session=session
+    )
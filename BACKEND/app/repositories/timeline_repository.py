@@ -0,0 +1,23 @@
+from app.core.database import get_async_db
+from app.utils.pagination_utils import apply_cursor, cursor_sort
+
+# Async reads of the fanned-out following timelines (timeline_entries)
+
+
+async def find_timeline_entries(user_id, cursor=None, limit=20):
+    """A page of a user's timeline entries, newest first ({video_id: created_at}, in order)"""
+    entries = get_async_db()['timeline_entries'].find(
+        apply_cursor({'user_id': user_id}, cursor, 'created_at', 'video_id'),
+        {'video_id': 1, 'created_at': 1}
+    ).sort(cursor_sort('created_at', 'video_id')).limit(limit)
+    return {entry['video_id']: entry.get('created_at') for entry in await entries.to_list()}
+
+
+async def trim_timeline(user_id, max_entries):
+    """Delete the entries beyond max_entries of a user's timeline"""
+    collection = get_async_db()['timeline_entries']
+    overflow = await collection.find({'user_id': user_id}, {'created_at': 1}).sort(
+        cursor_sort('created_at', 'video_id')
+    ).skip(max_entries).limit(1).to_list()
+    if overflow:
+        await collection.delete_many({'user_id': user_id, 'created_at': {'$lte': overflow[0]['created_at']}})
@@ -0,0 +1,38 @@
+from bson.objectid import ObjectId
+from app.core.database import get_async_db
+
+# Async reads of users and follow relations, awaited by handlers on the event loop
+
+
+async def find_users_by_ids(user_ids, fields):
+    """
+    Fetch several users with a single projected $in query.
+
+    Args:
+        user_ids: Iterable of user ID strings (duplicates and invalid IDs are ignored)
+        fields: User document fields to project
+
+    Returns:
+        Dict mapping user ID string to the projected user document
+    """
+    object_ids = {ObjectId(user_id) for user_id in user_ids
+                  if user_id and ObjectId.is_valid(str(user_id))}
+    if not object_ids:
+        return {}
+    cursor = get_async_db()['users'].find({'_id': {'$in': list(object_ids)}}, {field: 1 for field in fields})
+    return {str(user['_id']): user for user in await cursor.to_list()}
+
+
+async def find_user_ids(query):
+    """ID strings of the users matching a filter"""
+    cursor = get_async_db()['users'].find(query, {'_id': 1})
+    return [str(user['_id']) for user in await cursor.to_list()]
+
+
+async def find_followed_ids(follower_id, following_ids):
+    """The channels among following_ids that follower_id actively follows"""
+    cursor = get_async_db()['followers'].find(
+        {'follower_id': follower_id, 'following_id': {'$in': list(following_ids)}, 'status': 'active'},
+        {'following_id': 1}
+    )
+    return [follow['following_id'] for follow in await cursor.to_list()]
@@ -0,0 +1,70 @@
+from bson.objectid import ObjectId
+from app.core.database import get_async_db
+
+# Async reads of videos and the collections derived from them (counter shards,
+# rankings), awaited by the feed and details handlers on the event loop
+
+
+async def find_video(video_id, projection=None):
+    """A video by ID (None if the ID is invalid or there is no such video)"""
+    if not ObjectId.is_valid(str(video_id)):
+        return None
+    return await get_async_db()['videos'].find_one({'_id': ObjectId(str(video_id))}, projection)
+
+
+async def find_videos(query, projection=None, sort=None, skip=0, limit=0):
+    """
+    A page of videos matching a filter.
+
+    Args:
+        query: The filter
+        projection: Fields to return
+        sort: Sort specification (a field or a list of (field, direction))
+        skip: Number of documents to skip
+        limit: Maximum number of documents (0 for no limit)
+    """
+    cursor = get_async_db()['videos'].find(query, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    if skip:
+        cursor = cursor.skip(skip)
+    if limit:
+        cursor = cursor.limit(limit)
+    return await cursor.to_list()
+
+
+async def find_published_videos(video_ids, projection=None):
+    """Published videos among video_ids, by video ID string (invalid IDs are ignored)"""
+    object_ids = [ObjectId(video_id) for video_id in video_ids if ObjectId.is_valid(video_id)]
+    if not object_ids:
+        return {}
+    cursor = get_async_db()['videos'].find({'_id': {'$in': object_ids}, 'status': 'published'}, projection)
+    return {str(video['_id']): video for video in await cursor.to_list()}
+
+
+async def aggregate_videos(pipeline):
+    """Run an aggregation pipeline on the videos"""
+    cursor = await get_async_db()['videos'].aggregate(pipeline)
+    return await cursor.to_list()
+
+
+async def sum_counter_shards(video_ids, fields):
+    """Summed counter shard values of videos, one row per video with any shard ({'_id': video_id, field: sum})"""
+    cursor = await get_async_db()['video_counters'].aggregate([
+        {'$match': {'video_id': {'$in': list(video_ids)}}},
+        {'$group': {'_id': '$video_id', **{field: {'$sum': f'${field}'} for field in fields}}},
+    ])
+    return await cursor.to_list()
+
+
+async def find_top_ranked_video_ids(score_field, limit):
+    """Video IDs with the highest positive score_field in the materialized rankings, best first"""
+    cursor = get_async_db()['video_rankings'].find(
+        {score_field: {'$gt': 0}}, {'_id': 1}
+    ).sort(score_field, -1).limit(limit)
+    return [ranking['_id'] for ranking in await cursor.to_list()]
+
+
+async def upsert_counter_shard(shard_filter, update, session=None):
+    """Apply an increment to a counter shard, creating the shard if needed"""
+    await get_async_db()['video_counters'].update_one(shard_filter, update, upsert=True, session=session)
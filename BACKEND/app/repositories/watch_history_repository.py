@@ -0,0 +1,20 @@
+from pymongo import ReturnDocument
+from app.core.database import get_async_db
+
+# Async writes of watch history rows, awaited by the watch progress handlers
+
+
+async def upsert_watch_progress(progress_filter, update):
+    """
+    Upsert one watch history row.
+
+    Returns:
+        The completion state of the row before the write (None if it was inserted)
+    """
+    return await get_async_db()['watch_history'].find_one_and_update(
+        progress_filter,
+        update,
+        upsert=True,
+        return_document=ReturnDocument.BEFORE,
+        projection={'is_completed': 1}
+    )
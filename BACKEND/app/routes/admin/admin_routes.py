@@ -1,9 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
-from app.core.security import get_admin_user, get_current_user
-from app.core.database import client
-from app.core.cloudinary_config import delete_from_cloudinary, extract_public_id_from_url
+from app.core.security import get_admin_user, get_current_user, invalidate_account_status
+from app.core.database import client, DATABASE_NAME
+from app.services.utility.media_services import enqueue_metadata_extraction
+from app.services.utility.cascade_services import enqueue_video_deletion, video_snapshot, VIDEO_ASSET_FIELDS
+from app.core.storage import with_asset_refs, ASSET_FIELDS
 from app.services.utility.category_services import update_category_video_count
 from app.services.utility.tag_services import update_tag_video_count
+from app.utils.hydration_utils import get_users_by_ids
+from app.utils.pagination_utils import apply_cursor, cursor_sort, build_next_cursor
+from app.core.indexes import ensure_indexes, get_index_report
+from app.services.video.view_aggregator import view_aggregator
+from app.services.video.like_services import reconcile_like_counts
+from app.services.video.analytics_services import rollup_views
+from app.services.video.video_services import invalidate_video_cache, sync_timelines
+from app.services.video.timeline_services import enqueue_fanout
+from app.core.cache import response_cache, CATEGORIES_TAG, TAGS_TAG
+from app.core.responses import ORJSONResponse
+from app.services.video.search_services import (
+    SEARCH_FIELDS_PROJECTION,
+    build_search_fields,
+    needs_search_refresh,
+    refresh_search_fields,
+    rebuild_search_index,
+    search_videos
+)
 from bson import ObjectId
 from datetime import datetime
 
@@ -12,7 +32,7 @@ router = APIRouter(
     tags=['Admin']
 )
 
-db = client['videohub']
+db = client[DATABASE_NAME]
 
 @router.get('/verify')
 def verify_admin(current_user: dict = Depends(get_admin_user)):
@@ -38,15 +58,33 @@ def get_platform_stats(current_user: dict = Depends(get_admin_user)):
         "requested_by": current_user['email']
     }
 
+@router.get('/indexes')
+def get_indexes_report(current_user: dict = Depends(get_admin_user)):
+    """Report missing, undeclared and unused indexes (admin only)"""
+    return get_index_report(db)
+
+@router.post('/indexes/sync')
+def sync_indexes(current_user: dict = Depends(get_admin_user)):
+    """Create any declared indexes that are missing (admin only)"""
+    return ensure_indexes(db)
+
+@router.get('/metrics/views')
+def get_view_ingestion_metrics(current_user: dict = Depends(get_admin_user)):
+    """View aggregator flush metrics (admin only)"""
+    return view_aggregator.get_stats()
+
 @router.get('/users')
-def list_all_users(current_user: dict = Depends(get_admin_user), skip: int = 0, limit: int = 50):
+def list_all_users(current_user: dict = Depends(get_admin_user), skip: int = 0, limit: int = 50, cursor: str = None):
     """List all users (admin only)"""
-    users = list(db['users'].find({}, {'hashed_password': 0}).skip(skip).limit(limit))
+    # Oldest first by _id, the order users were inserted in
+    query = apply_cursor({}, cursor, '_id', direction=1)
+    users = list(db['users'].find(query, {'hashed_password': 0})
+                 .sort(cursor_sort('_id', direction=1))
+                 .skip(skip)
+                 .limit(limit))
     
-    # Convert ObjectId to string and add subscription info
+    # Add subscription info (ObjectIds are rendered by ORJSONResponse)
     for user in users:
-        user['_id'] = str(user['_id'])
-        
         # Check subscription status
         user_id_str = str(user['_id'])
         subscription = db['time_subscriptions'].find_one({'user_id': user_id_str})
@@ -59,12 +97,13 @@ def list_all_users(current_user: dict = Depends(get_admin_user), skip: int = 0,
             user['has_active_subscription'] = False
             user['subscription_expires_at'] = None
     
-    return {
+    return ORJSONResponse({
         "users": users,
         "count": len(users),
         "skip": skip,
-        "limit": limit
-    }
+        "limit": limit,
+        "next_cursor": build_next_cursor(users, limit, '_id', '_id')
+    })
 
 @router.get('/users/{user_id}')
 def get_user_details(user_id: str, current_user: dict = Depends(get_admin_user)):
@@ -121,6 +160,7 @@ def ban_user(user_id: str, current_user: dict = Depends(get_admin_user)):
         )
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
+        invalidate_account_status(user_id)
         return {"message": "User banned successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -135,6 +175,7 @@ def unban_user(user_id: str, current_user: dict = Depends(get_admin_user)):
         )
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
+        invalidate_account_status(user_id)
         return {"message": "User unbanned successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -149,6 +190,7 @@ def promote_to_admin(user_id: str, current_user: dict = Depends(get_admin_user))
         )
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
+        invalidate_account_status(user_id)
         return {"message": "User promoted to admin successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -163,6 +205,7 @@ def demote_from_admin(user_id: str, current_user: dict = Depends(get_admin_user)
         )
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
+        invalidate_account_status(user_id)
         return {"message": "User demoted to regular user successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -179,7 +222,7 @@ def get_user_subscriptions(user_id: str, current_user: dict = Depends(get_admin_
         
         # Get subscription history for this user
         from app.core.database import client
-        db = client['videohub']
+        db = client[DATABASE_NAME]
         history_records = list(db['subscription_history'].find({'user_id': user_id})
                               .sort('created_at', -1))
         
@@ -318,7 +361,8 @@ def list_all_videos(
     limit: int = 50,
     status: str = None,
     search: str = None,
-    category: str = None
+    category: str = None,
+    cursor: str = None
 ):
     """List all videos with filters (admin only)"""
     try:
@@ -327,34 +371,36 @@ def list_all_videos(
         if status:
             query['status'] = status
         
-        if search:
-            query['$or'] = [
-                {'title': {'$regex': search, '$options': 'i'}},
-                {'description': {'$regex': search, '$options': 'i'}}
-            ]
-        
         if category:
             query['categories'] = category
         
-        videos = list(db['videos'].find(query)
-                     .sort('created_at', -1)
-                     .skip(skip)
-                     .limit(limit))
-        
+        if search:
+            videos = search_videos(db, search, query, skip, limit)
+        else:
+            query = apply_cursor(query, cursor, 'created_at')
+            videos = list(db['videos'].find(query, SEARCH_FIELDS_PROJECTION)
+                         .sort(cursor_sort('created_at'))
+                         .skip(skip)
+                         .limit(limit))
+        
+        # Get uploader info for the whole page in one query
+        uploaders = get_users_by_ids(
+            {str(video['uploader_id']) for video in videos if video.get('uploader_id')},
+            db,
+            ['display_name']
+        )
         for video in videos:
-            video['_id'] = str(video['_id'])
-            # Get uploader info
-            if video.get('uploader_id'):
-                uploader = db['users'].find_one({'_id': ObjectId(video['uploader_id'])})
-                if uploader:
-                    video['uploader_name'] = uploader.get('display_name', 'Unknown')
+            uploader = uploaders.get(str(video.get('uploader_id')))
+            if uploader:
+                video['uploader_name'] = uploader.get('display_name', 'Unknown')
         
-        return {
+        return ORJSONResponse({
             "videos": videos,
             "count": len(videos),
             "skip": skip,
-            "limit": limit
-        }
+            "limit": limit,
+            "next_cursor": None if search else build_next_cursor(videos, limit, 'created_at', '_id')
+        })
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -376,6 +422,8 @@ def create_admin_video(
         video_dict['favorites_count'] = 0
         video_dict['created_at'] = datetime.now()
         video_dict['published_at'] = datetime.now() if video_dict['status'] == 'published' else None
+        video_dict.update(build_search_fields(video_dict))
+        video_dict.update(with_asset_refs(video_dict, VIDEO_ASSET_FIELDS))
         
         result = db['videos'].insert_one(video_dict)
         
@@ -389,6 +437,16 @@ def create_admin_video(
             for tag_slug in video_dict['tags']:
                 update_tag_video_count(tag_slug, 1)
         
+        # Duration/format come from storage in the background when not supplied
+        if video_dict.get('video_url') and not video_dict.get('duration'):
+            enqueue_metadata_extraction(
+                str(result.inserted_id), video_dict.get(ASSET_FIELDS['video_url']), current_user['user_id']
+            )
+        
+        if video_dict['status'] == 'published':
+            enqueue_fanout(result.inserted_id, current_user['user_id'])
+        
+        invalidate_video_cache()
         return {"message": "Video created successfully", "video_id": str(result.inserted_id)}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -413,6 +471,7 @@ def update_admin_video(
         
         # Add updated_at timestamp
         update_data['updated_at'] = datetime.utcnow()
+        update_data.update(with_asset_refs(update_data, VIDEO_ASSET_FIELDS))
         
         # Update categories count if changed
         old_categories = set(old_video.get('categories', []))
@@ -444,6 +503,10 @@ def update_admin_video(
         )
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Video not found")
+        if needs_search_refresh(update_data):
+            refresh_search_fields(video_id, db)
+        sync_timelines(video_id, old_video.get('status'), update_data.get('status'), current_user['user_id'])
+        invalidate_video_cache(video_id)
         return {"message": "Video updated successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -460,42 +523,15 @@ def delete_admin_video(
         if not video:
             raise HTTPException(status_code=404, detail="Video not found")
         
-        # Delete video file from Cloudinary if it exists
-        if video.get('video_url'):
-            video_public_id = extract_public_id_from_url(video['video_url'])
-            if video_public_id:
-                try:
-                    delete_from_cloudinary(video_public_id, resource_type="video")
-                except Exception as e:
-                    # Log but don't fail the deletion if Cloudinary delete fails
-                    print(f"Warning: Failed to delete video from Cloudinary: {str(e)}")
-        
-        # Delete thumbnail from Cloudinary if it exists
-        if video.get('thumbnail_url'):
-            thumbnail_public_id = extract_public_id_from_url(video['thumbnail_url'])
-            if thumbnail_public_id:
-                try:
-                    delete_from_cloudinary(thumbnail_public_id, resource_type="image")
-                except Exception as e:
-                    # Log but don't fail the deletion if Cloudinary delete fails
-                    print(f"Warning: Failed to delete thumbnail from Cloudinary: {str(e)}")
-        
         # Delete the video from database
         result = db['videos'].delete_one({'_id': ObjectId(video_id)})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Video not found")
         
-        # Decrement category video counts
-        if video.get('categories'):
-            for category_slug in video['categories']:
-                update_category_video_count(category_slug, -1)
-        
-        # Decrement tag video counts
-        if video.get('tags'):
-            for tag_slug in video['tags']:
-                update_tag_video_count(tag_slug, -1)
-        
-        return {"message": "Video deleted successfully"}
+        # Storage deletes, dependent documents and category/tag counts are handled by the job workers
+        job_id = enqueue_video_deletion([video_snapshot(video_id, video)], current_user['user_id'])
+        invalidate_video_cache(video_id)
+        return {"message": "Video deleted successfully", "job_id": job_id}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -522,7 +558,7 @@ def get_video_full_details(
 ):
     """Get full video details with all statistics (admin only)"""
     try:
-        video = db['videos'].find_one({'_id': ObjectId(video_id)})
+        video = db['videos'].find_one({'_id': ObjectId(video_id)}, SEARCH_FIELDS_PROJECTION)
         if not video:
             raise HTTPException(status_code=404, detail="Video not found")
         
@@ -551,6 +587,32 @@ def get_video_full_details(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post('/search/reindex')
+def reindex_search(current_user: dict = Depends(get_admin_user)):
+    """Rebuild search fields for every video (admin only)"""
+    try:
+        updated = rebuild_search_index(db)
+        return {"message": "Search index rebuilt successfully", "videos_updated": updated}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post('/likes/reconcile')
+def reconcile_likes(current_user: dict = Depends(get_admin_user)):
+    """Recount likes/dislikes of every video from the likes collection (admin only)"""
+    try:
+        result = reconcile_like_counts(full=True)
+        return {"message": "Like counts reconciled successfully", **result}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post('/analytics/rollup')
+def run_analytics_rollup(current_user: dict = Depends(get_admin_user)):
+    """Roll up settled views into the hourly/daily video statistics now (admin only)"""
+    folded = rollup_views()
+    if folded is None:
+        raise HTTPException(status_code=409, detail="A rollup is already running")
+    return {"message": "Analytics rolled up", "views_folded": folded}
+
 @router.post('/sync-video-counts')
 def sync_video_counts(current_user: dict = Depends(get_admin_user)):
     """Recalculate and sync video counts for all categories and tags (admin only)"""
@@ -593,6 +655,7 @@ def sync_video_counts(current_user: dict = Depends(get_admin_user)):
                 {'$set': {'video_count': count}}
             )
         
+        response_cache.invalidate(CATEGORIES_TAG, TAGS_TAG)
         return {
             "message": "Video counts synchronized successfully",
             "categories_updated": len(categories_count),
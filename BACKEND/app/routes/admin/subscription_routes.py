@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from app.core.security import get_admin_user
+from app.core.cache import response_cache, PLANS_TAG, plan_tag
 from app.services.admin.subscription_services import (
     get_all_subscription_plans,
     create_subscription_plan,
@@ -69,6 +70,7 @@ def create_plan(plan_data: PlanCreate, admin: dict = Depends(get_admin_user)):
     """Create a new subscription plan"""
     plan_dict = plan_data.dict()
     plan_id = create_subscription_plan(plan_dict)
+    response_cache.invalidate(PLANS_TAG)
     return {
         "message": "Plan created successfully",
         "plan_id": plan_id
@@ -82,6 +84,7 @@ def update_plan(plan_id: str, plan_data: PlanUpdate, admin: dict = Depends(get_a
     updated = update_subscription_plan(plan_id, update_dict)
     if not updated:
         raise HTTPException(status_code=404, detail="Plan not found")
+    response_cache.invalidate(PLANS_TAG, plan_tag(plan_id))
     return {
         "message": "Plan updated successfully",
         "plan": updated
@@ -94,6 +97,7 @@ def delete_plan(plan_id: str, admin: dict = Depends(get_admin_user)):
     success = delete_subscription_plan(plan_id)
     if not success:
         raise HTTPException(status_code=404, detail="Plan not found")
+    response_cache.invalidate(PLANS_TAG, plan_tag(plan_id))
     return {"message": "Plan deleted successfully"}
 
 
@@ -125,10 +129,10 @@ def get_subscription_history(
     admin: dict = Depends(get_admin_user)
 ):
     """Get all subscription history"""
-    from app.core.database import client
+    from app.core.database import client, DATABASE_NAME
     from datetime import datetime
     
-    db = client['videohub']
+    db = client[DATABASE_NAME]
     history_records = list(db['subscription_history'].find()
                           .sort('created_at', -1)
                           .skip(skip)
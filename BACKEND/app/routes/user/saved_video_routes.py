@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, status, Query
+from typing import Optional
 from app.core.security import get_current_user
 from app.schemas.user.saved_video_schemas import SavedVideoResponse
 from app.services.user import saved_video_services
@@ -34,16 +35,18 @@ def get_save_status_endpoint(video_id: str, current_user: dict = Depends(get_cur
 def get_my_saved_videos(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     """Get user's saved videos with details"""
     user_id = current_user['user_id']
-    videos = saved_video_services.get_user_saved_videos(user_id, skip, limit)
+    videos, next_cursor = saved_video_services.get_user_saved_videos(user_id, skip, limit, cursor)
     total_count = saved_video_services.get_saved_videos_count(user_id)
     
     return {
         "videos": videos,
         "count": len(videos),
-        "total": total_count
+        "total": total_count,
+        "next_cursor": next_cursor
     }
 
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from app.core.security import get_current_user
+from app.core.cache import response_cache, PLANS_TAG, plan_tag
 from app.services.user.subscription_services import (
     get_subscription_status,
     subscribe_user,
@@ -61,7 +62,12 @@ def get_plans():
     """
     Get all available subscription plans (public endpoint)
     """
-    plans = get_all_plans()
+    plans = response_cache.get_or_set(
+        'plans:active',
+        get_all_plans,
+        ttl=300,
+        tags=lambda plans: [PLANS_TAG] + [plan_tag(plan['plan_id']) for plan in plans]
+    )
     return {
         "plans": plans,
         "total": len(plans)
@@ -1,31 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request
 from app.schemas.user.user_schemas import UserPublic
 from app.schemas.user.user_schemas import UserRegister, UserLogin, UserPrivate, UserUpdate
 from app.services.user.user_services import register, login, get_user_by_id, update_user, delete_user
 from app.core.security import get_current_user  # For authentication
-from app.core.database import client
+from app.core.database import client, DATABASE_NAME
 from datetime import datetime
-import cloudinary.uploader
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from bson.objectid import ObjectId
-from app.core.cloudinary_config import delete_from_cloudinary, extract_public_id_from_url
+from app.core.storage import storage_for, get_asset_ref
+from app.services.utility.media_services import queue_upload, enqueue_asset_deletion
+from app.utils.upload_utils import check_upload_size, MAX_AVATAR_UPLOAD_BYTES
 
 
 
-db = client['videohub']
+db = client[DATABASE_NAME]
 
 router = APIRouter(
     prefix ='/users',
     tags= ['Users']
 )
 
+# Square face-centered crop applied to every avatar
+AVATAR_TRANSFORMATION = [
+    {'width': 400, 'height': 400, 'crop': 'fill', 'gravity': 'face'},
+    {'quality': 'auto', 'fetch_format': 'auto'}
+]
+
 @router.post("/register")
 def register_user(user_credentials: UserRegister):
     result = register(user_credentials)
     return result
 
 @router.post("/login")
-def login_user(user_credentials: UserLogin):
-    result = login(user_credentials)
+def login_user(user_credentials: UserLogin, request: Request):
+    result = login(user_credentials, request.client.host if request.client else None)
     if not result:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     return result
@@ -62,9 +71,15 @@ def delete_user_account(current_user: dict = Depends(get_current_user)):
 @router.post('/me/avatar')
 async def upload_avatar(
     file: UploadFile = File(...),
+    defer: bool = False,
     current_user: dict = Depends(get_current_user)
 ):
-    """Upload user avatar image"""
+    """
+    Upload user avatar image
+
+    The avatar is stored during the request; with defer=true it is stored by
+    the job workers and a job_id to poll at /jobs/{job_id} is returned.
+    """
     # Validate file type
     allowed_types = ['image/jpeg', 'image/jpg', 'image/png', 'image/gif', 'image/webp']
     if file.content_type not in allowed_types:
@@ -73,21 +88,22 @@ async def upload_avatar(
             detail="Invalid file type. Only JPEG, PNG, GIF, and WebP images are allowed."
         )
     
-    # Validate file size (max 5MB)
-    file_content = await file.read()
-    if len(file_content) > 5 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="File size too large. Maximum size is 5MB.")
-    
+    # Validate file size (max 5MB; the body was already cut off at the limit while received)
+    check_upload_size(file, MAX_AVATAR_UPLOAD_BYTES)
+
+    if defer:
+        job_id = await run_in_threadpool(
+            queue_upload, file.file, file.filename or "", "image", "videohub/avatars", current_user['user_id'],
+            options={'transformation': AVATAR_TRANSFORMATION},
+            target_user_id=current_user['user_id'], user_field='profile_picture'
+        )
+        return JSONResponse(status_code=202, content={"message": "Avatar upload queued", "job_id": job_id})
+
     try:
-        # Upload to Cloudinary
-        upload_result = cloudinary.uploader.upload(
-            file_content,
-            folder="videohub/avatars",
-            resource_type="image",
-            transformation=[
-                {'width': 400, 'height': 400, 'crop': 'fill', 'gravity': 'face'},
-                {'quality': 'auto', 'fetch_format': 'auto'}
-            ]
+        # Upload to storage off the event loop
+        upload_result = await run_in_threadpool(
+            storage_for("image").upload_stream, file.file, file.filename or "", resource_type="image",
+            folder="videohub/avatars", transformation=AVATAR_TRANSFORMATION
         )
 
         profile_picture = upload_result.get('secure_url')
@@ -98,6 +114,7 @@ async def upload_avatar(
             {
                 '$set': {
                     'profile_picture': profile_picture,
+                    'profile_picture_asset': upload_result.get('asset'),
                     'updated_at': datetime.utcnow()
                 }
             }
@@ -119,31 +136,16 @@ def delete_avatar(current_user: dict = Depends(get_current_user)):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Delete avatar from Cloudinary if it exists
+    # Delete avatar from storage on the job workers
     if user.get('profile_picture'):
-        avatar_url = user['profile_picture']
-        print(f"Attempting to delete avatar from Cloudinary: {avatar_url}")
-
-        avatar_public_id = extract_public_id_from_url(avatar_url)
-        print(f"Extracted public_id: {avatar_public_id}")
-
-        if avatar_public_id:
-            try:
-                result = delete_from_cloudinary(avatar_public_id, resource_type="image")
-                print(f"Cloudinary deletion result: {result}")
-            except Exception as e:
-                # Log but don't fail the deletion if Cloudinary delete fails
-                print(f"Warning: Failed to delete avatar from Cloudinary: {str(e)}")
-                # For debugging, let's raise the error to see what happens
-                raise HTTPException(status_code=500, detail=f"Failed to delete from Cloudinary: {str(e)}")
-        else:
-            print(f"Warning: Could not extract public_id from URL: {avatar_url}")
+        if not enqueue_asset_deletion(get_asset_ref(user, 'profile_picture', 'image'), current_user['user_id']):
+            print(f"Warning: Avatar is not a stored asset: {user['profile_picture']}")
 
     # Remove avatar from database
     db['users'].update_one(
         {'_id': ObjectId(current_user['user_id'])},
         {
-            '$unset': {'profile_picture': ''},
+            '$unset': {'profile_picture': '', 'profile_picture_asset': ''},
             '$set': {'updated_at': datetime.utcnow()}
         }
     )
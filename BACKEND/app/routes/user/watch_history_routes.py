@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
 from app.schemas.user.watch_history_schemas import WatchHistoryUpdate, WatchHistoryResponse
 from app.services.user.watch_history_services import (
     get_user_watch_history,
@@ -8,21 +9,22 @@ from app.services.user.watch_history_services import (
     clear_watch_history
 )
 from app.core.security import get_current_user
+from app.utils.pagination_utils import build_next_cursor
 
 router = APIRouter(prefix="/watch-history", tags=["Watch History"])
 
 
 @router.get("/me")
-def get_my_watch_history(skip: int = 0, limit: int = 20, current_user: dict = Depends(get_current_user)):
+def get_my_watch_history(skip: int = 0, limit: int = 20, cursor: Optional[str] = None, current_user: dict = Depends(get_current_user)):
     """Get current user's watch history"""
-    history = get_user_watch_history(current_user['user_id'], skip, limit)
-    return {"history": history, "count": len(history)}
+    history = get_user_watch_history(current_user['user_id'], skip, limit, cursor)
+    return {"history": history, "count": len(history), "next_cursor": build_next_cursor(history, limit, 'last_watched_at')}
 
 
 @router.put("/{video_id}")
-def update_video_watch_progress(video_id: int, watch_data: WatchHistoryUpdate, current_user: dict = Depends(get_current_user)):
+async def update_video_watch_progress(video_id: int, watch_data: WatchHistoryUpdate, current_user: dict = Depends(get_current_user)):
     """Update watch progress for a video"""
-    result = update_watch_progress(video_id, current_user['user_id'], watch_data)
+    result = await update_watch_progress(video_id, current_user['user_id'], watch_data)
     return {"message": "Watch progress updated", "result": result}
 
 
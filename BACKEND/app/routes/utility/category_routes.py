@@ -5,6 +5,7 @@ from app.services.utility.category_services import (
     get_category_by_slug, update_category, delete_category
 )
 from app.core.security import get_admin_user, get_current_user
+from app.core.cache import response_cache, CATEGORIES_TAG, category_tag
 from typing import List
 
 router = APIRouter(
@@ -29,7 +30,12 @@ def list_categories(
     active_only: bool = Query(False)
 ):
     """Get all categories"""
-    return get_all_categories(skip, limit, active_only)
+    return response_cache.get_or_set(
+        f"categories:{skip}:{limit}:{active_only}",
+        lambda: get_all_categories(skip, limit, active_only),
+        ttl=300,
+        tags=lambda categories: [CATEGORIES_TAG] + [category_tag(item['id']) for item in categories]
+    )
 
 
 @router.get('/{category_id}', response_model=CategoryResponse)
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.core.security import get_current_user
+from app.core.jobs import get_job
+
+router = APIRouter(
+    prefix='/jobs',
+    tags=['Jobs']
+)
+
+
+@router.get('/{job_id}')
+def get_job_status(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Get the status of a background job (owner or admin)"""
+    job = get_job(job_id)
+    if not job or (job.get('user_id') != current_user['user_id'] and not current_user.get('is_admin', False)):
+        raise HTTPException(status_code=404, detail="Job not found")
+    # Payloads hold server-side paths and storage IDs
+    job.pop('payload', None)
+    return job
@@ -0,0 +1,15 @@
+from typing import Optional
+from fastapi import APIRouter, Request
+from app.services.video.stream_services import serve_local_media
+
+# Serves the files of the local storage backend at LOCAL_STORAGE_BASE_URL
+router = APIRouter(
+    prefix='/media',
+    tags=['Media']
+)
+
+
+@router.get('/{key:path}')
+def get_media_file(key: str, request: Request, expires: Optional[str] = None, signature: Optional[str] = None):
+    """Serve a locally stored file (videos need the expires/signature of a signed URL)"""
+    return serve_local_media(key, request.headers, expires, signature)
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
 from app.schemas.utility.playlist_schemas import PlaylistCreate, PlaylistUpdate, PlaylistVideoAction
 from app.services.utility.playlist_services import (
     create_playlist,
@@ -11,6 +12,7 @@ from app.services.utility.playlist_services import (
     remove_video_from_playlist
 )
 from app.core.security import get_current_user
+from app.utils.pagination_utils import build_next_cursor
 
 router = APIRouter(prefix="/playlists", tags=["Playlists"])
 
@@ -23,17 +25,17 @@ def create_user_playlist(playlist_data: PlaylistCreate, current_user: dict = Dep
 
 
 @router.get("/")
-def get_public_playlists(skip: int = 0, limit: int = 20):
+def get_public_playlists(skip: int = 0, limit: int = 20, cursor: Optional[str] = None):
     """Get all public playlists"""
-    playlists = get_all_playlists(skip, limit)
-    return {"playlists": playlists, "count": len(playlists)}
+    playlists = get_all_playlists(skip, limit, cursor)
+    return {"playlists": playlists, "count": len(playlists), "next_cursor": build_next_cursor(playlists, limit, 'created_at')}
 
 
 @router.get("/me")
-def get_my_playlists(skip: int = 0, limit: int = 20, current_user: dict = Depends(get_current_user)):
+def get_my_playlists(skip: int = 0, limit: int = 20, cursor: Optional[str] = None, current_user: dict = Depends(get_current_user)):
     """Get current user's playlists"""
-    playlists = get_user_playlists(current_user['user_id'], skip, limit, include_private=True)
-    return {"playlists": playlists, "count": len(playlists)}
+    playlists = get_user_playlists(current_user['user_id'], skip, limit, include_private=True, cursor=cursor)
+    return {"playlists": playlists, "count": len(playlists), "next_cursor": build_next_cursor(playlists, limit, 'created_at')}
 
 
 @router.get("/{playlist_id}")
@@ -80,7 +82,7 @@ def remove_video_from_user_playlist(playlist_id: str, video_id: int, current_use
 
 
 @router.get("/user/{user_id}")
-def get_playlists_by_user(user_id: str, skip: int = 0, limit: int = 20):
+def get_playlists_by_user(user_id: str, skip: int = 0, limit: int = 20, cursor: Optional[str] = None):
     """Get all public playlists by a user"""
-    playlists = get_user_playlists(user_id, skip, limit, include_private=False)
-    return {"playlists": playlists, "count": len(playlists)}
+    playlists = get_user_playlists(user_id, skip, limit, include_private=False, cursor=cursor)
+    return {"playlists": playlists, "count": len(playlists), "next_cursor": build_next_cursor(playlists, limit, 'created_at')}
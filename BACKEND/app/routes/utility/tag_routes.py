@@ -5,6 +5,7 @@ from app.services.utility.tag_services import (
     get_tag_by_slug, update_tag, delete_tag
 )
 from app.core.security import get_admin_user, get_current_user
+from app.core.cache import response_cache, TAGS_TAG, tag_tag
 from typing import List
 
 router = APIRouter(
@@ -28,7 +29,12 @@ def list_tags(
     active_only: bool = Query(False)
 ):
     """Get all tags"""
-    return get_all_tags(skip, limit, active_only)
+    return response_cache.get_or_set(
+        f"tags:{skip}:{limit}:{active_only}",
+        lambda: get_all_tags(skip, limit, active_only),
+        ttl=300,
+        tags=lambda tags: [TAGS_TAG] + [tag_tag(item['id']) for item in tags]
+    )
 
 
 @router.get('/{tag_id}', response_model=TagResponse)
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
 from app.schemas.video.like_schemas import LikeCreate
 from app.services.video.like_services import (
     create_like,
@@ -13,16 +14,16 @@ router = APIRouter(prefix="/likes", tags=["Likes"])
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-def like_or_dislike_video(like_data: LikeCreate, current_user: dict = Depends(get_current_user)):
+async def like_or_dislike_video(like_data: LikeCreate, current_user: dict = Depends(get_current_user)):
     """Like or dislike a video"""
-    result = create_like(like_data, current_user['user_id'])
+    result = await create_like(like_data, current_user['user_id'])
     return result
 
 
 @router.delete("/{video_id}")
-def remove_like_from_video(video_id: str, current_user: dict = Depends(get_current_user)):
+async def remove_like_from_video(video_id: str, current_user: dict = Depends(get_current_user)):
     """Remove like/dislike from video"""
-    success = remove_like(video_id, current_user['user_id'])
+    success = await remove_like(video_id, current_user['user_id'])
     if not success:
         raise HTTPException(status_code=404, detail="Like not found")
     return {"message": "Like removed successfully"}
@@ -36,21 +37,21 @@ def get_likes_for_video(video_id: str, skip: int = 0, limit: int = 100):
 
 
 @router.get("/me")
-def get_my_liked_videos_list(skip: int = 0, limit: int = 20, current_user: dict = Depends(get_current_user)):
+def get_my_liked_videos_list(skip: int = 0, limit: int = 20, cursor: Optional[str] = None, current_user: dict = Depends(get_current_user)):
     """Get videos liked by current user"""
-    videos = get_user_liked_videos(current_user['user_id'], skip, limit)
-    return {"videos": videos, "count": len(videos)}
+    videos, next_cursor = get_user_liked_videos(current_user['user_id'], skip, limit, cursor)
+    return {"videos": videos, "count": len(videos), "next_cursor": next_cursor}
 
 
 @router.get("/user/{user_id}")
-def get_user_liked_videos_list(user_id: str, skip: int = 0, limit: int = 20):
+def get_user_liked_videos_list(user_id: str, skip: int = 0, limit: int = 20, cursor: Optional[str] = None):
     """Get videos liked by a specific user"""
-    videos = get_user_liked_videos(user_id, skip, limit)
-    return {"videos": videos, "count": len(videos)}
+    videos, next_cursor = get_user_liked_videos(user_id, skip, limit, cursor)
+    return {"videos": videos, "count": len(videos), "next_cursor": next_cursor}
 
 
 @router.get("/video/{video_id}/status")
-def get_user_like_status(video_id: str, current_user: dict = Depends(get_current_user)):
+async def get_user_like_status(video_id: str, current_user: dict = Depends(get_current_user)):
     """Check if current user liked/disliked this video"""
-    status_result = get_like_status(video_id, current_user['user_id'])
+    status_result = await get_like_status(video_id, current_user['user_id'])
     return status_result
@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from typing import Optional, Literal
 from app.schemas.video.video_schemas import VideoCreate, VideoUpdate
 from app.services.video.video_services import (
     create_video,
-    get_video_by_id,
+    get_video_by_id_async,
     get_all_videos,
     get_trending_videos,
     get_featured_videos,
@@ -15,49 +15,86 @@ from app.services.video.video_services import (
     delete_video,
     increment_video_view
 )
-from app.core.security import get_current_user, get_admin_user
+from app.services.video.video_status_services import get_video_statuses, MAX_STATUS_VIDEO_IDS
+from app.services.video.stream_services import create_stream_session, stream_video
+from app.core.security import get_current_user, get_admin_user, get_optional_user
+from app.utils.pagination_utils import build_next_cursor
+from app.core.cache import response_cache, VIDEO_FEEDS_TAG, video_tag
+from app.core.responses import ORJSONResponse
 from fastapi import File, UploadFile
-from app.core.cloudinary_config import upload_to_cloudinary
+from fastapi.responses import JSONResponse
+from app.core.storage import storage_for
+from app.services.utility.media_services import queue_upload
+from app.utils.upload_utils import check_upload_size, MAX_VIDEO_UPLOAD_BYTES, MAX_THUMBNAIL_UPLOAD_BYTES
+from starlette.concurrency import run_in_threadpool
 
 
 router = APIRouter(prefix="/videos", tags=["Videos"])
 
+# ?view=card returns only the fields a video grid needs (VIDEO_CARD_FIELDS)
+VideoView = Literal['card', 'full']
+
+
+def _feed_tags(videos):
+    """Cache tags of a feed: the feed itself plus every video on it"""
+    return [VIDEO_FEEDS_TAG] + [video_tag(video['id']) for video in videos]
 
 
 @router.post("/upload")
-def upload_to_cloudinary_route(file: UploadFile = File(...), resource_type: str = "auto", folder: str = "videohub", current_user: dict = Depends(get_current_user)):
-    """Upload any file to Cloudinary (video, image, etc.)"""
+def upload_to_cloudinary_route(file: UploadFile = File(...), resource_type: str = "auto", folder: str = "videohub", defer: bool = False, current_user: dict = Depends(get_current_user)):
+    """
+    Upload any file to storage (video, image, etc.)
+
+    The file is stored during the request. With defer=true it is staged and
+    stored by the job workers instead: a job_id to poll at /jobs/{job_id} is
+    returned, whose result holds the URL.
+    """
+    check_upload_size(file, MAX_VIDEO_UPLOAD_BYTES)
     try:
-        metadata = upload_to_cloudinary(file.file, resource_type=resource_type, folder=folder)
-        return {"url": metadata["secure_url"], "metadata": metadata}
+        if defer:
+            job_id = queue_upload(file.file, file.filename or "", resource_type, folder, current_user['user_id'])
+            return JSONResponse(status_code=202, content={"message": "Upload queued", "job_id": job_id})
+        metadata = storage_for(resource_type).upload_stream(
+            file.file, file.filename or "", resource_type=resource_type, folder=folder
+        )
+        return {"url": metadata["secure_url"], "asset": metadata["asset"], "metadata": metadata}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/admin/upload/video")
 async def upload_video_file_admin(
     file: UploadFile = File(...),
+    defer: bool = False,
+    video_id: Optional[str] = None,
     current_user: dict = Depends(get_admin_user)
 ):
-    """Upload video file to Cloudinary (admin only)"""
+    """
+    Upload video file to storage (admin only)
+
+    The file is stored during the request. With defer=true it is staged and
+    stored by the job workers instead, and a job_id to poll at /jobs/{job_id}
+    is returned (its result holds the URL and metadata); if video_id is given,
+    that video's video_url and metadata are set when the upload completes.
+    """
     try:
         # Validate file type
         if not file.content_type or not file.content_type.startswith('video/'):
             raise HTTPException(status_code=400, detail="Only video files are allowed")
 
-        # Validate file size (max 500MB)
-        file_size = 0
-        content = await file.read()
-        file_size = len(content)
+        # The body was size-checked while received (max 500MB)
+        check_upload_size(file, MAX_VIDEO_UPLOAD_BYTES)
 
-        if file_size > 500 * 1024 * 1024:  # 500MB
-            raise HTTPException(status_code=400, detail="File size too large. Maximum allowed size is 500MB")
+        if defer:
+            job_id = await run_in_threadpool(
+                queue_upload, file.file, file.filename or "", "video", "videohub/videos", current_user['user_id'],
+                video_id=video_id, video_field='video_url' if video_id else None
+            )
+            return JSONResponse(status_code=202, content={"message": "Video upload queued", "job_id": job_id})
 
-        # Reset file pointer
-        await file.seek(0)
-        content = await file.read()
-
-        # Upload to Cloudinary and get metadata
-        metadata = upload_to_cloudinary(content, resource_type="video", folder="videohub/videos")
+        # Upload from the received file in parts off the event loop
+        metadata = await run_in_threadpool(
+            storage_for("video").upload_stream, file.file, file.filename or "", resource_type="video", folder="videohub/videos"
+        )
 
         # If duration is not available from Cloudinary, try to estimate it
         duration = metadata.get('duration', 0)
@@ -76,6 +113,7 @@ async def upload_video_file_admin(
             "bit_rate": metadata.get('bit_rate'),
             "bytes": metadata.get('bytes'),
             "public_id": metadata.get('public_id'),
+            "asset": metadata.get('asset'),
             "message": "Video uploaded successfully"
         }
     except HTTPException:
@@ -87,28 +125,35 @@ async def upload_video_file_admin(
 @router.post("/admin/upload/thumbnail")
 async def upload_thumbnail_file_admin(
     file: UploadFile = File(...),
+    defer: bool = False,
+    video_id: Optional[str] = None,
     current_user: dict = Depends(get_admin_user)
 ):
-    """Upload thumbnail/image file to Cloudinary (admin only)"""
+    """
+    Upload thumbnail/image file to storage (admin only)
+
+    defer=true queues it like video uploads; if video_id is given, that
+    video's thumbnail_url is set when the upload completes.
+    """
     try:
         # Validate file type
         if not file.content_type or not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="Only image files are allowed")
 
-        # Validate file size (max 10MB for thumbnails)
-        file_size = 0
-        content = await file.read()
-        file_size = len(content)
+        # Max 10MB for thumbnails
+        check_upload_size(file, MAX_THUMBNAIL_UPLOAD_BYTES)
 
-        if file_size > 10 * 1024 * 1024:  # 10MB
-            raise HTTPException(status_code=400, detail="File size too large. Maximum allowed size is 10MB")
+        if defer:
+            job_id = await run_in_threadpool(
+                queue_upload, file.file, file.filename or "", "image", "videohub/thumbnails", current_user['user_id'],
+                video_id=video_id, video_field='thumbnail_url' if video_id else None
+            )
+            return JSONResponse(status_code=202, content={"message": "Thumbnail upload queued", "job_id": job_id})
 
-        # Reset file pointer
-        await file.seek(0)
-        content = await file.read()
-
-        # Upload to Cloudinary and get metadata
-        metadata = upload_to_cloudinary(content, resource_type="image", folder="videohub/thumbnails")
+        # Upload from the received file off the event loop
+        metadata = await run_in_threadpool(
+            storage_for("image").upload_stream, file.file, file.filename or "", resource_type="image", folder="videohub/thumbnails"
+        )
 
         return {
             "url": metadata['secure_url'],
@@ -116,6 +161,7 @@ async def upload_thumbnail_file_admin(
             "width": metadata.get('width'),
             "height": metadata.get('height'),
             "bytes": metadata.get('bytes'),
+            "asset": metadata.get('asset'),
             "message": "Thumbnail uploaded successfully"
         }
     except HTTPException:
@@ -132,61 +178,94 @@ def upload_video(video_data: VideoCreate, current_user: dict = Depends(get_curre
 
 
 @router.get("/")
-def get_all_videos_list(
+async def get_all_videos_list(
     skip: int = 0,
     limit: int = 20,
     search: Optional[str] = None,
     category: Optional[str] = None,
     tags: Optional[str] = None,
-    sort_by: str = "created_at"
+    sort_by: str = "created_at",
+    cursor: Optional[str] = None,
+    view: VideoView = "full"
 ):
-    """Get all videos with filters and pagination"""
-    videos = get_all_videos(skip, limit, search, category, tags, sort_by)
-    return {"videos": videos, "count": len(videos)}
+    """Get all videos with filters and pagination (pass next_cursor back as cursor for the next page)"""
+    videos, next_cursor = await get_all_videos(skip, limit, search, category, tags, sort_by, cursor, view)
+    return ORJSONResponse({"videos": videos, "count": len(videos), "next_cursor": next_cursor})
 
 
 @router.get("/trending")
-def get_trending_videos_list(limit: int = 20):
+async def get_trending_videos_list(limit: int = 20, view: VideoView = "full"):
     """Get trending videos"""
-    videos = get_trending_videos(limit)
-    return {"videos": videos, "count": len(videos)}
+    videos = await response_cache.aget_or_set(f"videos:trending:{limit}:{view}", lambda: get_trending_videos(limit, view), tags=_feed_tags)
+    return ORJSONResponse({"videos": videos, "count": len(videos)})
 
 
 @router.get("/featured")
-def get_featured_videos_list(limit: int = 20):
+async def get_featured_videos_list(limit: int = 20, view: VideoView = "full"):
     """Get featured videos"""
-    videos = get_featured_videos(limit)
-    return {"videos": videos, "count": len(videos)}
+    videos = await response_cache.aget_or_set(f"videos:featured:{limit}:{view}", lambda: get_featured_videos(limit, view), tags=_feed_tags)
+    return ORJSONResponse({"videos": videos, "count": len(videos)})
 
 
 @router.get("/hot")
-def get_hot_videos_list(limit: int = 20):
+async def get_hot_videos_list(limit: int = 20, view: VideoView = "full"):
     """Get hot videos (high engagement)"""
-    videos = get_hot_videos(limit)
-    return {"videos": videos, "count": len(videos)}
+    videos = await response_cache.aget_or_set(f"videos:hot:{limit}:{view}", lambda: get_hot_videos(limit, view), tags=_feed_tags)
+    return ORJSONResponse({"videos": videos, "count": len(videos)})
 
 
 @router.get("/following")
-def get_following_videos_list(limit: int = 20, current_user: dict = Depends(get_current_user)):
-    """Get videos from users you follow"""
-    videos = get_videos_from_following(current_user['user_id'], limit)
-    return {"videos": videos, "count": len(videos)}
+async def get_following_videos_list(limit: int = 20, cursor: Optional[str] = None, view: VideoView = "full", current_user: dict = Depends(get_current_user)):
+    """Get videos from users you follow (pass next_cursor back as cursor for the next page)"""
+    videos, next_cursor = await get_videos_from_following(current_user['user_id'], limit, view, cursor)
+    return ORJSONResponse({"videos": videos, "count": len(videos), "next_cursor": next_cursor})
 
 
 @router.get("/recommended")
-def get_recommended_videos_list(limit: int = 20, current_user: dict = Depends(get_current_user)):
+async def get_recommended_videos_list(limit: int = 20, view: VideoView = "full", current_user: dict = Depends(get_current_user)):
     """Get recommended videos based on watch history"""
-    videos = get_recommended_videos(current_user['user_id'], limit)
-    return {"videos": videos, "count": len(videos)}
+    videos = await get_recommended_videos(current_user['user_id'], limit, view)
+    return ORJSONResponse({"videos": videos, "count": len(videos)})
+
+
+@router.get("/status")
+def get_videos_status(ids: str, current_user: dict = Depends(get_current_user)):
+    """
+    Get like, save, watch progress and uploader-follow status for many videos at once
+
+    Pass comma-separated video IDs, e.g. /videos/status?ids=a,b,c
+    """
+    video_ids = [video_id.strip() for video_id in ids.split(',') if video_id.strip()]
+    if len(video_ids) > MAX_STATUS_VIDEO_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_STATUS_VIDEO_IDS} video IDs are allowed")
+    statuses = get_video_statuses(current_user['user_id'], video_ids)
+    return {"statuses": statuses, "count": len(statuses)}
+
+
+@router.post("/{video_id}/stream-session")
+def start_stream_session(video_id: str, current_user: Optional[dict] = Depends(get_optional_user)):
+    """
+    Check access to a video once and get a stream_url for the player.
+
+    Range requests to stream_url are authorized by its token alone, so
+    subscription and premium checks don't repeat per chunk.
+    """
+    return create_stream_session(video_id, current_user)
+
+
+@router.get("/{video_id}/stream")
+async def stream_video_media(video_id: str, request: Request, token: str = Query(...)):
+    """Stream a video's media with HTTP Range, ETag and Last-Modified support"""
+    return await stream_video(video_id, token, request.headers)
 
 
 @router.get("/{video_id}")
-def get_video_details(video_id: str):
+async def get_video_details(video_id: str):
     """Get video details by ID"""
-    video = get_video_by_id(video_id)
+    video = await response_cache.aget_or_set(f"video:{video_id}", lambda: get_video_by_id_async(video_id), tags=[video_tag(video_id)])
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
-    return video
+    return ORJSONResponse(video)
 
 
 @router.put("/{video_id}")
@@ -206,10 +285,10 @@ def delete_video_by_id(video_id: str, current_user: dict = Depends(get_current_u
 
 
 @router.get("/user/{user_id}")
-def get_user_videos(user_id: str, skip: int = 0, limit: int = 20):
+async def get_user_videos(user_id: str, skip: int = 0, limit: int = 20, cursor: Optional[str] = None, view: VideoView = "full"):
     """Get all videos uploaded by a specific user"""
-    videos = get_videos_by_user(user_id, skip, limit)
-    return {"videos": videos, "count": len(videos)}
+    videos = await get_videos_by_user(user_id, skip, limit, cursor, view)
+    return ORJSONResponse({"videos": videos, "count": len(videos), "next_cursor": build_next_cursor(videos, limit, 'created_at')})
 
 
 @router.post("/{video_id}/view")
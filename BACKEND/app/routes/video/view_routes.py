@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Optional
+from datetime import datetime
 from app.schemas.video.view_schemas import ViewCreate
 from app.services.video.view_services import (
     record_view,
@@ -8,6 +9,7 @@ from app.services.video.view_services import (
     get_user_view_history
 )
 from app.core.security import get_current_user
+from app.utils.pagination_utils import build_next_cursor
 
 router = APIRouter(prefix="/views", tags=["Views"])
 
@@ -21,9 +23,9 @@ def record_video_view(view_data: ViewCreate, current_user: Optional[dict] = Depe
 
 
 @router.get("/video/{video_id}")
-def get_views_for_video(video_id: str):
-    """Get view count and analytics for a video"""
-    views_data = get_video_views(video_id)
+def get_views_for_video(video_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Get view count and unique viewers for a video, overall or between start and end"""
+    views_data = get_video_views(video_id, start, end)
     return views_data
 
 
@@ -35,7 +37,7 @@ def get_analytics_for_video(video_id: str, current_user: dict = Depends(get_curr
 
 
 @router.get("/me")
-def get_my_view_history_list(skip: int = 0, limit: int = 20, current_user: dict = Depends(get_current_user)):
+def get_my_view_history_list(skip: int = 0, limit: int = 20, cursor: Optional[str] = None, current_user: dict = Depends(get_current_user)):
     """Get current user's view history"""
-    history = get_user_view_history(current_user['user_id'], skip, limit)
-    return {"history": history, "count": len(history)}
+    history = get_user_view_history(current_user['user_id'], skip, limit, cursor)
+    return {"history": history, "count": len(history), "next_cursor": build_next_cursor(history, limit, 'started_at')}
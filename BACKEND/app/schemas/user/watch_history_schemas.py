@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Literal
 from datetime import datetime
 
 
@@ -9,6 +9,8 @@ class WatchHistoryUpdate(BaseModel):
     watch_position: int = 0
     watch_duration: int = 0
     completion_percentage: float = 0.0
+    # 'pause' and 'ended' are saved immediately; heartbeats are batched
+    event: Literal['heartbeat', 'pause', 'ended'] = 'heartbeat'
 
 
 # Watch History Response
@@ -1,10 +1,10 @@
 from datetime import datetime
-from app.core.database import client
+from app.core.database import client, DATABASE_NAME
 from bson.objectid import ObjectId
 from typing import Optional
 from app.services.user.subscription_services import get_total_income
 
-db = client['videohub']
+db = client[DATABASE_NAME]
 
 
 def get_all_subscription_plans():
@@ -1,9 +1,11 @@
-from app.core.database import client
+from app.core.database import client, DATABASE_NAME
 from bson.objectid import ObjectId
 from datetime import datetime
 from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+from app.services.video.timeline_services import backfill_timeline, remove_channel_from_timeline
 
-db = client['videohub']
+db = client[DATABASE_NAME]
 
 
 def follow_user(follower_id: str, following_id: str):
@@ -32,7 +34,11 @@ def follow_user(follower_id: str, following_id: str):
         'followed_at': datetime.now()
     }
     
-    result = db['followers'].insert_one(follow_doc)
+    try:
+        result = db['followers'].insert_one(follow_doc)
+    except DuplicateKeyError:
+        # A concurrent follow request inserted the same relationship first
+        raise HTTPException(status_code=400, detail="Already following this user")
     
     # Update follower and following counts
     db['users'].update_one(
@@ -44,6 +50,7 @@ def follow_user(follower_id: str, following_id: str):
         {'$inc': {'followers_count': 1}}
     )
     
+    backfill_timeline(follower_id, following_id)
     return str(result.inserted_id)
 
 
@@ -74,6 +81,7 @@ def unfollow_user(follower_id: str, following_id: str):
     except Exception:
         pass
     
+    remove_channel_from_timeline(follower_id, following_id)
     return True
 
 
@@ -1,9 +1,9 @@
 from fastapi import HTTPException
-from app.core.database import client
+from app.core.database import client, DATABASE_NAME
 from bson.objectid import ObjectId
 from datetime import datetime
 
-db = client['videohub']
+db = client[DATABASE_NAME]
 
 
 def create_payment_transaction(payment_data):
@@ -1,9 +1,12 @@
 from datetime import datetime
-from typing import List
+from typing import List, Optional, Tuple
 from bson import ObjectId
-from app.core.database import client
+from pymongo.errors import DuplicateKeyError
+from app.core.database import client, DATABASE_NAME
+from app.utils.pagination_utils import apply_cursor, cursor_sort, encode_cursor
+from app.services.video.counter_services import increment_video_counters
 
-db = client['videohub']
+db = client[DATABASE_NAME]
 saved_videos_collection = db['saved_videos']
 videos_collection = db['videos']
 
@@ -29,14 +32,19 @@ def save_video(user_id: str, video_id: str) -> dict:
         'saved_at': datetime.utcnow()
     }
     
-    result = saved_videos_collection.insert_one(saved_video)
+    try:
+        saved_videos_collection.insert_one(saved_video)
+    except DuplicateKeyError:
+        # A concurrent save inserted the same record first, and counted it
+        existing = saved_videos_collection.find_one({'user_id': user_id, 'video_id': video_id})
+        return {
+            'saved': True,
+            'saved_at': existing.get('saved_at') if existing else saved_video['saved_at']
+        }
     
     # Increment favorites count on video
     try:
-        videos_collection.update_one(
-            {'_id': ObjectId(video_id)},
-            {'$inc': {'favorites_count': 1}}
-        )
+        increment_video_counters(video_id, {'favorites_count': 1})
     except Exception:
         pass
     
@@ -58,10 +66,7 @@ def unsave_video(user_id: str, video_id: str) -> dict:
     
     # Decrement favorites count on video
     try:
-        videos_collection.update_one(
-            {'_id': ObjectId(video_id)},
-            {'$inc': {'favorites_count': -1}}
-        )
+        increment_video_counters(video_id, {'favorites_count': -1})
     except Exception:
         pass
     
@@ -87,15 +92,19 @@ def get_save_status(user_id: str, video_id: str) -> dict:
         }
 
 
-def get_user_saved_videos(user_id: str, skip: int = 0, limit: int = 20) -> List[dict]:
-    """Get all saved videos for a user with video details"""
-    # Get saved video records
-    saved_videos = list(saved_videos_collection.find(
-        {'user_id': user_id}
-    ).sort('saved_at', -1).skip(skip).limit(limit))
+def get_user_saved_videos(user_id: str, skip: int = 0, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """Get all saved videos for a user with video details, plus the cursor of the next page"""
+    # Get saved video records (unique per user and video, so video_id breaks saved_at ties)
+    query = apply_cursor({'user_id': user_id}, cursor, 'saved_at', 'video_id')
+    saved_videos = list(saved_videos_collection.find(query)
+                        .sort(cursor_sort('saved_at', 'video_id')).skip(skip).limit(limit))
     
     if not saved_videos:
-        return []
+        return [], None
+    
+    next_cursor = None
+    if len(saved_videos) == limit:
+        next_cursor = encode_cursor(saved_videos[-1].get('saved_at'), saved_videos[-1].get('video_id'))
     
     # Get video IDs
     video_ids = []
@@ -137,7 +146,7 @@ def get_user_saved_videos(user_id: str, skip: int = 0, limit: int = 20) -> List[
             video['saved_at'] = sv.get('saved_at')
             result.append(video)
     
-    return result
+    return result, next_cursor
 
 
 def get_saved_videos_count(user_id: str) -> int:
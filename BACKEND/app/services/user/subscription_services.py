@@ -1,8 +1,8 @@
 from datetime import datetime, timedelta
-from app.core.database import client
+from app.core.database import client, DATABASE_NAME
 from bson.objectid import ObjectId
 
-db = client['videohub']
+db = client[DATABASE_NAME]
 
 
 def update_total_income(amount: float):
@@ -1,14 +1,25 @@
 from fastapi import HTTPException
-from app.core.database import client
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.database import client, DATABASE_NAME
+from app.core.security import hash_password, verify_and_update_password, create_access_token, invalidate_account_status
+from app.core.throttle import SlidingWindowThrottle
+import os
 from bson.objectid import ObjectId
 from datetime import datetime
 from app.model.user.user_model import User
-from app.core.cloudinary_config import delete_from_cloudinary, extract_public_id_from_url
+from app.services.utility.cascade_services import enqueue_user_deletion, USER_ASSET_FIELDS
+from app.core.storage import with_asset_refs
 
 
 
-db = client['videohub']
+db = client[DATABASE_NAME]
+
+# Login attempts allowed per client IP, and failed attempts per email, in the window
+LOGIN_THROTTLE_WINDOW_SECONDS = int(os.getenv("LOGIN_THROTTLE_WINDOW_SECONDS", "300"))
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", "30"))
+LOGIN_MAX_FAILURES_PER_EMAIL = int(os.getenv("LOGIN_MAX_FAILURES_PER_EMAIL", "5"))
+
+ip_login_throttle = SlidingWindowThrottle(LOGIN_MAX_ATTEMPTS_PER_IP, LOGIN_THROTTLE_WINDOW_SECONDS)
+email_login_throttle = SlidingWindowThrottle(LOGIN_MAX_FAILURES_PER_EMAIL, LOGIN_THROTTLE_WINDOW_SECONDS)
 
 
 def register(user_data):
@@ -25,21 +36,43 @@ def register(user_data):
     result = db['users'].insert_one(user_doc)
     return str(result.inserted_id)
 
-def login(user_data):
+def _check_login_throttle(email, client_ip):
+    """Reject a login before any hashing once its IP or email is over the limit"""
+    retry_after = max(
+        ip_login_throttle.retry_after(client_ip) if client_ip else 0,
+        email_login_throttle.retry_after(email.lower())
+    )
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(retry_after)}
+        )
+    if client_ip:
+        ip_login_throttle.hit(client_ip)
+
+def login(user_data, client_ip=None):
     email = user_data.email if hasattr(user_data, 'email') else user_data['email']
     password = user_data.password if hasattr(user_data, 'password') else user_data['password']
+    _check_login_throttle(email, client_ip)
     user = db['users'].find_one({'email': email})
-    if user and verify_password(password, user['hashed_password']):
-        # Check if user is admin based on role field
-        is_admin = user.get("role", "user") == "admin"
-        token_data = {
-            "user_id": str(user["_id"]),
-            "email": user["email"],
-            "is_admin": is_admin
-        }
-        access_token = create_access_token(token_data)
-        return {'access_token': access_token, 'user': token_data}
-    return None
+    valid, new_hash = verify_and_update_password(password, user['hashed_password']) if user else (False, None)
+    if not valid:
+        email_login_throttle.hit(email.lower())
+        return None
+    email_login_throttle.reset(email.lower())
+    if new_hash:
+        # Hashed with an older cost: store it with the current one
+        db['users'].update_one({'_id': user['_id']}, {'$set': {'hashed_password': new_hash}})
+    # Check if user is admin based on role field
+    is_admin = user.get("role", "user") == "admin"
+    token_data = {
+        "user_id": str(user["_id"]),
+        "email": user["email"],
+        "is_admin": is_admin
+    }
+    access_token = create_access_token(token_data)
+    return {'access_token': access_token, 'user': token_data}
 
 def get_user_by_id(user_id):
     user = db['users'].find_one({'_id': ObjectId(user_id)})
@@ -54,9 +87,11 @@ def update_user(user_id, update_data):
     if not existing_user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    update_dict = update_data.dict(exclude_unset=True)
+    update_dict.update(with_asset_refs(update_dict, USER_ASSET_FIELDS))
     result = db['users'].update_one(
         {'_id': ObjectId(user_id)},
-        {'$set': update_data.dict(exclude_unset=True)}
+        {'$set': update_dict}
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=400, detail="No changes applied")
@@ -64,31 +99,22 @@ def update_user(user_id, update_data):
     return get_user_by_id(user_id)
 
 def delete_user(user_id):
+    """
+    Delete an account; returns the ID of the cascade job, or None if there is no such user.
+
+    Only the user document is removed here. Videos, stored assets, activity and
+    follow counts are removed by the cascade job in bulk.
+    """
     # Get user to check for avatar and cover image
-    user = db["users"].find_one({"_id": ObjectId(user_id)})
+    user = db["users"].find_one({"_id": ObjectId(user_id)}, {
+        'profile_picture': 1, 'cover_image': 1, 'profile_picture_asset': 1, 'cover_image_asset': 1
+    })
     if not user:
-        return False
-
-    # Delete avatar from Cloudinary if it exists
-    if user.get('profile_picture'):
-        avatar_public_id = extract_public_id_from_url(user['profile_picture'])
-        if avatar_public_id:
-            try:
-                delete_from_cloudinary(avatar_public_id, resource_type="image")
-            except Exception as e:
-                # Log but don't fail the deletion if Cloudinary delete fails
-                print(f"Warning: Failed to delete user avatar from Cloudinary: {str(e)}")
-
-    # Delete cover image from Cloudinary if it exists
-    if user.get('cover_image'):
-        cover_public_id = extract_public_id_from_url(user['cover_image'])
-        if cover_public_id:
-            try:
-                delete_from_cloudinary(cover_public_id, resource_type="image")
-            except Exception as e:
-                # Log but don't fail the deletion if Cloudinary delete fails
-                print(f"Warning: Failed to delete user cover image from Cloudinary: {str(e)}")
+        return None
 
     # Delete user from database
     result = db["users"].delete_one({"_id": ObjectId(user_id)})
-    return result.deleted_count > 0
\ No newline at end of file
+    invalidate_account_status(user_id)
+    if result.deleted_count == 0:
+        return None
+    return enqueue_user_deletion(user)
\ No newline at end of file
@@ -1,15 +1,18 @@
 from fastapi import HTTPException
-from app.core.database import client
+from app.core.database import client, DATABASE_NAME
 from bson.objectid import ObjectId
-from datetime import datetime
+from app.utils.pagination_utils import apply_cursor, cursor_sort
+from app.services.video.recommendation_services import reset_user_affinity
+from app.services.user.watch_progress_buffer import watch_progress_buffer
 
-db = client['videohub']
+db = client[DATABASE_NAME]
 
 
-def get_user_watch_history(user_id, skip=0, limit=20):
+def get_user_watch_history(user_id, skip=0, limit=20, cursor=None):
     """Get user's watch history"""
-    history = list(db['watch_history'].find({'user_id': user_id})
-                  .sort('last_watched_at', -1)
+    query = apply_cursor({'user_id': user_id}, cursor, 'last_watched_at')
+    history = list(db['watch_history'].find(query)
+                  .sort(cursor_sort('last_watched_at'))
                   .skip(skip)
                   .limit(limit))
     for item in history:
@@ -18,35 +21,20 @@ def get_user_watch_history(user_id, skip=0, limit=20):
     return history
 
 
-def update_watch_progress(video_id, user_id, watch_data):
-    """Update or create watch progress for a video"""
-    watch_dict = watch_data.dict()
-    watch_dict['user_id'] = user_id
-    watch_dict['video_id'] = video_id
-    watch_dict['last_watched_at'] = datetime.now()
-    
-    # Check if watch history exists
-    existing = db['watch_history'].find_one({
-        'user_id': user_id,
-        'video_id': video_id
-    })
-    
-    if existing:
-        # Update existing record
-        result = db['watch_history'].update_one(
-            {'_id': existing['_id']},
-            {'$set': watch_dict}
-        )
-        return result.modified_count > 0
-    else:
-        # Create new record
-        watch_dict['created_at'] = datetime.now()
-        result = db['watch_history'].insert_one(watch_dict)
-        return str(result.inserted_id)
+async def update_watch_progress(video_id, user_id, watch_data):
+    """
+    Record watch progress for a video.
+
+    Heartbeats are coalesced in memory and upserted in periodic bulk writes;
+    'pause' and 'ended' events are written immediately.
+    """
+    progress = watch_data.dict(exclude={'video_id', 'event'})
+    await watch_progress_buffer.add(user_id, video_id, progress, watch_data.event)
+    return True
 
 
 def get_watch_progress(video_id, user_id):
-    """Get watch progress for a specific video"""
+    """Get watch progress for a specific video (including not yet flushed heartbeats)"""
     progress = db['watch_history'].find_one({
         'user_id': user_id,
         'video_id': video_id
@@ -54,11 +42,16 @@ def get_watch_progress(video_id, user_id):
     if progress:
         progress['id'] = str(progress['_id'])
         progress.pop('_id')
+    pending = watch_progress_buffer.get_pending(user_id, video_id)
+    if pending:
+        is_completed = pending.pop('is_completed') or (progress or {}).get('is_completed', False)
+        progress = {**(progress or {'user_id': user_id, 'video_id': video_id}), **pending, 'is_completed': is_completed}
     return progress
 
 
 def remove_from_history(video_id, user_id):
     """Remove a video from watch history"""
+    watch_progress_buffer.discard(user_id, video_id)
     result = db['watch_history'].delete_one({
         'user_id': user_id,
         'video_id': video_id
@@ -68,5 +61,8 @@ def remove_from_history(video_id, user_id):
 
 def clear_watch_history(user_id):
     """Clear entire watch history for a user"""
+    watch_progress_buffer.discard(user_id)
     result = db['watch_history'].delete_many({'user_id': user_id})
+    # Recommendations should no longer reflect the cleared history
+    reset_user_affinity(user_id)
     return result.deleted_count
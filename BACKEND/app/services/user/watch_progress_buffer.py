@@ -0,0 +1,226 @@
+import os
+import threading
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from starlette.concurrency import run_in_threadpool
+from app.core.database import client, DATABASE_NAME
+from app.core.background import PeriodicTask, register_background_task
+from app.repositories.user_repository import find_users_by_ids
+from app.repositories.video_repository import find_video
+from app.repositories.watch_history_repository import upsert_watch_progress
+from app.services.video.recommendation_services import record_affinity, record_affinity_async, AFFINITY_SIGNALS
+
+db = client[DATABASE_NAME]
+
+# Seconds between flushes; a crash loses at most this much progress per viewer
+WATCH_PROGRESS_FLUSH_SECONDS = float(os.getenv("WATCH_PROGRESS_FLUSH_SECONDS", "5"))
+# Buffered (user, video) pairs that trigger an immediate flush
+WATCH_PROGRESS_MAX_PENDING = int(os.getenv("WATCH_PROGRESS_MAX_PENDING", "5000"))
+# Player events written through immediately instead of buffered
+FLUSH_EVENTS = ('pause', 'ended')
+COMPLETION_THRESHOLD = 90
+
+
+def _progress_write(user_id, video_id, progress):
+    """
+    Single-round-trip upsert of one progress report on the (user_id, video_id) key.
+
+    Only a row last watched before the report matches, so a report older than
+    the stored one (buffered by another process, flushed late) never moves the
+    position back. Its upsert then collides with the row on the unique key
+    and is skipped.
+    """
+    fields = {key: value for key, value in progress.items() if key != 'is_completed'}
+    return (
+        {
+            'user_id': user_id,
+            'video_id': video_id,
+            '$or': [
+                {'last_watched_at': {'$lt': progress['last_watched_at']}},
+                {'last_watched_at': {'$exists': False}}
+            ]
+        },
+        {
+            '$set': fields,
+            # Once completed, a video stays completed when rewatched
+            '$max': {'is_completed': progress.get('is_completed', False)},
+            '$setOnInsert': {'created_at': progress['last_watched_at']}
+        }
+    )
+
+
+class WatchProgressBuffer:
+    """
+    Coalesces watch-progress heartbeats in memory and writes them in bulk.
+
+    Only the latest report per (user, video) is kept, so a viewer costs one
+    write per flush however often the player reports. Pause/end events are
+    written through at once so final positions are never lost.
+    """
+
+    def __init__(self, db_client, max_pending=WATCH_PROGRESS_MAX_PENDING):
+        self.db = db_client
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        # Serializes flushes with discards, so a discarded report can't be
+        # written by a flush already under way
+        self._flush_lock = threading.Lock()
+        self._pending = {}  # (user_id, video_id) -> progress fields
+
+    async def add(self, user_id, video_id, progress, event=None):
+        """
+        Record a progress report (called by handlers on the event loop).
+
+        Args:
+            user_id: The viewer
+            video_id: The video
+            progress: watch_position, watch_duration, completion_percentage
+            event: Player event ('heartbeat', 'pause' or 'ended')
+        """
+        progress = dict(progress)
+        progress['last_watched_at'] = datetime.now()
+        progress['is_completed'] = (
+            event == 'ended' or progress.get('completion_percentage', 0) >= COMPLETION_THRESHOLD
+        )
+
+        if event in FLUSH_EVENTS:
+            await self._write_through(user_id, video_id, progress)
+            return
+
+        with self._lock:
+            self._pending[(user_id, video_id)] = progress
+            pending = len(self._pending)
+        if pending >= self.max_pending:
+            await run_in_threadpool(self.flush)
+
+    def get_pending(self, user_id, video_id):
+        """The buffered progress of a viewer, if not yet flushed"""
+        with self._lock:
+            progress = self._pending.get((user_id, video_id))
+            return dict(progress) if progress else None
+
+    def discard(self, user_id, video_id=None):
+        """Drop buffered progress of a user (one video or all), e.g. when history is removed"""
+        with self._flush_lock, self._lock:
+            for key in [key for key in self._pending if key[0] == user_id and video_id in (None, key[1])]:
+                self._pending.pop(key)
+
+    def discard_video(self, video_id):
+        """Drop buffered progress of every viewer of a video, e.g. when it is deleted"""
+        with self._flush_lock, self._lock:
+            for key in [key for key in self._pending if key[1] == video_id]:
+                self._pending.pop(key)
+
+    def flush(self):
+        """Write all buffered progress in one unordered bulk upsert"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+
+            keys = self._existing_keys(pending)
+            if not keys:
+                return
+            operations = [UpdateOne(*_progress_write(user_id, video_id, pending[(user_id, video_id)]), upsert=True)
+                          for user_id, video_id in keys]
+            try:
+                completing = self._newly_completed([key for key in keys if pending[key]['is_completed']])
+                upserted = self._bulk_upsert(operations)
+            except Exception as e:
+                print(f"Warning: Watch progress flush failed: {str(e)}")
+                self._requeue(pending)
+                return
+
+        # Newly inserted rows are first watches
+        for index in upserted:
+            user_id, video_id = keys[index]
+            record_affinity(user_id, video_id, AFFINITY_SIGNALS['watch'])
+        for user_id, video_id in completing:
+            record_affinity(user_id, video_id, AFFINITY_SIGNALS['complete'])
+
+    def _bulk_upsert(self, operations):
+        """Run the upserts, skipping stale reports; returns the indexes of the inserted rows"""
+        try:
+            return self.db['watch_history'].bulk_write(operations, ordered=False).upserted_ids
+        except BulkWriteError as e:
+            # A stale report fails the last_watched_at guard and collides with the newer row
+            errors = [error for error in e.details.get('writeErrors', []) if error.get('code') != 11000]
+            if errors or e.details.get('writeConcernErrors'):
+                raise
+            return [upsert['index'] for upsert in e.details.get('upserted', [])]
+
+    def _existing_keys(self, pending):
+        """
+        The buffered (user, video) keys whose user and video still exist.
+
+        Heartbeats of deleted accounts and videos (from other workers, or sent
+        after the delete) would otherwise upsert history rows the cascade
+        deletion already removed. Costs two $in lookups per flush.
+        """
+        try:
+            user_ids = {ObjectId(user_id) for user_id, _ in pending if ObjectId.is_valid(user_id)}
+            video_ids = {ObjectId(video_id) for _, video_id in pending if ObjectId.is_valid(video_id)}
+            existing_users = {str(user['_id']) for user in self.db['users'].find({'_id': {'$in': list(user_ids)}}, {'_id': 1})}
+            existing_videos = {str(video['_id']) for video in self.db['videos'].find({'_id': {'$in': list(video_ids)}}, {'_id': 1})}
+        except Exception as e:
+            print(f"Warning: Watch progress existence check failed: {str(e)}")
+            return list(pending)
+        return [(user_id, video_id) for user_id, video_id in pending
+                if user_id in existing_users and video_id in existing_videos]
+
+    def _newly_completed(self, keys):
+        """The (user, video) keys among completed reports whose rows are not completed yet"""
+        if not keys:
+            return []
+        already_completed = {
+            (row['user_id'], row['video_id'])
+            for row in self.db['watch_history'].find(
+                {'$or': [{'user_id': user_id, 'video_id': video_id} for user_id, video_id in keys], 'is_completed': True},
+                {'user_id': 1, 'video_id': 1, '_id': 0}
+            )
+        }
+        return [key for key in keys if key not in already_completed]
+
+    async def _write_through(self, user_id, video_id, progress):
+        """
+        Write one report at once through the async client.
+
+        Needs no flush lock: a flush still holding an older report of the same
+        viewer fails the last_watched_at guard of _progress_write.
+        """
+        with self._lock:
+            self._pending.pop((user_id, video_id), None)
+        if not (await find_users_by_ids([user_id], ['_id']) and await find_video(video_id, {'_id': 1})):
+            return
+        try:
+            previous = await upsert_watch_progress(*_progress_write(user_id, video_id, progress))
+        except DuplicateKeyError:
+            # Another process already stored a newer report
+            return
+
+        if previous is None:
+            await record_affinity_async(user_id, video_id, AFFINITY_SIGNALS['watch'])
+        if progress['is_completed'] and not (previous and previous.get('is_completed')):
+            await record_affinity_async(user_id, video_id, AFFINITY_SIGNALS['complete'])
+
+    def _requeue(self, pending):
+        """Put a failed batch back under newer reports, dropping it if the buffer is full"""
+        with self._lock:
+            if len(self._pending) + len(pending) > self.max_pending * 2:
+                print(f"Warning: Dropped {len(pending)} buffered watch progress reports")
+                return
+            for key, progress in pending.items():
+                self._pending.setdefault(key, progress)
+
+
+watch_progress_buffer = WatchProgressBuffer(db)
+
+register_background_task(PeriodicTask(
+    'watch-progress-flush',
+    watch_progress_buffer.flush,
+    WATCH_PROGRESS_FLUSH_SECONDS,
+    on_stop=watch_progress_buffer.flush
+))
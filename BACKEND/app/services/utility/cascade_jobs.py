@@ -0,0 +1,294 @@
+import os
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from app.core.database import client, DATABASE_NAME
+from app.core.jobs import register_job_handler, report_job_progress, get_job_progress
+from app.core.storage import get_storage, ASSET_FIELDS
+from app.core.cache import response_cache, VIDEO_FEEDS_TAG, CATEGORIES_TAG, TAGS_TAG, video_tag
+from app.services.video.analytics_services import stored_video_ids
+from app.services.video.counter_services import increment_many_video_counters
+from app.services.video.like_services import COUNTER_FIELDS
+from app.services.video.recommendation_services import reset_user_affinity
+from app.services.utility.cascade_services import (
+    CASCADE_DELETE_VIDEOS_JOB,
+    CASCADE_DELETE_USER_JOB,
+    video_snapshot
+)
+
+db = client[DATABASE_NAME]
+
+# Storage delete batches in flight at once
+STORAGE_DELETE_CONCURRENCY = int(os.getenv("STORAGE_DELETE_CONCURRENCY", "4"))
+# Videos (and comments, for their replies) of a deleted user handled per batch
+USER_CASCADE_BATCH_SIZE = int(os.getenv("USER_CASCADE_BATCH_SIZE", "500"))
+
+# Video collections whose documents belong to one video, keyed by video_id
+VIDEO_DEPENDENT_COLLECTIONS = (
+    'comments', 'likes', 'watch_history', 'saved_videos', 'views', 'timeline_entries',
+    'video_counters', 'video_stats_hourly', 'video_stats_daily'
+)
+# Collections whose documents belong to one user, keyed by user_id
+USER_DEPENDENT_COLLECTIONS = (
+    'watch_history', 'saved_videos', 'playlists', 'timeline_entries', 'time_subscriptions'
+)
+
+
+def delete_assets(assets):
+    """
+    Delete stored assets in bulk, on the backend each was stored on: batches of
+    the backend's delete_batch_size keys per call, at most
+    STORAGE_DELETE_CONCURRENCY calls at a time.
+
+    Returns:
+        Number of assets deleted (missing ones count as already gone)
+    """
+    keys_by_target = defaultdict(list)
+    for asset in assets:
+        keys = keys_by_target[(asset['backend'], asset['resource_type'])]
+        if asset['key'] not in keys:
+            keys.append(asset['key'])
+    batches = []
+    for (backend, resource_type), keys in keys_by_target.items():
+        size = get_storage(backend).delete_batch_size
+        for start in range(0, len(keys), size):
+            batches.append((backend, keys[start:start + size], resource_type))
+    if not batches:
+        return 0
+    with ThreadPoolExecutor(max_workers=min(STORAGE_DELETE_CONCURRENCY, len(batches))) as executor:
+        results = list(executor.map(
+            lambda batch: get_storage(batch[0]).delete_many(batch[1], resource_type=batch[2]), batches
+        ))
+    return sum(1 for result in results for status in result.values() if status == 'deleted')
+
+
+def _run_steps(progress, steps, job_progress=None):
+    """
+    Run named steps in order, recording each finished one on the job.
+
+    A retried job skips the steps an earlier attempt finished, so steps that
+    are not idempotent (counter decrements) never run twice. progress may be
+    nested in job_progress (the document reported on the job).
+    """
+    progress['total_steps'] = len(steps)
+    for name, step in steps:
+        if name in progress['completed_steps']:
+            continue
+        progress['results'][name] = step()
+        progress['completed_steps'].append(name)
+        report_job_progress(job_progress or progress)
+    return progress
+
+
+def _load_progress():
+    return get_job_progress() or {'completed_steps': [], 'results': {}}
+
+
+def _decrement_slug_counts(collection, slugs):
+    counts = Counter(slugs)
+    if counts:
+        db[collection].bulk_write([
+            UpdateOne({'slug': slug}, {'$inc': {'video_count': -count}}) for slug, count in counts.items()
+        ], ordered=False)
+    return len(counts)
+
+
+def _video_steps(snapshots):
+    """Steps removing everything that depends on deleted videos"""
+    video_ids = [snapshot['video_id'] for snapshot in snapshots]
+    # watch_history and views may hold legacy int IDs
+    stored_ids = [stored for video_id in video_ids for stored in stored_video_ids(video_id)]
+
+    def delete_dependents(collection):
+        return lambda: db[collection].delete_many({'video_id': {'$in': stored_ids}}).deleted_count
+
+    def delete_by_id(collection):
+        return lambda: db[collection].delete_many({'_id': {'$in': video_ids}}).deleted_count
+
+    def category_counts():
+        count = _decrement_slug_counts('categories', [slug for snapshot in snapshots for slug in snapshot['categories']])
+        response_cache.invalidate(CATEGORIES_TAG)
+        return count
+
+    def tag_counts():
+        count = _decrement_slug_counts('tags', [slug for snapshot in snapshots for slug in snapshot['tags']])
+        response_cache.invalidate(TAGS_TAG)
+        return count
+
+    steps = [('videos.storage', lambda: delete_assets([asset for snapshot in snapshots for asset in snapshot['assets']]))]
+    steps += [(f"videos.{collection}", delete_dependents(collection)) for collection in VIDEO_DEPENDENT_COLLECTIONS]
+    steps += [
+        ('videos.video_rankings', delete_by_id('video_rankings')),
+        ('videos.video_viewer_sketches', delete_by_id('video_viewer_sketches')),
+        ('videos.playlists', lambda: db['playlists'].update_many(
+            {'video_ids': {'$in': stored_ids}},
+            {'$pull': {'video_ids': {'$in': stored_ids}}}
+        ).modified_count),
+        ('videos.category_counts', category_counts),
+        ('videos.tag_counts', tag_counts),
+        ('videos.cache', lambda: response_cache.invalidate(
+            VIDEO_FEEDS_TAG, *(video_tag(video_id) for video_id in video_ids)
+        )),
+    ]
+    return steps
+
+
+@register_job_handler(CASCADE_DELETE_VIDEOS_JOB)
+def run_video_deletion(payload):
+    """Remove the assets, activity and counts of deleted videos"""
+    progress = _load_progress()
+    return _run_steps(progress, _video_steps(payload['videos']))
+
+
+def _decrement_video_counters(match, collection, pipeline_group, to_increments):
+    """Take the likes/comments matching a filter off the counters of the videos they were on"""
+    increments = {}
+    for row in db[collection].aggregate([{'$match': match}, {'$group': pipeline_group}]):
+        for field, amount in to_increments(row).items():
+            increments.setdefault(str(row['_id']['video_id']), {})[field] = -amount
+    if increments:
+        increment_many_video_counters(increments)
+    return len(increments)
+
+
+def _adjust_follow_counts(user_id):
+    """Take a user off the follower/following counts of the users on the other side"""
+    following_ids, follower_ids = [], []
+    for follow in db['followers'].find(
+        {'$or': [{'follower_id': user_id}, {'following_id': user_id}], 'status': 'active'},
+        {'follower_id': 1, 'following_id': 1}
+    ):
+        if follow['follower_id'] == user_id:
+            following_ids.append(ObjectId(follow['following_id']))
+        else:
+            follower_ids.append(ObjectId(follow['follower_id']))
+    if following_ids:
+        db['users'].update_many({'_id': {'$in': following_ids}}, {'$inc': {'followers_count': -1}})
+    if follower_ids:
+        db['users'].update_many({'_id': {'$in': follower_ids}}, {'$inc': {'following_count': -1}})
+    return len(following_ids) + len(follower_ids)
+
+
+def _delete_user_videos(user_id, progress):
+    """
+    Delete a user's videos with their whole cascade, USER_CASCADE_BATCH_SIZE at a time in _id order.
+
+    A batch is snapshotted in the job progress before its documents go and
+    runs as its own steps, so a retry resumes it. A finished batch only leaves
+    its last _id behind, so the progress stays small however many videos the
+    user had.
+
+    Returns:
+        Number of videos deleted
+    """
+    if 'videos' in progress:
+        # Progress of a job started when all uploads were snapshotted at once
+        progress['video_batch'] = {
+            'videos': progress.pop('videos'),
+            'completed_steps': [name for name in progress['completed_steps'] if name.startswith('videos.')],
+            'results': {},
+        }
+    while True:
+        batch = progress.get('video_batch')
+        if batch is None:
+            query = {'uploader_id': user_id}
+            if progress.get('videos_after'):
+                query['_id'] = {'$gt': ObjectId(progress['videos_after'])}
+            videos = list(db['videos'].find(
+                query,
+                {'video_url': 1, 'thumbnail_url': 1, ASSET_FIELDS['video_url']: 1,
+                 ASSET_FIELDS['thumbnail_url']: 1, 'categories': 1, 'tags': 1}
+            ).sort('_id', 1).limit(USER_CASCADE_BATCH_SIZE))
+            if not videos:
+                return progress.get('videos_deleted', 0)
+            batch = progress['video_batch'] = {
+                'videos': [video_snapshot(video['_id'], video) for video in videos],
+                'completed_steps': [],
+                'results': {},
+            }
+            report_job_progress(progress)
+
+        video_ids = [ObjectId(snapshot['video_id']) for snapshot in batch['videos']]
+        _run_steps(batch, [
+            ('videos.documents', lambda: db['videos'].delete_many({'_id': {'$in': video_ids}}).deleted_count),
+            *_video_steps(batch['videos']),
+        ], job_progress=progress)
+        progress['videos_deleted'] = progress.get('videos_deleted', 0) + batch['results'].get('videos.documents', 0)
+        progress['videos_after'] = batch['videos'][-1]['video_id']
+        del progress['video_batch']
+        report_job_progress(progress)
+
+
+def _replies_to(user_id):
+    """
+    Filters matching other users' replies to a user's comments, one per batch
+    of USER_CASCADE_BATCH_SIZE comments.
+
+    Replies point at their parent by ID, stored as an ObjectId or a string.
+    The user's own replies are left to the steps removing their comments.
+    """
+    parent_ids = []
+    for comment in db['comments'].find({'user_id': user_id}, {'_id': 1}).sort('_id', 1):
+        parent_ids += [comment['_id'], str(comment['_id'])]
+        if len(parent_ids) >= 2 * USER_CASCADE_BATCH_SIZE:
+            yield {'parent_comment_id': {'$in': parent_ids}, 'user_id': {'$ne': user_id}}
+            parent_ids = []
+    if parent_ids:
+        yield {'parent_comment_id': {'$in': parent_ids}, 'user_id': {'$ne': user_id}}
+
+
+@register_job_handler(CASCADE_DELETE_USER_JOB)
+def run_user_deletion(payload):
+    """
+    Remove a deleted user's videos (with their whole cascade), assets and activity.
+
+    Videos are deleted in batches (see _delete_user_videos). Every other step
+    is one bulk call (a delete_many, update_many or aggregate plus a bulk
+    write), or one per batch of comments for the replies, so the cost depends
+    on the number of collections rather than on how much the user owned.
+    Replies of other users to the user's comments go with them.
+    """
+    user_id = payload['user_id']
+    progress = _load_progress()
+
+    def delete_owned(collection):
+        return lambda: db[collection].delete_many({'user_id': user_id}).deleted_count
+
+    steps = [
+        ('videos', lambda: _delete_user_videos(user_id, progress)),
+        ('user.storage', lambda: delete_assets(payload.get('assets', []))),
+        ('user.like_counters', lambda: _decrement_video_counters(
+            {'user_id': user_id}, 'likes',
+            {'_id': {'video_id': '$video_id', 'type': '$like_type'}, 'count': {'$sum': 1}},
+            lambda row: {COUNTER_FIELDS[row['_id']['type']]: row['count']} if row['_id']['type'] in COUNTER_FIELDS else {}
+        )),
+        ('user.likes', delete_owned('likes')),
+        # Replies are found through the user's comments, so they go first
+        ('user.reply_counters', lambda: sum(
+            _decrement_video_counters(
+                match, 'comments',
+                {'_id': {'video_id': '$video_id'}, 'count': {'$sum': 1}},
+                lambda row: {'comments_count': row['count']}
+            )
+            for match in _replies_to(user_id)
+        )),
+        ('user.replies', lambda: sum(
+            db['comments'].delete_many(match).deleted_count for match in _replies_to(user_id)
+        )),
+        ('user.comment_counters', lambda: _decrement_video_counters(
+            {'user_id': user_id}, 'comments',
+            {'_id': {'video_id': '$video_id'}, 'count': {'$sum': 1}},
+            lambda row: {'comments_count': row['count']}
+        )),
+        ('user.comments', delete_owned('comments')),
+        ('user.follow_counts', lambda: _adjust_follow_counts(user_id)),
+        ('user.followers', lambda: db['followers'].delete_many(
+            {'$or': [{'follower_id': user_id}, {'following_id': user_id}]}
+        ).deleted_count),
+        *[(f"user.{collection}", delete_owned(collection)) for collection in USER_DEPENDENT_COLLECTIONS],
+        # Views stay for the videos' analytics, without the viewer
+        ('user.views', lambda: db['views'].update_many({'user_id': user_id}, {'$set': {'user_id': None}}).modified_count),
+        ('user.affinities', lambda: reset_user_affinity(user_id)),
+    ]
+    return _run_steps(progress, steps)
@@ -0,0 +1,57 @@
+from app.core.jobs import enqueue_job
+from app.core.storage import get_asset_ref
+from app.services.user.watch_progress_buffer import watch_progress_buffer
+
+# Job types handled by app.services.utility.cascade_jobs
+CASCADE_DELETE_VIDEOS_JOB = 'cascade.delete_videos'
+CASCADE_DELETE_USER_JOB = 'cascade.delete_user'
+
+# URL fields of videos and users holding stored assets, with their resource type
+VIDEO_ASSET_FIELDS = {'video_url': 'video', 'thumbnail_url': 'image'}
+USER_ASSET_FIELDS = {'profile_picture': 'image', 'cover_image': 'image'}
+
+
+def collect_assets(document, asset_fields):
+    """Asset references (backend, key, resource_type) of the stored assets of a document"""
+    assets = []
+    for field, resource_type in asset_fields.items():
+        ref = get_asset_ref(document, field, resource_type)
+        if ref:
+            assets.append(ref)
+    return assets
+
+
+def video_snapshot(video_id, video):
+    """What the cascade needs of a video once its document is gone"""
+    return {
+        'video_id': str(video_id),
+        'categories': video.get('categories') or [],
+        'tags': video.get('tags') or [],
+        'assets': collect_assets(video, VIDEO_ASSET_FIELDS),
+    }
+
+
+def enqueue_video_deletion(snapshots, user_id=None):
+    """
+    Queue removal of everything depending on already deleted videos.
+
+    Args:
+        snapshots: video_snapshot() of each deleted video
+        user_id: Owner allowed to poll the job status
+
+    Returns:
+        The job ID (its progress lists the finished steps)
+    """
+    # Buffered heartbeats would upsert the history rows the job deletes back
+    for snapshot in snapshots:
+        watch_progress_buffer.discard_video(snapshot['video_id'])
+    return enqueue_job(CASCADE_DELETE_VIDEOS_JOB, {'videos': snapshots}, user_id=user_id)
+
+
+def enqueue_user_deletion(user, user_id=None):
+    """Queue removal of an already deleted user's videos, assets and activity; returns the job ID"""
+    watch_progress_buffer.discard(str(user['_id']))
+    return enqueue_job(CASCADE_DELETE_USER_JOB, {
+        'user_id': str(user['_id']),
+        'assets': collect_assets(user, USER_ASSET_FIELDS),
+    }, user_id=user_id)
@@ -1,10 +1,11 @@
 from fastapi import HTTPException
-from app.core.database import client
+from app.core.database import client, DATABASE_NAME
 from bson.objectid import ObjectId
 from datetime import datetime
 from app.utils.slug_utils import create_slug, generate_unique_slug
+from app.core.cache import response_cache, CATEGORIES_TAG, category_tag
 
-db = client['videohub']
+db = client[DATABASE_NAME]
 
 
 def create_category(category_data):
@@ -26,6 +27,7 @@ def create_category(category_data):
     category_dict['is_active'] = category_dict.get('is_active', True)
     
     result = db['categories'].insert_one(category_dict)
+    response_cache.invalidate(CATEGORIES_TAG)
     
     category = db['categories'].find_one({'_id': result.inserted_id})
     category['id'] = str(category['_id'])
@@ -92,12 +94,15 @@ def update_category(category_id, update_data):
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
     
+    response_cache.invalidate(CATEGORIES_TAG, category_tag(category_id))
     return get_category_by_id(category_id)
 
 
 def delete_category(category_id):
     """Delete a category"""
     result = db['categories'].delete_one({'_id': ObjectId(category_id)})
+    if result.deleted_count > 0:
+        response_cache.invalidate(CATEGORIES_TAG, category_tag(category_id))
     return result.deleted_count > 0
 
 
@@ -107,3 +112,4 @@ def update_category_video_count(category_slug, increment=1):
         {'slug': category_slug},
         {'$inc': {'video_count': increment}}
     )
+    response_cache.invalidate(CATEGORIES_TAG)
@@ -0,0 +1,111 @@
+import os
+from contextlib import closing
+from datetime import datetime
+from bson.objectid import ObjectId
+from app.core.database import client, DATABASE_NAME
+from app.core.jobs import register_job_handler
+from app.core.storage import get_storage, storage_for, asset_ref, ASSET_FIELDS
+from app.services.video.video_services import update_video_metadata, invalidate_video_cache
+from app.services.utility.media_services import (
+    MEDIA_UPLOAD_JOB,
+    MEDIA_DELETE_JOB,
+    MEDIA_EXTRACT_METADATA_JOB
+)
+
+db = client[DATABASE_NAME]
+
+
+def _remove_staged(payload):
+    staged = payload.get('staged')
+    if staged:
+        get_storage(staged['backend']).delete(staged['key'], resource_type=staged['resource_type'])
+    elif payload.get('path'):
+        # Jobs queued before staging spooled to a local file
+        try:
+            os.remove(payload['path'])
+        except OSError as e:
+            print(f"Warning: Failed to remove spooled upload {payload['path']}: {str(e)}")
+
+
+def _discard_staged_upload(payload, error):
+    _remove_staged(payload)
+
+
+def _staged_in_place(payload):
+    """Whether the upload was staged straight into its final place (see stage_upload)"""
+    staged = payload.get('staged')
+    return bool(staged) and staged['backend'] == storage_for(payload['resource_type']).name
+
+
+def _store_upload(payload):
+    """Store a staged upload on its asset class's backend; returns metadata"""
+    resource_type = payload['resource_type']
+    target = storage_for(resource_type)
+    staged = payload.get('staged')
+    if staged is None:
+        return target.upload(payload['path'], resource_type=resource_type, folder=payload['folder'], **payload.get('options', {}))
+    if _staged_in_place(payload):
+        return target.get_metadata(staged['key'], resource_type=resource_type)
+    with closing(get_storage(staged['backend']).open(staged['key'], resource_type=resource_type)) as stream:
+        return target.upload_stream(
+            stream,
+            payload.get('filename') or staged['key'],
+            resource_type=resource_type,
+            folder=payload['folder'],
+            **payload.get('options', {})
+        )
+
+
+@register_job_handler(MEDIA_UPLOAD_JOB, on_failure=_discard_staged_upload)
+def run_upload(payload):
+    """Store a staged upload and attach the result (URL and asset reference) to its video or user"""
+    metadata = _store_upload(payload)
+
+    video_id = payload.get('video_id')
+    if video_id and payload.get('video_field'):
+        db['videos'].update_one(
+            {'_id': ObjectId(video_id)},
+            {'$set': {
+                payload['video_field']: metadata['secure_url'],
+                ASSET_FIELDS[payload['video_field']]: metadata['asset']
+            }}
+        )
+        if payload['resource_type'] == 'video':
+            update_video_metadata(video_id, metadata)
+        invalidate_video_cache(video_id)
+
+    user_id = payload.get('user_id')
+    if user_id and payload.get('user_field'):
+        db['users'].update_one(
+            {'_id': ObjectId(user_id)},
+            {'$set': {
+                payload['user_field']: metadata['secure_url'],
+                ASSET_FIELDS[payload['user_field']]: metadata['asset'],
+                'updated_at': datetime.utcnow()
+            }}
+        )
+
+    if not _staged_in_place(payload):
+        _remove_staged(payload)
+    return metadata
+
+
+def _payload_asset(payload, resource_type):
+    # Jobs queued before asset references existed carry a Cloudinary public_id
+    return payload.get('asset') or asset_ref('cloudinary', payload['public_id'], payload.get('resource_type', resource_type))
+
+
+@register_job_handler(MEDIA_DELETE_JOB)
+def run_delete(payload):
+    """Delete a stored asset (a missing asset counts as deleted)"""
+    asset = _payload_asset(payload, 'image')
+    return get_storage(asset['backend']).delete(asset['key'], resource_type=asset['resource_type'])
+
+
+@register_job_handler(MEDIA_EXTRACT_METADATA_JOB)
+def run_extract_metadata(payload):
+    """Read a stored video's metadata into its document"""
+    asset = _payload_asset(payload, 'video')
+    metadata = get_storage(asset['backend']).get_metadata(asset['key'], resource_type='video')
+    update_video_metadata(payload['video_id'], metadata)
+    return metadata
@@ -0,0 +1,85 @@
+from app.core.jobs import enqueue_job
+from app.core.storage import staging_storage, storage_for
+
+# Job types handled by app.services.utility.media_jobs
+MEDIA_UPLOAD_JOB = 'media.upload'
+MEDIA_DELETE_JOB = 'media.delete'
+MEDIA_EXTRACT_METADATA_JOB = 'media.extract_metadata'
+
+# Folder of the staging backend holding uploads waiting for a job worker
+UPLOAD_STAGING_FOLDER = 'videohub/staging'
+
+
+def stage_upload(stream, filename, resource_type, folder, options=None):
+    """
+    Store a received upload where every job worker can read it (blocking).
+
+    Staged files outlive the request and the process, unlike the request's
+    own spool. When the staging backend is also the storage of the asset
+    class, the file goes straight to its final folder and the job only
+    attaches it.
+
+    Returns:
+        Asset reference of the staged file
+    """
+    staging = staging_storage()
+    if staging is storage_for(resource_type):
+        return staging.upload_stream(stream, filename, resource_type=resource_type, folder=folder, **(options or {}))['asset']
+    return staging.upload_stream(stream, filename, resource_type=resource_type, folder=UPLOAD_STAGING_FOLDER)['asset']
+
+
+def enqueue_upload(staged, filename, resource_type, folder, user_id, video_id=None, video_field=None, target_user_id=None, user_field=None, options=None):
+    """
+    Queue storing a staged upload.
+
+    Args:
+        staged: stage_upload() result (removed from staging once stored or failed for good)
+        filename: Original file name
+        resource_type: 'video' or 'image'
+        folder: Storage folder
+        user_id: Owner of the job
+        video_id: Video to update with the result, if any
+        video_field: Video field receiving the URL ('video_url' or 'thumbnail_url')
+        target_user_id: User to update with the result, if any
+        user_field: User field receiving the URL (e.g. 'profile_picture')
+        options: Extra storage upload options (e.g. image transformations)
+
+    Returns:
+        The job ID
+    """
+    return enqueue_job(MEDIA_UPLOAD_JOB, {
+        'staged': staged,
+        'filename': filename,
+        'resource_type': resource_type,
+        'folder': folder,
+        'options': options or {},
+        'video_id': video_id,
+        'video_field': video_field,
+        'user_id': target_user_id,
+        'user_field': user_field
+    }, user_id=user_id)
+
+
+def queue_upload(stream, filename, resource_type, folder, user_id, options=None, **targets):
+    """
+    Stage a received upload and queue storing it (blocking; run off the event loop).
+
+    targets are the video_id/video_field/target_user_id/user_field of
+    enqueue_upload. Returns the job ID.
+    """
+    staged = stage_upload(stream, filename, resource_type, folder, options)
+    return enqueue_upload(staged, filename, resource_type, folder, user_id, options=options, **targets)
+
+
+def enqueue_asset_deletion(asset, user_id=None):
+    """Queue deletion of a stored asset by its reference; returns the job ID, or None without a reference"""
+    if not asset:
+        return None
+    return enqueue_job(MEDIA_DELETE_JOB, {'asset': asset}, user_id=user_id)
+
+
+def enqueue_metadata_extraction(video_id, asset, user_id=None):
+    """Queue reading duration/format/size of a stored video (by asset reference) into its document"""
+    if not asset:
+        return None
+    return enqueue_job(MEDIA_EXTRACT_METADATA_JOB, {'video_id': video_id, 'asset': asset}, user_id=user_id)
@@ -1,9 +1,10 @@
 from fastapi import HTTPException
-from app.core.database import client
+from app.core.database import client, DATABASE_NAME
 from bson.objectid import ObjectId
 from datetime import datetime
+from app.utils.pagination_utils import apply_cursor, cursor_sort
 
-db = client['videohub']
+db = client[DATABASE_NAME]
 
 
 def create_playlist(playlist_data, user_id):
@@ -31,10 +32,11 @@ def get_playlist_by_id(playlist_id):
     return playlist
 
 
-def get_all_playlists(skip=0, limit=20):
+def get_all_playlists(skip=0, limit=20, cursor=None):
     """Get all public playlists"""
-    playlists = list(db['playlists'].find({'privacy': 'public'})
-                    .sort('created_at', -1)
+    query = apply_cursor({'privacy': 'public'}, cursor, 'created_at')
+    playlists = list(db['playlists'].find(query)
+                    .sort(cursor_sort('created_at'))
                     .skip(skip)
                     .limit(limit))
     for playlist in playlists:
@@ -43,14 +45,15 @@ def get_all_playlists(skip=0, limit=20):
     return playlists
 
 
-def get_user_playlists(user_id, skip=0, limit=20, include_private=False):
+def get_user_playlists(user_id, skip=0, limit=20, include_private=False, cursor=None):
     """Get user's playlists"""
     query = {'user_id': user_id}
     if not include_private:
         query['privacy'] = 'public'
+    query = apply_cursor(query, cursor, 'created_at')
     
     playlists = list(db['playlists'].find(query)
-                    .sort('created_at', -1)
+                    .sort(cursor_sort('created_at'))
                     .skip(skip)
                     .limit(limit))
     for playlist in playlists:
@@ -1,10 +1,11 @@
 from fastapi import HTTPException
-from app.core.database import client
+from app.core.database import client, DATABASE_NAME
 from bson.objectid import ObjectId
 from datetime import datetime
 from app.utils.slug_utils import create_slug, generate_unique_slug
+from app.core.cache import response_cache, TAGS_TAG, tag_tag
 
-db = client['videohub']
+db = client[DATABASE_NAME]
 
 
 def create_tag(tag_data):
@@ -25,6 +26,7 @@ def create_tag(tag_data):
     tag_dict['is_active'] = tag_dict.get('is_active', True)
 
     result = db['tags'].insert_one(tag_dict)
+    response_cache.invalidate(TAGS_TAG)
 
     tag = db['tags'].find_one({'_id': result.inserted_id})
     tag['id'] = str(tag['_id'])
@@ -89,12 +91,15 @@ def update_tag(tag_id, update_data):
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Tag not found")
 
+    response_cache.invalidate(TAGS_TAG, tag_tag(tag_id))
     return get_tag_by_id(tag_id)
 
 
 def delete_tag(tag_id):
     """Delete a tag"""
     result = db['tags'].delete_one({'_id': ObjectId(tag_id)})
+    if result.deleted_count > 0:
+        response_cache.invalidate(TAGS_TAG, tag_tag(tag_id))
     return result.deleted_count > 0
 
 
@@ -104,6 +109,7 @@ def update_tag_video_count(tag_slug, increment=1):
         {'slug': tag_slug},
         {'$inc': {'video_count': increment}}
     )
+    response_cache.invalidate(TAGS_TAG)
 
 
 def get_or_create_tag(tag_name):
@@ -127,6 +133,7 @@ def get_or_create_tag(tag_name):
     }
     
     result = db['tags'].insert_one(tag_dict)
+    response_cache.invalidate(TAGS_TAG)
     tag = db['tags'].find_one({'_id': result.inserted_id})
     tag['id'] = str(tag['_id'])
     tag.pop('_id')
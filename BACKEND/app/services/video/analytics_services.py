@@ -0,0 +1,246 @@
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from bson.binary import Binary
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.core.database import client, DATABASE_NAME
+from app.core.background import PeriodicTask, register_background_task, claim_lease, release_lease
+from app.utils.hyperloglog import HyperLogLog
+
+db = client[DATABASE_NAME]
+
+ANALYTICS_ROLLUP_SECONDS = float(os.getenv("ANALYTICS_ROLLUP_SECONDS", "300"))
+# Views are buffered before they are written, so the newest minutes are left for the next run
+ANALYTICS_SETTLE_SECONDS = float(os.getenv("ANALYTICS_SETTLE_SECONDS", "120"))
+# A rollup run holds this lease so only one process rolls up at a time
+ANALYTICS_LEASE_SECONDS = 600
+# Views folded per aggregation; a backlog is worked through window by window
+ANALYTICS_WINDOW = timedelta(hours=6)
+# Completion percentage histogram: 10 bins of 10%
+COMPLETION_BINS = 10
+
+ROLLUP_STATE_ID = 'views_rollup'
+# Rollup collections and their bucket formats (hourly rollups expire, see indexes)
+ROLLUPS = {
+    'video_stats_hourly': '%Y%m%d%H',
+    'video_stats_daily': '%Y%m%d',
+}
+
+
+def stored_video_ids(video_id):
+    """Forms a video ID may have in the views collection (legacy views use ints)"""
+    video_id = str(video_id)
+    return [video_id, int(video_id)] if video_id.isdigit() else [video_id]
+
+
+def _view_groups(match, with_viewers=True):
+    """
+    Group views server-side by video, hour, device and completion bin.
+
+    Each group holds counts and sums only (plus the distinct viewers of the
+    group when with_viewers is set), so nothing proportional to the number of
+    views is returned to the app.
+    """
+    group = {
+        '_id': {
+            'video_id': {'$toString': '$video_id'},
+            'hour': {'$dateToString': {'format': '%Y%m%d%H', 'date': '$started_at'}},
+            'device': {'$ifNull': ['$device_type', 'unknown']},
+            'bin': {'$min': [COMPLETION_BINS - 1, {'$floor': {'$divide': [
+                {'$ifNull': ['$completion_percentage', 0]}, 100 / COMPLETION_BINS
+            ]}}]},
+        },
+        'views': {'$sum': 1},
+        'watch_time': {'$sum': {'$ifNull': ['$watch_duration', 0]}},
+        'completion_sum': {'$sum': {'$ifNull': ['$completion_percentage', 0]}},
+    }
+    if with_viewers:
+        group['viewers'] = {'$addToSet': '$user_id'}
+    return db['views'].aggregate([{'$match': match}, {'$group': group}], allowDiskUse=True)
+
+
+def _empty_stats():
+    return {
+        'views': 0,
+        'watch_time': 0,
+        'completion_sum': 0.0,
+        'completion_histogram': [0] * COMPLETION_BINS,
+        'devices': defaultdict(int),
+        'viewers': HyperLogLog(),
+    }
+
+
+def _fold_group(stats, group):
+    key = group['_id']
+    stats['views'] += group['views']
+    stats['watch_time'] += group['watch_time']
+    stats['completion_sum'] += group['completion_sum']
+    stats['completion_histogram'][max(int(key['bin']), 0)] += group['views']
+    # Device names become field names in the rollups
+    stats['devices'][str(key['device']).replace('.', '_').replace('$', '_')] += group['views']
+    # Anonymous views have no viewer to count
+    stats['viewers'].update(viewer for viewer in group.get('viewers', []) if viewer is not None)
+
+
+def rollup_window(start, end):
+    """
+    Fold the views started in [start, end) into the hourly and daily rollups.
+
+    Counters are $inc'ed; viewer sketches are merged with the stored ones. Each
+    bucket records the start of the last window folded into it and skips a
+    window it already has, so re-running a window after a partial failure (the
+    hourly rollups written, the daily ones not) never counts views twice. Only
+    one process runs this at a time (see rollup_views), in increasing windows.
+
+    Returns:
+        Number of views folded
+    """
+    buckets = {collection: defaultdict(_empty_stats) for collection in ROLLUPS}
+    for group in _view_groups({'started_at': {'$gte': start, '$lt': end}}):
+        hour = datetime.strptime(group['_id']['hour'], '%Y%m%d%H')
+        for collection, bucket_format in ROLLUPS.items():
+            bucket = datetime.strptime(hour.strftime(bucket_format), bucket_format)
+            _fold_group(buckets[collection][(group['_id']['video_id'], bucket)], group)
+
+    folded = 0
+    for collection, bucket_format in ROLLUPS.items():
+        stats_by_bucket = buckets[collection]
+        if not stats_by_bucket:
+            continue
+        ids = {key: f"{key[0]}:{key[1].strftime(bucket_format)}" for key in stats_by_bucket}
+        stored = {
+            rollup['_id']: rollup.get('viewers_hll')
+            for rollup in db[collection].find({'_id': {'$in': list(ids.values())}}, {'viewers_hll': 1})
+        }
+
+        operations = []
+        for (video_id, bucket), stats in stats_by_bucket.items():
+            rollup_id = ids[(video_id, bucket)]
+            viewers = stats['viewers'].merge(HyperLogLog.from_bytes(stored.get(rollup_id)))
+            increments = {
+                'views': stats['views'],
+                'watch_time': stats['watch_time'],
+                'completion_sum': stats['completion_sum'],
+                **{f"completion_histogram.{index}": count
+                   for index, count in enumerate(stats['completion_histogram']) if count},
+                **{f"devices.{device}": count for device, count in stats['devices'].items()},
+            }
+            operations.append(UpdateOne({'_id': rollup_id, 'window_start': {'$not': {'$gte': start}}}, {
+                '$inc': increments,
+                '$set': {
+                    'video_id': video_id,
+                    'bucket': bucket,
+                    'viewers_hll': Binary(viewers.to_bytes()),
+                    'unique_viewers': viewers.count(),
+                    'window_start': start,
+                    'updated_at': datetime.utcnow(),
+                },
+            }, upsert=True))
+            if collection == 'video_stats_daily':
+                folded += stats['views']
+        _write_rollups(collection, operations)
+    return folded
+
+
+def _write_rollups(collection, operations):
+    """Bulk write rollup updates; buckets that already have the window are skipped"""
+    try:
+        db[collection].bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        # A bucket holding the window fails the guard, so its upsert collides with it
+        errors = [error for error in e.details.get('writeErrors', []) if error.get('code') != 11000]
+        if errors or e.details.get('writeConcernErrors'):
+            raise
+
+
+def rollup_views(now=None):
+    """
+    Roll up all settled views not yet rolled up, window by window.
+
+    Progress is saved after every window, so an interrupted run resumes where it
+    stopped. A window is recorded before it is folded, so a retry folds the
+    same [start, end) again and the per-bucket guard of rollup_window applies.
+
+    Returns:
+        Number of views folded (None if another process is rolling up)
+    """
+    now = now or datetime.now()
+    state = claim_lease(db['analytics_state'], ROLLUP_STATE_ID, ANALYTICS_LEASE_SECONDS, now)
+    if state is None:
+        return None
+
+    until = now - timedelta(seconds=ANALYTICS_SETTLE_SECONDS)
+    start = state.get('processed_until')
+    if start is None:
+        first = db['views'].find_one({}, {'started_at': 1}, sort=[('started_at', 1)])
+        start = first['started_at'] if first else until
+
+    # Stop well before the lease runs out; the next run continues the backlog
+    deadline = datetime.now() + timedelta(seconds=ANALYTICS_LEASE_SECONDS / 2)
+    folded = 0
+    try:
+        while start < until and datetime.now() < deadline:
+            end = min(start + ANALYTICS_WINDOW, until)
+            if state.get('window_end') and state['window_end'] > start:
+                # An earlier run failed inside this window
+                end = state.pop('window_end')
+            db['analytics_state'].update_one({'_id': ROLLUP_STATE_ID}, {'$set': {'window_end': end}})
+            folded += rollup_window(start, end)
+            db['analytics_state'].update_one(
+                {'_id': ROLLUP_STATE_ID},
+                {'$set': {'processed_until': end}, '$unset': {'window_end': ''}}
+            )
+            state.pop('window_end', None)
+            start = end
+    finally:
+        release_lease(db['analytics_state'], ROLLUP_STATE_ID, processed_until=start)
+    return folded
+
+
+def get_rolled_up_until():
+    """End of the rolled-up range (None before the first rollup)"""
+    state = db['analytics_state'].find_one({'_id': ROLLUP_STATE_ID}, {'processed_until': 1})
+    return state.get('processed_until') if state else None
+
+
+def get_video_stats(video_id):
+    """
+    Totals for a video: daily rollups plus the views not yet rolled up.
+
+    Before the first rollup run everything is aggregated server-side from the
+    raw views instead. Unique viewers come from unique_viewer_services.
+
+    Returns:
+        Dict with views, watch_time, completion_sum, completion_histogram and devices
+    """
+    video_id = str(video_id)
+    match = {'video_id': {'$in': stored_video_ids(video_id)}}
+    rolled_up_until = get_rolled_up_until()
+    stats = _empty_stats()
+
+    if rolled_up_until is not None:
+        for rollup in db['video_stats_daily'].find({'video_id': video_id}, {'viewers_hll': 0}):
+            stats['views'] += rollup.get('views', 0)
+            stats['watch_time'] += rollup.get('watch_time', 0)
+            stats['completion_sum'] += rollup.get('completion_sum', 0)
+            for index, count in (rollup.get('completion_histogram') or {}).items():
+                stats['completion_histogram'][int(index)] += count
+            for device, count in (rollup.get('devices') or {}).items():
+                stats['devices'][device] += count
+        # The tail since the last rollup is small: a few minutes of views
+        match['started_at'] = {'$gte': rolled_up_until}
+    for group in _view_groups(match, with_viewers=False):
+        _fold_group(stats, group)
+
+    return {
+        'views': stats['views'],
+        'watch_time': stats['watch_time'],
+        'completion_sum': stats['completion_sum'],
+        'completion_histogram': stats['completion_histogram'],
+        'devices': dict(stats['devices']),
+    }
+
+
+if os.getenv("ANALYTICS_ROLLUP_ENABLED", "true").lower() != "false":
+    register_background_task(PeriodicTask('analytics-rollup', rollup_views, ANALYTICS_ROLLUP_SECONDS))
@@ -1,12 +1,19 @@
 from fastapi import HTTPException
-from app.core.database import client
-from bson.objectid import ObjectId
 from datetime import datetime
-
-db = client['videohub']
-
-
-def create_comment(comment_data, user_id):
+from app.utils.pagination_utils import apply_cursor, cursor_sort
+from app.repositories.comment_repository import (
+    insert_comment,
+    find_comment,
+    find_comments,
+    update_comment_fields,
+    delete_comment_by_id
+)
+from app.repositories.user_repository import find_users_by_ids
+from app.repositories.video_repository import find_video
+from app.services.video.counter_services import increment_video_counters_async
+
+
+async def create_comment(comment_data, user_id):
     """Create a new comment"""
     comment_dict = comment_data.dict()
     comment_dict['user_id'] = user_id
@@ -16,138 +23,108 @@ def create_comment(comment_data, user_id):
     comment_dict['is_edited'] = False
     comment_dict['is_pinned'] = False
     comment_dict['created_at'] = datetime.now()
-    
-    result = db['comments'].insert_one(comment_dict)
-    
+
+    comment_id = await insert_comment(comment_dict)
+
     # Increment video comment count
-    db['videos'].update_one(
-        {'_id': ObjectId(str(comment_data.video_id))},
-        {'$inc': {'comments_count': 1}}
-    )
-    
-    return str(result.inserted_id)
+    await increment_video_counters_async(str(comment_data.video_id), {'comments_count': 1})
 
+    return comment_id
 
-def get_comment_by_id(comment_id):
-    """Get comment by ID"""
-    comment = db['comments'].find_one({'_id': ObjectId(comment_id)})
-    if comment:
+
+async def _attach_user_info(comments):
+    """Add the author's username and picture to comments, with one lookup for all authors"""
+    users = await find_users_by_ids([comment.get('user_id') for comment in comments], ['username', 'profile_picture'])
+    for comment in comments:
         comment['id'] = str(comment['_id'])
         comment.pop('_id')
-        # Add user info
-        user = db['users'].find_one({'_id': ObjectId(comment['user_id'])}) if comment.get('user_id') else None
+        user = users.get(str(comment.get('user_id')))
         if user:
             comment['username'] = user.get('username')
             comment['user_profile_picture'] = user.get('profile_picture')
+    return comments
+
+
+async def get_comment_by_id(comment_id):
+    """Get comment by ID"""
+    comment = await find_comment(comment_id)
+    if comment:
+        await _attach_user_info([comment])
     return comment
 
 
-def get_video_comments(video_id, skip=0, limit=50):
+async def get_video_comments(video_id, skip=0, limit=50, cursor=None):
     """Get all comments for a video"""
-    comments = list(db['comments'].find({
+    query = apply_cursor({
         'video_id': video_id,
         'parent_comment_id': None  # Only top-level comments
-    })
-    .sort('created_at', -1)
-    .skip(skip)
-    .limit(limit))
-    
-    for comment in comments:
-        comment['id'] = str(comment['_id'])
-        comment.pop('_id')
-        # Add user info
-        user = db['users'].find_one({'_id': ObjectId(comment['user_id'])}) if comment.get('user_id') else None
-        if user:
-            comment['username'] = user.get('username')
-            comment['user_profile_picture'] = user.get('profile_picture')
-    return comments
+    }, cursor, 'created_at')
+    comments = await find_comments(query, cursor_sort('created_at'), skip, limit)
+    return await _attach_user_info(comments)
 
 
-def get_comment_replies(comment_id, skip=0, limit=50):
-    """Get replies to a comment"""
-    replies = list(db['comments'].find({'parent_comment_id': int(comment_id)})
-                  .sort('created_at', 1)
-                  .skip(skip)
-                  .limit(limit))
-    
+async def get_comment_replies(comment_id, skip=0, limit=50, cursor=None):
+    """Get replies to a comment (oldest first)"""
+    query = apply_cursor({'parent_comment_id': int(comment_id)}, cursor, 'created_at', direction=1)
+    replies = await find_comments(query, cursor_sort('created_at', direction=1), skip, limit)
+
     for reply in replies:
         reply['id'] = str(reply['_id'])
         reply.pop('_id')
     return replies
 
 
-def update_comment(comment_id, update_data, user_id):
-    """Update comment"""
-    comment = get_comment_by_id(comment_id)
+async def _get_own_comment(comment_id, user_id):
+    comment = await get_comment_by_id(comment_id)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
-    
+
     if comment.get('user_id') != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
-    
-    result = db['comments'].update_one(
-        {'_id': ObjectId(comment_id)},
-        {
-            '$set': {
-                'text': update_data.text,
-                'is_edited': True,
-                'edited_at': datetime.now()
-            }
-        }
-    )
-    return get_comment_by_id(comment_id)
-
-
-def delete_comment(comment_id, user_id):
+    return comment
+
+
+async def update_comment(comment_id, update_data, user_id):
+    """Update comment"""
+    await _get_own_comment(comment_id, user_id)
+
+    await update_comment_fields(comment_id, {
+        'text': update_data.text,
+        'is_edited': True,
+        'edited_at': datetime.now()
+    })
+    return await get_comment_by_id(comment_id)
+
+
+async def delete_comment(comment_id, user_id):
     """Delete comment"""
-    comment = get_comment_by_id(comment_id)
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-    
-    if comment.get('user_id') != user_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
-    
+    comment = await _get_own_comment(comment_id, user_id)
+
     # Decrement video comment count
-    db['videos'].update_one(
-        {'_id': ObjectId(str(comment.get('video_id')))},
-        {'$inc': {'comments_count': -1}}
-    )
-    
-    result = db['comments'].delete_one({'_id': ObjectId(comment_id)})
-    return result.deleted_count > 0
+    await increment_video_counters_async(str(comment.get('video_id')), {'comments_count': -1})
 
+    return await delete_comment_by_id(comment_id) > 0
 
-def pin_comment(comment_id, video_owner_id):
-    """Pin a comment (video owner only)"""
-    comment = get_comment_by_id(comment_id)
+
+async def _set_pinned(comment_id, video_owner_id, is_pinned):
+    comment = await get_comment_by_id(comment_id)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
-    
+
     # Check if user owns the video
-    video = db['videos'].find_one({'_id': ObjectId(str(comment.get('video_id')))})
+    video = await find_video(comment.get('video_id'), {'uploader_id': 1})
     if not video or video.get('uploader_id') != video_owner_id:
-        raise HTTPException(status_code=403, detail="Only video owner can pin comments")
-    
-    result = db['comments'].update_one(
-        {'_id': ObjectId(comment_id)},
-        {'$set': {'is_pinned': True}}
-    )
-    return result.modified_count > 0
+        action = "pin" if is_pinned else "unpin"
+        raise HTTPException(status_code=403, detail=f"Only video owner can {action} comments")
+
+    return await update_comment_fields(comment_id, {'is_pinned': is_pinned}) > 0
+
+
+async def pin_comment(comment_id, video_owner_id):
+    """Pin a comment (video owner only)"""
+    return await _set_pinned(comment_id, video_owner_id, True)
 
 
-def unpin_comment(comment_id, video_owner_id):
+async def unpin_comment(comment_id, video_owner_id):
     """Unpin a comment (video owner only)"""
-    comment = get_comment_by_id(comment_id)
-    if not comment:
-        raise HTTPException(status_code=404, detail="Comment not found")
-    
-    # Check if user owns the video
-    video = db['videos'].find_one({'_id': ObjectId(str(comment.get('video_id')))})
-    if not video or video.get('uploader_id') != video_owner_id:
-        raise HTTPException(status_code=403, detail="Only video owner can unpin comments")
-    
-    result = db['comments'].update_one(
-        {'_id': ObjectId(comment_id)},
-        {'$set': {'is_pinned': False}}
-    )
-    return result.modified_count > 0
+    return await _set_pinned(comment_id, video_owner_id, False)
@@ -0,0 +1,236 @@
+import os
+import random
+from collections import defaultdict
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from app.core.database import client, DATABASE_NAME
+from app.core.background import PeriodicTask, register_background_task, claim_lease, release_lease
+from app.core.cache import MemoryCacheBackend, MISS
+from app.repositories.video_repository import sum_counter_shards, upsert_counter_shard
+
+db = client[DATABASE_NAME]
+
+# Hot video statistics kept in shard documents
+VIDEO_COUNTER_FIELDS = ('views', 'likes', 'dislikes', 'comments_count', 'favorites_count')
+# Shards per video; writes to one video spread over this many documents
+VIDEO_COUNTER_SHARDS = int(os.getenv("VIDEO_COUNTER_SHARDS", "16"))
+# Seconds between folds of the shards into the video documents
+COUNTER_ROLLUP_SECONDS = float(os.getenv("COUNTER_ROLLUP_SECONDS", "10"))
+# Seconds a summed shard total is reused by reads
+COUNTER_CACHE_SECONDS = float(os.getenv("COUNTER_CACHE_SECONDS", "2"))
+# Rollups run in one process at a time under this lease
+COUNTER_ROLLUP_LEASE_ID = 'video_counter_rollup'
+COUNTER_ROLLUP_LEASE_SECONDS = 120
+# Set on shards and videos by each fold, so a replayed fold skips them
+COUNTER_FOLD_FIELD = 'counter_fold_id'
+
+_pending_cache = MemoryCacheBackend(max_entries=50000)
+
+
+def _shard_write(video_id, increments):
+    """Filter and update adding increments to a random shard of a video"""
+    shard = random.randrange(VIDEO_COUNTER_SHARDS)
+    return (
+        {'_id': f"{video_id}:{shard}"},
+        {'$inc': increments, '$set': {'video_id': str(video_id), 'updated_at': datetime.utcnow()}}
+    )
+
+
+def increment_video_counters(video_id, increments, session=None):
+    """
+    Add to a video's counters through a random shard document.
+
+    Args:
+        video_id: The video
+        increments: {field: amount} with fields from VIDEO_COUNTER_FIELDS
+        session: Optional session, to join a transaction
+    """
+    shard_filter, update = _shard_write(video_id, increments)
+    db['video_counters'].update_one(shard_filter, update, upsert=True, session=session)
+
+
+async def increment_video_counters_async(video_id, increments, session=None):
+    """increment_video_counters through the async repository, for handlers on the event loop"""
+    await upsert_counter_shard(*_shard_write(video_id, increments), session=session)
+
+
+def increment_many_video_counters(increments_by_video):
+    """Add to the counters of many videos in one bulk write ({video_id: {field: amount}})"""
+    operations = [
+        UpdateOne(*_shard_write(video_id, increments), upsert=True)
+        for video_id, increments in increments_by_video.items()
+        if increments
+    ]
+    if operations:
+        db['video_counters'].bulk_write(operations, ordered=False)
+
+
+def get_pending_counters(video_ids, use_cache=True):
+    """
+    Sum the not yet rolled up shard values of videos.
+
+    Totals are cached for COUNTER_CACHE_SECONDS, so hot videos are summed at
+    most once per interval however often they are read.
+
+    Args:
+        video_ids: Videos to sum
+        use_cache: False to always read the shards
+
+    Returns:
+        {video_id: {field: amount}} (videos without pending values map to {})
+    """
+    pending, missing = _cached_pending(video_ids, use_cache)
+    if missing:
+        rows = db['video_counters'].aggregate([
+            {'$match': {'video_id': {'$in': missing}}},
+            {'$group': {'_id': '$video_id', **{field: {'$sum': f'${field}'} for field in VIDEO_COUNTER_FIELDS}}},
+        ])
+        _cache_sums(pending, missing, rows)
+    return pending
+
+
+async def get_pending_counters_async(video_ids):
+    """get_pending_counters through the async repository, for handlers on the event loop"""
+    pending, missing = _cached_pending(video_ids, True)
+    if missing:
+        _cache_sums(pending, missing, await sum_counter_shards(missing, VIDEO_COUNTER_FIELDS))
+    return pending
+
+
+def _cached_pending(video_ids, use_cache):
+    """(cached pending values by video ID, IDs that have to be summed)"""
+    pending = {}
+    missing = []
+    for video_id in {str(video_id) for video_id in video_ids}:
+        cached = _pending_cache.get(video_id) if use_cache else MISS
+        if cached is MISS:
+            missing.append(video_id)
+        else:
+            pending[video_id] = cached
+    return pending, missing
+
+
+def _cache_sums(pending, missing, rows):
+    """Cache the summed shard rows of the missing videos and add them to pending"""
+    sums = {video_id: {} for video_id in missing}
+    for row in rows:
+        sums[row['_id']] = {field: row[field] for field in VIDEO_COUNTER_FIELDS if row.get(field)}
+    for video_id, values in sums.items():
+        _pending_cache.set(video_id, values, COUNTER_CACHE_SECONDS)
+        pending[video_id] = values
+
+
+def _add_pending(videos, pending, id_key):
+    for video in videos:
+        for field, amount in pending.get(str(video.get(id_key)), {}).items():
+            video[field] = video.get(field, 0) + amount
+    return videos
+
+
+def apply_pending_counters(videos, id_key='id'):
+    """Add pending shard values to the counters of video dicts, in place"""
+    if not videos:
+        return videos
+    return _add_pending(videos, get_pending_counters([video[id_key] for video in videos if video.get(id_key)]), id_key)
+
+
+async def apply_pending_counters_async(videos, id_key='id'):
+    """apply_pending_counters through the async repository, for handlers on the event loop"""
+    if not videos:
+        return videos
+    pending = await get_pending_counters_async([video[id_key] for video in videos if video.get(id_key)])
+    return _add_pending(videos, pending, id_key)
+
+
+def _apply_fold(fold):
+    """
+    Move the values of a recorded fold from its shards to its videos.
+
+    Both writes are guarded by the fold ID they set, so replaying a fold after
+    a crash skips the shards and videos it already reached.
+    """
+    fold_id = fold['_id']
+    shard_operations = [
+        UpdateOne(
+            {'_id': shard['_id'], COUNTER_FOLD_FIELD: {'$ne': fold_id}},
+            {'$inc': {field: -amount for field, amount in shard['values'].items()}, '$set': {COUNTER_FOLD_FIELD: fold_id}}
+        )
+        for shard in fold['shards']
+    ]
+    if shard_operations:
+        db['video_counters'].bulk_write(shard_operations, ordered=False)
+    video_operations = [
+        UpdateOne(
+            {'_id': ObjectId(video_id), COUNTER_FOLD_FIELD: {'$ne': fold_id}},
+            {'$inc': values, '$set': {COUNTER_FOLD_FIELD: fold_id}}
+        )
+        for video_id, values in fold['totals'].items()
+        if ObjectId.is_valid(video_id)
+    ]
+    if video_operations:
+        db['videos'].bulk_write(video_operations, ordered=False)
+    db['video_counter_folds'].delete_one({'_id': fold_id})
+    # Cached pending totals would now be counted twice
+    for video_id in fold['totals']:
+        _pending_cache.delete(video_id)
+    return len(video_operations)
+
+
+def rollup_video_counters():
+    """
+    Fold shard values into the video documents.
+
+    Runs in one process at a time (a lease in analytics_state). Each fold is
+    recorded in video_counter_folds before it is applied and replayed by the
+    next run if this one stops halfway, so no value is folded twice or lost.
+    Increments landing on a shard after it was read stay for the next rollup.
+    Emptied shards are removed.
+
+    Returns:
+        Number of videos updated (None if another process is rolling up)
+    """
+    if claim_lease(db['analytics_state'], COUNTER_ROLLUP_LEASE_ID, COUNTER_ROLLUP_LEASE_SECONDS) is None:
+        return None
+    try:
+        updated = 0
+        # Folds left behind by an interrupted run
+        for fold in db['video_counter_folds'].find({}).sort('_id', 1):
+            updated += _apply_fold(fold)
+
+        shards = list(db['video_counters'].find({}))
+        totals = defaultdict(lambda: defaultdict(int))
+        fold_shards = []
+        for shard in shards:
+            values = {field: shard[field] for field in VIDEO_COUNTER_FIELDS if shard.get(field)}
+            if not values:
+                continue
+            for field, amount in values.items():
+                totals[shard['video_id']][field] += amount
+            fold_shards.append({'_id': shard['_id'], 'values': values})
+
+        if fold_shards:
+            fold = {
+                '_id': ObjectId(),
+                'shards': fold_shards,
+                'totals': {video_id: dict(values) for video_id, values in totals.items()},
+            }
+            db['video_counter_folds'].insert_one(fold)
+            updated += _apply_fold(fold)
+
+        if shards:
+            db['video_counters'].delete_many({
+                '_id': {'$in': [shard['_id'] for shard in shards]},
+                **{field: {'$in': [0, None]} for field in VIDEO_COUNTER_FIELDS}
+            })
+        return updated
+    finally:
+        release_lease(db['analytics_state'], COUNTER_ROLLUP_LEASE_ID)
+
+
+register_background_task(PeriodicTask(
+    'video-counter-rollup',
+    rollup_video_counters,
+    COUNTER_ROLLUP_SECONDS,
+    on_stop=rollup_video_counters
+))
@@ -1,114 +1,112 @@
+import os
 from fastapi import HTTPException
-from app.core.database import client
+from app.core.database import client, DATABASE_NAME, get_async_client
 from bson.objectid import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.utils.pagination_utils import apply_cursor, cursor_sort, encode_cursor
+from app.core.background import PeriodicTask, register_background_task
+from app.repositories.like_repository import find_like, toggle_reaction, clear_reaction
+from app.services.video.counter_services import increment_video_counters_async, get_pending_counters
+from app.services.video.recommendation_services import record_affinity_async, AFFINITY_SIGNALS
 
-db = client['videohub']
+db = client[DATABASE_NAME]
 
+# Video counter moved by each reaction type
+COUNTER_FIELDS = {'like': 'likes', 'dislike': 'dislikes'}
+# Run the toggle in a transaction (needs a replica set); otherwise the reconciler
+# repairs the counters if a process dies between the flip and the counter update
+LIKE_USE_TRANSACTIONS = os.getenv("LIKE_USE_TRANSACTIONS", "false").lower() == "true"
 
-def create_like(like_data, user_id):
-    """Create or update a like/dislike"""
-    # Check if like already exists
-    existing_like = db['likes'].find_one({
-        'user_id': user_id,
-        'video_id': like_data.video_id
-    })
-    
-    if existing_like:
-        # Update existing like
-        old_type = existing_like.get('like_type')
-        
-        # If same type, remove it (toggle off)
-        if old_type == like_data.like_type:
-            db['likes'].delete_one({'_id': existing_like['_id']})
-            
-            # Decrement count
-            if old_type == 'like':
-                db['videos'].update_one(
-                    {'_id': ObjectId(str(like_data.video_id))},
-                    {'$inc': {'likes': -1}}
-                )
-            else:
-                db['videos'].update_one(
-                    {'_id': ObjectId(str(like_data.video_id))},
-                    {'$inc': {'dislikes': -1}}
-                )
-            return {"action": "removed", "like_type": old_type}
-        else:
-            # Change from like to dislike or vice versa
-            db['likes'].update_one(
-                {'_id': existing_like['_id']},
-                {'$set': {'like_type': like_data.like_type}}
-            )
-            
-            # Update counts
-            if like_data.like_type == 'like':
-                db['videos'].update_one(
-                    {'_id': ObjectId(str(like_data.video_id))},
-                    {'$inc': {'likes': 1, 'dislikes': -1}}
-                )
-            else:
-                db['videos'].update_one(
-                    {'_id': ObjectId(str(like_data.video_id))},
-                    {'$inc': {'likes': -1, 'dislikes': 1}}
-                )
-            return {"action": "updated", "like_type": like_data.like_type}
+LIKE_RECONCILE_SECONDS = float(os.getenv("LIKE_RECONCILE_SECONDS", "300"))
+# Likes changed within this window are checked on each periodic run
+LIKE_RECONCILE_WINDOW_SECONDS = float(os.getenv("LIKE_RECONCILE_WINDOW_SECONDS", "1800"))
+# Videos with likes changed more recently than this are left for the next run
+LIKE_RECONCILE_SETTLE_SECONDS = float(os.getenv("LIKE_RECONCILE_SETTLE_SECONDS", "60"))
+LIKE_TOMBSTONE_TTL_SECONDS = float(os.getenv("LIKE_TOMBSTONE_TTL_SECONDS", "86400"))
+
+
+async def _apply_toggle(user_id, video_id, requested_type, now, session=None):
+    """
+    Flip one like document and move the video counters by the same transition.
+
+    The flip is a single atomic (up)sert on the unique (user_id, video_id) index,
+    so concurrent clicks are serialized by the database and each sees the exact
+    previous state. Removed reactions stay as tombstones (like_type None) until
+    the reconciler purges them.
+
+    Args:
+        requested_type: 'like'/'dislike' to toggle that reaction, None to remove any
+
+    Returns:
+        (old_type, new_type)
+    """
+    if requested_type is None:
+        previous = await clear_reaction(user_id, video_id, COUNTER_FIELDS, now, session=session)
     else:
-        # Create new like
-        like_dict = like_data.dict()
-        like_dict['user_id'] = user_id
-        like_dict['created_at'] = datetime.now()
-        
-        result = db['likes'].insert_one(like_dict)
-        
-        # Increment count
-        if like_data.like_type == 'like':
-            db['videos'].update_one(
-                {'_id': ObjectId(str(like_data.video_id))},
-                {'$inc': {'likes': 1}}
-            )
-        else:
-            db['videos'].update_one(
-                {'_id': ObjectId(str(like_data.video_id))},
-                {'$inc': {'dislikes': 1}}
+        previous = await toggle_reaction(user_id, video_id, requested_type, now, session=session)
+
+    old_type = previous.get('like_type') if previous else None
+    new_type = None if old_type == requested_type else requested_type
+
+    increments = {}
+    if old_type in COUNTER_FIELDS:
+        increments[COUNTER_FIELDS[old_type]] = -1
+    if new_type in COUNTER_FIELDS:
+        increments[COUNTER_FIELDS[new_type]] = 1
+    if increments:
+        await increment_video_counters_async(str(video_id), increments, session=session)
+    return old_type, new_type
+
+
+async def _toggle(user_id, video_id, requested_type):
+    now = datetime.now()
+    if LIKE_USE_TRANSACTIONS:
+        # On a replica set the flip and the counter update commit together
+        async with get_async_client().start_session() as session:
+            old_type, new_type = await session.with_transaction(
+                lambda s: _apply_toggle(user_id, video_id, requested_type, now, session=s)
             )
-        
-        return {"action": "created", "like_type": like_data.like_type, "id": str(result.inserted_id)}
+    else:
+        try:
+            old_type, new_type = await _apply_toggle(user_id, video_id, requested_type, now)
+        except DuplicateKeyError:
+            # Two first clicks raced to insert the same document; the retry updates it
+            old_type, new_type = await _apply_toggle(user_id, video_id, requested_type, now)
 
+    # Move the user's recommendation affinities by the same transition
+    await record_affinity_async(
+        user_id, video_id, AFFINITY_SIGNALS.get(new_type, 0) - AFFINITY_SIGNALS.get(old_type, 0), now
+    )
+    return old_type, new_type
 
-def remove_like(video_id, user_id):
-    """Remove like/dislike from video"""
-    like = db['likes'].find_one({
-        'user_id': user_id,
-        'video_id': video_id
-    })
-    
-    if not like:
-        raise HTTPException(status_code=404, detail="Like not found")
-    
-    like_type = like.get('like_type')
-    
-    # Remove like
-    result = db['likes'].delete_one({'_id': like['_id']})
+
+async def create_like(like_data, user_id):
+    """Toggle a like/dislike (clicking the same reaction again removes it)"""
+    if like_data.like_type not in COUNTER_FIELDS:
+        raise HTTPException(status_code=400, detail="like_type must be 'like' or 'dislike'")
     
-    # Decrement count
-    if like_type == 'like':
-        db['videos'].update_one(
-            {'_id': ObjectId(str(video_id))},
-            {'$inc': {'likes': -1}}
-        )
-    else:
-        db['videos'].update_one(
-            {'_id': ObjectId(str(video_id))},
-            {'$inc': {'dislikes': -1}}
-        )
+    old_type, new_type = await _toggle(user_id, like_data.video_id, like_data.like_type)
     
-    return result.deleted_count > 0
+    if new_type is None:
+        return {"action": "removed", "like_type": old_type}
+    if old_type is None:
+        return {"action": "created", "like_type": new_type}
+    return {"action": "updated", "like_type": new_type}
+
+
+async def remove_like(video_id, user_id):
+    """Remove like/dislike from video"""
+    old_type, _ = await _toggle(user_id, video_id, None)
+    if old_type is None:
+        raise HTTPException(status_code=404, detail="Like not found")
+    return True
 
 
 def get_video_likes(video_id, skip=0, limit=100):
     """Get all likes for a video"""
-    likes = list(db['likes'].find({'video_id': video_id})
+    likes = list(db['likes'].find({'video_id': video_id, 'like_type': {'$in': list(COUNTER_FIELDS)}})
                 .sort('created_at', -1)
                 .skip(skip)
                 .limit(limit))
@@ -119,18 +117,25 @@ def get_video_likes(video_id, skip=0, limit=100):
     return likes
 
 
-def get_user_liked_videos(user_id, skip=0, limit=20):
-    """Get videos liked by user with video details"""
-    likes = list(db['likes'].find({
-        'user_id': user_id,
-        'like_type': 'like'
-    })
-    .sort('created_at', -1)
+def get_user_liked_videos(user_id, skip=0, limit=20, cursor=None):
+    """
+    Get videos liked by user with video details
+    Returns: (videos, next_cursor)
+    """
+    # Likes are unique per (user, video), so video_id breaks created_at ties
+    query = apply_cursor({'user_id': user_id, 'like_type': 'like'}, cursor, 'created_at', 'video_id')
+    likes = list(db['likes'].find(query)
+    .sort(cursor_sort('created_at', 'video_id'))
     .skip(skip)
     .limit(limit))
     
     if not likes:
-        return []
+        return [], None
+    
+    # Built from the likes page, so likes of deleted videos don't end pagination early
+    next_cursor = None
+    if len(likes) == limit:
+        next_cursor = encode_cursor(likes[-1].get('created_at'), likes[-1].get('video_id'))
     
     # Get video IDs
     video_ids = []
@@ -143,7 +148,7 @@ def get_user_liked_videos(user_id, skip=0, limit=20):
             pass
     
     if not video_ids:
-        return []
+        return [], next_cursor
     
     # Fetch video details
     videos = list(db['videos'].find(
@@ -176,15 +181,12 @@ def get_user_liked_videos(user_id, skip=0, limit=20):
             video['liked_at'] = like.get('created_at')
             result.append(video)
     
-    return result
+    return result, next_cursor
 
 
-def get_like_status(video_id, user_id):
+async def get_like_status(video_id, user_id):
     """Check if user liked/disliked video"""
-    like = db['likes'].find_one({
-        'user_id': user_id,
-        'video_id': video_id
-    })
+    like = await find_like(user_id, video_id)
     
     if like:
         return {
@@ -194,3 +196,78 @@ def get_like_status(video_id, user_id):
         }
     
     return {"liked": False, "disliked": False, "like_type": None}
+
+
+def reconcile_like_counts(full=False, now=None):
+    """
+    Repair drift between video like/dislike counters and the likes collection.
+
+    By default only videos whose likes changed in the last LIKE_RECONCILE_WINDOW_SECONDS
+    are checked; full=True checks every video. Videos touched within the settle
+    window are skipped so in-flight toggles are never "repaired", and each fix is
+    conditional on the counters still holding the values that were read. Pending
+    counter shards are taken into account. Also purges old tombstones.
+
+    Returns:
+        {'checked': n, 'repaired': n, 'tombstones_purged': n}
+    """
+    now = now or datetime.now()
+    settled_before = now - timedelta(seconds=LIKE_RECONCILE_SETTLE_SECONDS)
+
+    if full:
+        likes_match, video_query = {}, {}
+    else:
+        since = now - timedelta(seconds=LIKE_RECONCILE_WINDOW_SECONDS)
+        recent = db['likes'].distinct('video_id', {'updated_at': {'$gte': since}})
+        likes_match = {'video_id': {'$in': recent}}
+        video_query = {'_id': {'$in': [ObjectId(video_id) for video_id in recent if ObjectId.is_valid(video_id)]}}
+
+    # Counters are read before the likes: a toggle that flips after this read either
+    # shows up as a recent change (skipped) or fails the conditional update below
+    counters = {
+        str(video['_id']): (video.get('likes', 0), video.get('dislikes', 0))
+        for video in db['videos'].find(video_query, {'likes': 1, 'dislikes': 1})
+    }
+    # Shard values not yet rolled into the videos count towards the totals
+    pending = get_pending_counters(list(counters), use_cache=False)
+
+    actual = {}
+    for row in db['likes'].aggregate([
+        {'$match': likes_match},
+        {'$group': {
+            '_id': '$video_id',
+            'likes': {'$sum': {'$cond': [{'$eq': ['$like_type', 'like']}, 1, 0]}},
+            'dislikes': {'$sum': {'$cond': [{'$eq': ['$like_type', 'dislike']}, 1, 0]}},
+            'last_change': {'$max': '$updated_at'},
+        }},
+    ]):
+        actual[row['_id']] = row
+
+    operations = []
+    for video_id, (likes, dislikes) in counters.items():
+        row = actual.get(video_id)
+        if row and row.get('last_change') and row['last_change'] > settled_before:
+            continue
+        expected = (row['likes'], row['dislikes']) if row else (0, 0)
+        video_pending = pending.get(video_id, {})
+        expected = (expected[0] - video_pending.get('likes', 0), expected[1] - video_pending.get('dislikes', 0))
+        if expected != (likes, dislikes):
+            operations.append(UpdateOne(
+                {'_id': ObjectId(video_id), 'likes': likes, 'dislikes': dislikes},
+                {'$set': {'likes': expected[0], 'dislikes': expected[1]}}
+            ))
+
+    repaired = 0
+    if operations:
+        repaired = db['videos'].bulk_write(operations, ordered=False).modified_count
+
+    purged = db['likes'].delete_many({
+        'like_type': None,
+        'updated_at': {'$lt': now - timedelta(seconds=LIKE_TOMBSTONE_TTL_SECONDS)}
+    }).deleted_count
+
+    return {'checked': len(counters), 'repaired': repaired, 'tombstones_purged': purged}
+
+
+if os.getenv("LIKE_RECONCILER_ENABLED", "true").lower() != "false":
+    register_background_task(PeriodicTask('like-reconciler', reconcile_like_counts, LIKE_RECONCILE_SECONDS))
@@ -0,0 +1,113 @@
+import os
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from pymongo import ReplaceOne
+from app.core.database import client, DATABASE_NAME
+from app.core.background import PeriodicTask, register_background_task
+from app.core.cache import response_cache, VIDEO_FEEDS_TAG
+from app.repositories.video_repository import find_top_ranked_video_ids
+
+db = client[DATABASE_NAME]
+
+# Only activity inside this window is scored; older activity has decayed to ~0 anyway
+RANKING_WINDOW_HOURS = int(os.getenv("RANKING_WINDOW_HOURS", "168"))
+RANKING_REFRESH_SECONDS = float(os.getenv("RANKING_REFRESH_SECONDS", "300"))
+
+# Half-lives of the two scores: trending follows the week, hot follows the last hours
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "48"))
+HOT_HALF_LIFE_HOURS = float(os.getenv("HOT_HALF_LIFE_HOURS", "6"))
+
+# Weight of one event of each kind in each score
+TRENDING_WEIGHTS = {'views': 1.0, 'likes': 2.0, 'comments': 3.0}
+HOT_WEIGHTS = {'views': 0.1, 'likes': 1.0, 'comments': 2.0}
+
+# (collection, timestamp field, extra filter) of each activity source
+ACTIVITY_SOURCES = {
+    'views': ('views', 'started_at', {}),
+    'likes': ('likes', 'created_at', {'like_type': 'like'}),
+    'comments': ('comments', 'created_at', {}),
+}
+
+
+def _decay_sum(time_field, now, half_life_hours):
+    """Aggregation expression summing exp(-age / tau) over events, i.e. a decayed count"""
+    tau_ms = half_life_hours * 3600 * 1000 / math.log(2)
+    return {'$sum': {'$exp': {'$divide': [{'$subtract': [f'${time_field}', now]}, tau_ms]}}}
+
+
+def _collect_activity(now):
+    """Decayed activity per video and source, for both half-lives"""
+    since = now - timedelta(hours=RANKING_WINDOW_HOURS)
+    activity = defaultdict(lambda: {'trending': defaultdict(float), 'hot': defaultdict(float)})
+
+    for source, (collection_name, time_field, extra_filter) in ACTIVITY_SOURCES.items():
+        pipeline = [
+            {'$match': {time_field: {'$gte': since, '$lte': now}, **extra_filter}},
+            {'$group': {
+                '_id': {'$toString': '$video_id'},
+                'trending': _decay_sum(time_field, now, TRENDING_HALF_LIFE_HOURS),
+                'hot': _decay_sum(time_field, now, HOT_HALF_LIFE_HOURS),
+            }},
+        ]
+        for row in db[collection_name].aggregate(pipeline):
+            activity[row['_id']]['trending'][source] += row['trending']
+            activity[row['_id']]['hot'][source] += row['hot']
+
+    return activity
+
+
+def compute_rankings(now=None):
+    """
+    Recompute trending and hot scores into the video_rankings collection.
+
+    Cost depends on activity inside the window, not on catalog size. Videos with no
+    recent activity drop out of the collection.
+
+    Returns:
+        Number of ranked videos
+    """
+    now = now or datetime.now()
+    activity = _collect_activity(now)
+
+    video_ids = [ObjectId(video_id) for video_id in activity if ObjectId.is_valid(video_id)]
+    published = set()
+    if video_ids:
+        published = {str(video['_id']) for video in db['videos'].find(
+            {'_id': {'$in': video_ids}, 'status': 'published'}, {'_id': 1}
+        )}
+
+    operations = []
+    for video_id in published:
+        scores = activity[video_id]
+        operations.append(ReplaceOne({'_id': video_id}, {
+            'trending_score': sum(TRENDING_WEIGHTS[source] * value for source, value in scores['trending'].items()),
+            'hot_score': sum(HOT_WEIGHTS[source] * value for source, value in scores['hot'].items()),
+            'computed_at': now,
+        }, upsert=True))
+
+    if operations:
+        db['video_rankings'].bulk_write(operations, ordered=False)
+    db['video_rankings'].delete_many({'computed_at': {'$lt': now}})
+    # Cached trending/hot feeds were built from the previous rankings
+    response_cache.invalidate(VIDEO_FEEDS_TAG)
+    return len(operations)
+
+
+async def get_top_ranked_video_ids(score_field, limit=20):
+    """
+    Read the top-N video IDs for a score from the materialized rankings.
+
+    Args:
+        score_field: 'trending_score' or 'hot_score'
+        limit: Number of IDs to return
+
+    Returns:
+        List of video ID strings, best first (empty until the first ranking run)
+    """
+    return await find_top_ranked_video_ids(score_field, limit)
+
+
+if os.getenv("RANKING_JOB_ENABLED", "true").lower() != "false":
+    register_background_task(PeriodicTask('video-rankings', compute_rankings, RANKING_REFRESH_SECONDS, run_on_start=True))
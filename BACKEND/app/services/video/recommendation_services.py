@@ -0,0 +1,417 @@
+import os
+import math
+import threading
+from collections import defaultdict
+from datetime import datetime
+import numpy as np
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from starlette.concurrency import run_in_threadpool
+from app.core.database import client, DATABASE_NAME
+from app.core.background import PeriodicTask, register_background_task
+from app.core.cache import response_cache, recommendations_tag
+
+db = client[DATABASE_NAME]
+
+# Affinity added per signal; a dislike pushes its categories/tags down
+AFFINITY_SIGNALS = {'watch': 1.0, 'complete': 1.0, 'like': 3.0, 'dislike': -2.0}
+# Older signals count less: an affinity halves every AFFINITY_HALF_LIFE_DAYS
+AFFINITY_HALF_LIFE_DAYS = float(os.getenv("AFFINITY_HALF_LIFE_DAYS", "30"))
+# Stored weights are scaled by exp((t - AFFINITY_EPOCH) / tau) when added, so decay
+# needs no rewrites: all weights share the factor exp(-(now - epoch) / tau) at read time
+AFFINITY_EPOCH = datetime(2024, 1, 1)
+# History read when a user's affinities are first built
+AFFINITY_BACKFILL_LIMIT = 200
+# Seconds between flushes of buffered signals; recommendations are cached longer anyway
+AFFINITY_FLUSH_SECONDS = float(os.getenv("AFFINITY_FLUSH_SECONDS", "10"))
+# Buffered (user, video) signals that trigger an immediate flush
+AFFINITY_MAX_PENDING = int(os.getenv("AFFINITY_MAX_PENDING", "5000"))
+# Categories and tags kept per user (each), strongest first; bounds the affinity
+# document and the columns of the scoring matrix
+AFFINITY_MAX_KEYS = int(os.getenv("AFFINITY_MAX_KEYS", "200"))
+
+# Recommendations computed (and cached) per user
+RECOMMENDATION_TOP_K = int(os.getenv("RECOMMENDATION_TOP_K", "100"))
+RECOMMENDATION_TTL_SECONDS = int(os.getenv("RECOMMENDATION_TTL_SECONDS", "600"))
+# Candidate videos scored per computation
+RECOMMENDATION_CANDIDATES = int(os.getenv("RECOMMENDATION_CANDIDATES", "1000"))
+# Strongest categories/tags used to select candidates
+CANDIDATE_CATEGORIES = 20
+CANDIDATE_TAGS = 30
+
+# Score = affinity + popularity + freshness, each scaled to [0, 1] first
+CATEGORY_AFFINITY_WEIGHT = 1.0
+TAG_AFFINITY_WEIGHT = 0.5
+SCORE_WEIGHTS = {'affinity': 0.7, 'popularity': 0.2, 'freshness': 0.1}
+FRESHNESS_HALF_LIFE_DAYS = float(os.getenv("FRESHNESS_HALF_LIFE_DAYS", "14"))
+
+CANDIDATE_FIELDS = {'categories': 1, 'tags': 1, 'views': 1, 'likes': 1, 'created_at': 1}
+
+
+def _affinity_key(name):
+    """Field-safe key for a category/tag name ('.' and '$' can't appear in update paths)"""
+    return str(name).replace('%', '%25').replace('.', '%2E').replace('$', '%24')
+
+
+def _affinity_name(key):
+    """Inverse of _affinity_key"""
+    return key.replace('%2E', '.').replace('%24', '$').replace('%25', '%')
+
+
+def _as_list(value):
+    if not value:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _strongest(affinities):
+    """The AFFINITY_MAX_KEYS affinities of largest magnitude (dislikes count as strong too)"""
+    if len(affinities) <= AFFINITY_MAX_KEYS:
+        return dict(affinities)
+    return dict(sorted(affinities.items(), key=lambda item: abs(item[1]), reverse=True)[:AFFINITY_MAX_KEYS])
+
+
+def _trim_update(document):
+    """$unset of the keys beyond the AFFINITY_MAX_KEYS strongest of each field (None if within bounds)"""
+    unset = {}
+    for field in ('categories', 'tags'):
+        affinities = document.get(field) or {}
+        kept = _strongest(affinities)
+        unset.update({f"{field}.{key}": "" for key in affinities if key not in kept})
+    return {'$unset': unset} if unset else None
+
+
+def _scaled(weight, at):
+    """weight in the epoch scale of the stored affinities"""
+    tau_days = AFFINITY_HALF_LIFE_DAYS / math.log(2)
+    return weight * math.exp((at - AFFINITY_EPOCH).total_seconds() / 86400 / tau_days)
+
+
+def _affinity_increments(video, value):
+    """$inc of a signal (in the epoch scale, see _scaled) on a video, over the video's categories and tags"""
+    increments = {}
+    for category in _as_list(video.get('categories')):
+        increments[f"categories.{_affinity_key(category)}"] = value
+    for tag in _as_list(video.get('tags')):
+        increments[f"tags.{_affinity_key(tag)}"] = value
+    return increments
+
+
+class AffinityBuffer:
+    """
+    Buffers affinity signals in memory and applies them in periodic bulk writes.
+
+    Signals are summed per (user, video) in the epoch scale, so a flush costs
+    one $in lookup of the videos' categories/tags and one bulk $inc per user,
+    however many likes and watches came in. Recording a signal costs no round
+    trip; a crash loses at most one flush interval of signals.
+    """
+
+    def __init__(self, db_client, max_pending=AFFINITY_MAX_PENDING):
+        self.db = db_client
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(float)  # (user_id, video_id) -> scaled weight
+
+    def add(self, user_id, video_id, weight, at=None):
+        if self._add(user_id, video_id, weight, at):
+            self.flush()
+
+    async def add_async(self, user_id, video_id, weight, at=None):
+        """add for handlers on the event loop; a full buffer is flushed in the threadpool"""
+        if self._add(user_id, video_id, weight, at):
+            await run_in_threadpool(self.flush)
+
+    def _add(self, user_id, video_id, weight, at):
+        """Buffer a signal; returns whether the buffer is full"""
+        with self._lock:
+            self._pending[(str(user_id), str(video_id))] += _scaled(weight, at or datetime.now())
+            return len(self._pending) >= self.max_pending
+
+    def discard(self, user_id):
+        """Drop a user's buffered signals (their affinities are being rebuilt or reset)"""
+        with self._lock:
+            for key in [key for key in self._pending if key[0] == str(user_id)]:
+                self._pending.pop(key)
+
+    def flush(self):
+        """Apply all buffered signals; only users whose affinities were built are updated"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(float)
+            if not pending:
+                return 0
+
+            try:
+                object_ids = list({ObjectId(video_id) for _, video_id in pending})
+                videos = {
+                    str(video['_id']): video
+                    for video in self.db['videos'].find({'_id': {'$in': object_ids}}, {'categories': 1, 'tags': 1})
+                }
+                increments = defaultdict(lambda: defaultdict(float))
+                for (user_id, video_id), value in pending.items():
+                    video = videos.get(video_id)
+                    if not video or not value:
+                        continue
+                    for path, amount in _affinity_increments(video, value).items():
+                        increments[user_id][path] += amount
+
+                now = datetime.now()
+                operations = [
+                    UpdateOne({'_id': user_id}, {'$inc': dict(user_increments), '$set': {'updated_at': now}})
+                    for user_id, user_increments in increments.items()
+                ]
+                if operations:
+                    self.db['user_affinities'].bulk_write(operations, ordered=False)
+            except Exception as e:
+                print(f"Warning: Affinity flush failed: {str(e)}")
+                self._requeue(pending)
+                return 0
+            self._trim(list(increments))
+            return len(operations)
+
+    def _trim(self, user_ids):
+        """Drop the weakest keys of the updated users whose affinities outgrew AFFINITY_MAX_KEYS"""
+        try:
+            operations = []
+            for document in self.db['user_affinities'].find({'_id': {'$in': user_ids}}, {'categories': 1, 'tags': 1}):
+                update = _trim_update(document)
+                if update:
+                    operations.append(UpdateOne({'_id': document['_id']}, update))
+            if operations:
+                self.db['user_affinities'].bulk_write(operations, ordered=False)
+        except Exception as e:
+            # Applied signals stay applied; the next flush of these users trims again
+            print(f"Warning: Affinity trim failed: {str(e)}")
+
+    def _requeue(self, pending):
+        """Add a failed batch back to the buffer, dropping it if the buffer is full"""
+        with self._lock:
+            if len(self._pending) + len(pending) > self.max_pending * 2:
+                print(f"Warning: Dropped {len(pending)} buffered affinity signals")
+                return
+            for key, value in pending.items():
+                self._pending[key] += value
+
+
+affinity_buffer = AffinityBuffer(db)
+
+
+def record_affinity(user_id, video_id, weight, at=None):
+    """
+    Add a signal to a user's category/tag affinities.
+
+    Signals are buffered and applied in bulk by affinity_buffer, so recording
+    one adds no round trip to the action. Only users whose affinities were
+    already built are updated; the others are built from their full history
+    on their first recommendation request.
+
+    Args:
+        user_id: The user
+        video_id: The video the signal is about
+        weight: Signal strength (see AFFINITY_SIGNALS; negative to take one back)
+        at: When it happened (default now)
+    """
+    if not weight or not ObjectId.is_valid(str(video_id)):
+        return
+    affinity_buffer.add(user_id, video_id, weight, at)
+
+
+async def record_affinity_async(user_id, video_id, weight, at=None):
+    """record_affinity for handlers on the event loop"""
+    if not weight or not ObjectId.is_valid(str(video_id)):
+        return
+    await affinity_buffer.add_async(user_id, video_id, weight, at)
+
+
+def build_user_affinity(user_id):
+    """
+    (Re)build a user's affinities from their recent watch history and reactions.
+
+    Returns:
+        The affinity document
+    """
+    # Buffered signals are of actions already written, which the history read covers
+    affinity_buffer.discard(user_id)
+    now = datetime.now()
+    signals = []  # (video_id, weight, at)
+    for item in db['watch_history'].find({'user_id': user_id}).sort('last_watched_at', -1).limit(AFFINITY_BACKFILL_LIMIT):
+        at = item.get('created_at') or item.get('last_watched_at') or now
+        signals.append((str(item['video_id']), AFFINITY_SIGNALS['watch'], at))
+        if item.get('is_completed'):
+            signals.append((str(item['video_id']), AFFINITY_SIGNALS['complete'], item.get('last_watched_at') or at))
+    for like in db['likes'].find(
+        {'user_id': user_id, 'like_type': {'$in': ['like', 'dislike']}}
+    ).sort('created_at', -1).limit(AFFINITY_BACKFILL_LIMIT):
+        signals.append((like['video_id'], AFFINITY_SIGNALS[like['like_type']], like.get('created_at') or now))
+
+    object_ids = list({ObjectId(video_id) for video_id, _, _ in signals if ObjectId.is_valid(video_id)})
+    videos = {}
+    if object_ids:
+        videos = {
+            str(video['_id']): video
+            for video in db['videos'].find({'_id': {'$in': object_ids}}, {'categories': 1, 'tags': 1})
+        }
+
+    affinity = {'categories': defaultdict(float), 'tags': defaultdict(float)}
+    for video_id, weight, at in signals:
+        video = videos.get(video_id)
+        if not video:
+            continue
+        for path, value in _affinity_increments(video, _scaled(weight, at)).items():
+            field, key = path.split('.', 1)
+            affinity[field][key] += value
+
+    document = {
+        'categories': _strongest(affinity['categories']),
+        'tags': _strongest(affinity['tags']),
+        'built_at': now,
+        'updated_at': now,
+    }
+    db['user_affinities'].replace_one({'_id': str(user_id)}, document, upsert=True)
+    return document
+
+
+def get_user_affinity(user_id):
+    """A user's affinity document, built from history on first use"""
+    return db['user_affinities'].find_one({'_id': str(user_id)}) or build_user_affinity(user_id)
+
+
+def reset_user_affinity(user_id):
+    """Forget a user's affinities and cached recommendations (e.g. after clearing history)"""
+    affinity_buffer.discard(user_id)
+    db['user_affinities'].delete_one({'_id': str(user_id)})
+    response_cache.invalidate(recommendations_tag(user_id))
+
+
+def _top_keys(affinities, count):
+    positive = [(weight, key) for key, weight in affinities.items() if weight > 0]
+    return [key for _, key in sorted(positive, reverse=True)[:count]]
+
+
+def score_candidates(candidates, category_affinity, tag_affinity, now, top_k):
+    """
+    Rank candidate videos for a user with vectorized scoring.
+
+    The affinity of a video is the dot product of its category/tag incidence row
+    with the user's affinity vector; it is blended with log-scaled popularity and
+    an exponential freshness term. Only the AFFINITY_MAX_KEYS strongest categories
+    and tags become columns, so the matrix stays candidates x 2 * AFFINITY_MAX_KEYS.
+
+    Returns:
+        Indices of the best top_k candidates, best first
+    """
+    vocabulary = {}
+    weights = []
+    for field, affinities, scale in (
+        ('categories', category_affinity, CATEGORY_AFFINITY_WEIGHT),
+        ('tags', tag_affinity, TAG_AFFINITY_WEIGHT),
+    ):
+        for key, weight in _strongest(affinities).items():
+            vocabulary[(field, key)] = len(weights)
+            weights.append(weight * scale)
+
+    rows, columns = [], []
+    for row, video in enumerate(candidates):
+        for field in ('categories', 'tags'):
+            for name in _as_list(video.get(field)):
+                column = vocabulary.get((field, _affinity_key(name)))
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+
+    incidence = np.zeros((len(candidates), len(weights)), dtype=np.float64)
+    incidence[rows, columns] = 1.0
+    affinity = incidence @ np.asarray(weights, dtype=np.float64)
+    # The shared decay factor cancels out here
+    if affinity.max(initial=0) > 0:
+        affinity /= affinity.max()
+
+    engagement = np.array([video.get('views', 0) + 2 * video.get('likes', 0) for video in candidates], dtype=np.float64)
+    popularity = np.log1p(np.maximum(engagement, 0))
+    if popularity.max(initial=0) > 0:
+        popularity /= popularity.max()
+
+    age_days = np.array([
+        (now - video['created_at']).total_seconds() / 86400 if video.get('created_at') else np.inf
+        for video in candidates
+    ])
+    freshness = np.exp(-np.maximum(age_days, 0) * math.log(2) / FRESHNESS_HALF_LIFE_DAYS)
+
+    scores = (SCORE_WEIGHTS['affinity'] * affinity
+              + SCORE_WEIGHTS['popularity'] * popularity
+              + SCORE_WEIGHTS['freshness'] * freshness)
+
+    top_k = min(top_k, len(candidates))
+    if top_k <= 0:
+        return []
+    best = np.argpartition(-scores, top_k - 1)[:top_k]
+    return best[np.argsort(-scores[best], kind='stable')].tolist()
+
+
+def compute_recommendations(user_id, top_k=RECOMMENDATION_TOP_K):
+    """
+    Compute a user's top-K recommended video IDs.
+
+    Candidates are published, unwatched videos in the user's strongest categories
+    and tags (most viewed first, capped at RECOMMENDATION_CANDIDATES).
+
+    Returns:
+        List of video ID strings, best first (empty without usable affinities)
+    """
+    affinity = get_user_affinity(user_id)
+    category_affinity = affinity.get('categories', {})
+    tag_affinity = affinity.get('tags', {})
+
+    top_categories = _top_keys(category_affinity, CANDIDATE_CATEGORIES)
+    top_tags = _top_keys(tag_affinity, CANDIDATE_TAGS)
+    if not top_categories and not top_tags:
+        return []
+
+    watched = [
+        ObjectId(str(item['video_id']))
+        for item in db['watch_history'].find({'user_id': user_id}, {'video_id': 1})
+                                       .sort('last_watched_at', -1)
+                                       .limit(AFFINITY_BACKFILL_LIMIT)
+        if ObjectId.is_valid(str(item.get('video_id')))
+    ]
+
+    matches = []
+    if top_categories:
+        matches.append({'categories': {'$in': [_affinity_name(key) for key in top_categories]}})
+    if top_tags:
+        matches.append({'tags': {'$in': [_affinity_name(key) for key in top_tags]}})
+
+    candidates = list(db['videos'].find(
+        {'status': 'published', '_id': {'$nin': watched}, '$or': matches},
+        CANDIDATE_FIELDS
+    ).sort('views', -1).limit(RECOMMENDATION_CANDIDATES))
+    if not candidates:
+        return []
+
+    best = score_candidates(candidates, category_affinity, tag_affinity, datetime.now(), top_k)
+    return [str(candidates[index]['_id']) for index in best]
+
+
+async def get_recommended_video_ids(user_id, limit=20):
+    """
+    A user's recommended video IDs, from the cached top-K (refreshed every RECOMMENDATION_TTL_SECONDS).
+
+    A miss computes the top-K in the threadpool, since scoring is CPU-bound.
+    """
+    video_ids = await response_cache.aget_or_set(
+        f"recommendations:{user_id}",
+        lambda: run_in_threadpool(compute_recommendations, user_id),
+        ttl=RECOMMENDATION_TTL_SECONDS,
+        tags=[recommendations_tag(user_id)]
+    )
+    return video_ids[:limit]
+
+
+register_background_task(PeriodicTask(
+    'affinity-flush',
+    affinity_buffer.flush,
+    AFFINITY_FLUSH_SECONDS,
+    on_stop=affinity_buffer.flush
+))
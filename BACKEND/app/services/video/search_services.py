@@ -0,0 +1,175 @@
+import re
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+
+
+# Relevance weight of a term match in each field
+SEARCH_FIELD_WEIGHTS = {
+    'title': 10,
+    'tags': 5,
+    'categories': 3,
+    'description': 1,
+}
+
+# Ignore anything past this many terms so a long query can't build a huge filter
+MAX_SEARCH_TERMS = 8
+
+# Internal search fields stored on video documents, never returned by the API
+SEARCH_FIELDS_PROJECTION = {'search_index': 0, 'search_tokens': 0}
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text) -> list:
+    """
+    Split text into lowercase search tokens, in order and without duplicates.
+
+    Examples:
+        "Sci-Fi & Fantasy!" -> ["sci", "fi", "fantasy"]
+    """
+    if not text:
+        return []
+    if isinstance(text, (list, tuple)):
+        text = ' '.join(str(item) for item in text)
+    return list(dict.fromkeys(TOKEN_PATTERN.findall(str(text).lower())))
+
+
+def build_search_fields(video) -> dict:
+    """
+    Build the search fields stored on a video document.
+
+    'search_index' keeps the tokens of each weighted field for relevance scoring and
+    'search_tokens' is their union, which the (status, search_tokens) index serves.
+    """
+    search_index = {field: tokenize(video.get(field)) for field in SEARCH_FIELD_WEIGHTS}
+    search_tokens = list(dict.fromkeys(token for tokens in search_index.values() for token in tokens))
+    return {'search_index': search_index, 'search_tokens': search_tokens}
+
+
+def refresh_search_fields(video_id, db_client):
+    """Recompute the search fields of a single video after an update"""
+    video = db_client['videos'].find_one(
+        {'_id': ObjectId(video_id)},
+        {field: 1 for field in SEARCH_FIELD_WEIGHTS}
+    )
+    if video:
+        db_client['videos'].update_one(
+            {'_id': video['_id']},
+            {'$set': build_search_fields(video)}
+        )
+
+
+def needs_search_refresh(update_dict) -> bool:
+    """Check if an update touches any searchable field"""
+    return any(field in update_dict for field in SEARCH_FIELD_WEIGHTS)
+
+
+def parse_search_terms(search):
+    """
+    Split a search string into complete terms and a trailing prefix term.
+
+    The last term is matched as a prefix so results update while the user types.
+    """
+    terms = tokenize(search)[:MAX_SEARCH_TERMS]
+    if not terms:
+        return [], None
+    return terms[:-1], terms[-1]
+
+
+def build_search_filter(search):
+    """
+    Build an index-backed filter matching videos that contain every search term.
+
+    Returns:
+        A filter dict, or None if the search string has no usable terms
+    """
+    full_terms, prefix = parse_search_terms(search)
+    if prefix is None:
+        return None
+
+    # Terms are \w+ tokens, escaping only guards against future tokenizer changes
+    conditions = [{'search_tokens': term} for term in full_terms]
+    conditions.append({'search_tokens': {'$regex': '^' + re.escape(prefix)}})
+    return {'$and': conditions}
+
+
+def _field_score(field, weight, full_terms, prefix):
+    """Aggregation expression: weight * number of tokens in a field matching the query"""
+    return {'$multiply': [weight, {'$size': {'$filter': {
+        'input': {'$ifNull': [f'$search_index.{field}', []]},
+        'cond': {'$or': [
+            {'$in': ['$$this', full_terms]},
+            {'$regexMatch': {'input': '$$this', 'regex': '^' + re.escape(prefix)}}
+        ]}
+    }}}]}
+
+
+def build_search_pipeline(search, base_query=None, skip=0, limit=20, projection=None):
+    """
+    Aggregation pipeline of search_videos (None if the search string has no usable terms).
+
+    Shared with the async feed, which runs it through the video repository.
+    """
+    search_filter = build_search_filter(search)
+    if search_filter is None:
+        return None
+
+    full_terms, prefix = parse_search_terms(search)
+    match = dict(base_query or {})
+    match.setdefault('$and', []).extend(search_filter['$and'])
+
+    pipeline = [
+        {'$match': match},
+        {'$addFields': {'search_score': {'$add': [
+            _field_score(field, weight, full_terms, prefix)
+            for field, weight in SEARCH_FIELD_WEIGHTS.items()
+        ]}}},
+        {'$sort': {'search_score': -1, 'created_at': -1, '_id': -1}},
+        {'$skip': skip},
+        {'$limit': limit},
+        {'$project': projection or SEARCH_FIELDS_PROJECTION},
+    ]
+    return pipeline
+
+
+def search_videos(db_client, search, base_query=None, skip=0, limit=20, projection=None):
+    """
+    Search videos ranked by weighted relevance, newest first on ties.
+
+    Args:
+        db_client: The database client
+        search: Raw search string from the user
+        base_query: Extra filters (status, category, tags, ...)
+        skip: Number of results to skip
+        limit: Maximum number of results
+        projection: Optional $project stage spec applied to the results
+
+    Returns:
+        List of video documents with a 'search_score' field
+    """
+    pipeline = build_search_pipeline(search, base_query, skip, limit, projection)
+    if pipeline is None:
+        return []
+    return list(db_client['videos'].aggregate(pipeline))
+
+
+def rebuild_search_index(db_client, batch_size=500):
+    """
+    Recompute the search fields of every video (backfill after deploys or field changes).
+
+    Returns:
+        Number of videos updated
+    """
+    projection = {field: 1 for field in SEARCH_FIELD_WEIGHTS}
+    operations = []
+    updated = 0
+
+    for video in db_client['videos'].find({}, projection):
+        operations.append(UpdateOne({'_id': video['_id']}, {'$set': build_search_fields(video)}))
+        if len(operations) >= batch_size:
+            updated += db_client['videos'].bulk_write(operations, ordered=False).modified_count
+            operations = []
+
+    if operations:
+        updated += db_client['videos'].bulk_write(operations, ordered=False).modified_count
+    return updated
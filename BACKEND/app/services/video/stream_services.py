@@ -0,0 +1,257 @@
+import base64
+import hashlib
+import hmac
+import json
+import mimetypes
+import os
+import time
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import HTTPException
+from bson.objectid import ObjectId
+from starlette.background import BackgroundTask
+from starlette.responses import FileResponse, RedirectResponse, Response, StreamingResponse
+from app.core.database import client, DATABASE_NAME
+from app.core.storage import get_storage, get_asset_ref, LocalStorage, ASSET_FIELDS
+
+db = client[DATABASE_NAME]
+
+# A stream session covers a whole viewing; premium sessions also end with the subscription
+STREAM_SESSION_SECONDS = int(os.getenv("STREAM_SESSION_SECONDS", str(4 * 3600)))
+# Remote media is proxied in chunks ('proxy') or handed off with a signed URL ('redirect')
+STREAM_REMOTE_MODE = os.getenv("STREAM_REMOTE_MODE", "proxy")
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", str(256 * 1024)))
+# Lifetime of the signed storage URLs used to fetch remote media
+STREAM_UPSTREAM_URL_SECONDS = 300
+STREAM_UPSTREAM_TIMEOUT_SECONDS = float(os.getenv("STREAM_UPSTREAM_TIMEOUT_SECONDS", "30"))
+
+# Request headers passed to the storage server, and response headers passed back
+UPSTREAM_REQUEST_HEADERS = ('range', 'if-range', 'if-none-match', 'if-modified-since')
+UPSTREAM_RESPONSE_HEADERS = (
+    'content-type', 'content-length', 'content-range', 'accept-ranges', 'etag', 'last-modified'
+)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+
+def _signature(body: str) -> str:
+    # Domain-separated from the JWT signatures made with the same secret
+    key = (os.getenv('SECRET_KEY') or '').encode()
+    return _b64encode(hmac.new(key, f"stream:{body}".encode(), hashlib.sha256).digest())
+
+
+def _sign(claims):
+    body = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+    return f"{body}.{_signature(body)}"
+
+
+def verify_stream_token(token, video_id):
+    """
+    Claims of a stream token issued for video_id.
+
+    Only an HMAC check, no database access, so every range request of a
+    session can be authorized cheaply.
+
+    Raises:
+        HTTPException: 401 if the token is invalid, expired or for another video
+    """
+    try:
+        body, signature = token.split('.')
+        valid = hmac.compare_digest(signature, _signature(body))
+        claims = json.loads(_b64decode(body)) if valid else None
+    except (ValueError, TypeError):
+        claims = None
+    if not claims or claims.get('exp', 0) <= time.time() or claims.get('video_id') != str(video_id):
+        raise HTTPException(status_code=401, detail="Invalid or expired stream token")
+    return claims
+
+
+def _subscription_expiry(user_id):
+    """End of the user's active time subscription (None if there is none)"""
+    subscription = db['time_subscriptions'].find_one({'user_id': user_id}, {'expires_at': 1})
+    expires_at = subscription.get('expires_at') if subscription else None
+    if expires_at and expires_at > datetime.utcnow():
+        return expires_at
+    return None
+
+
+def create_stream_session(video_id, user=None):
+    """
+    Check once that the viewer may watch a video and issue a stream token.
+
+    Unpublished videos are only streamable by their uploader and admins;
+    premium videos need an active time subscription.
+
+    Args:
+        video_id: The video
+        user: Current user principal (None for anonymous viewers)
+
+    Returns:
+        Dict with token, stream_url and expires_at
+    """
+    if not ObjectId.is_valid(video_id):
+        raise HTTPException(status_code=404, detail="Video not found")
+    video = db['videos'].find_one(
+        {'_id': ObjectId(video_id)},
+        {'status': 1, 'is_premium': 1, 'uploader_id': 1, 'video_url': 1, ASSET_FIELDS['video_url']: 1}
+    )
+    user_id = user['user_id'] if user else None
+    is_privileged = bool(user) and (user.get('is_admin', False) or video and video.get('uploader_id') == user_id)
+    if not video or (video.get('status') != 'published' and not is_privileged):
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    expires = time.time() + STREAM_SESSION_SECONDS
+    if video.get('is_premium') and not is_privileged:
+        if user is None:
+            raise HTTPException(status_code=401, detail="Sign in to watch premium videos")
+        subscription_expiry = _subscription_expiry(user_id)
+        if subscription_expiry is None:
+            raise HTTPException(status_code=403, detail="An active subscription is required for premium videos")
+        expires = min(expires, (subscription_expiry - datetime.utcnow()).total_seconds() + time.time())
+
+    asset = get_asset_ref(video, 'video_url', 'video')
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Video has no stored media")
+
+    token = _sign({'video_id': str(video_id), 'user_id': user_id, 'asset': asset, 'exp': int(expires)})
+    return {
+        'token': token,
+        'stream_url': f"/videos/{video_id}/stream?token={token}",
+        'expires_at': datetime.utcfromtimestamp(int(expires)).isoformat()
+    }
+
+
+def _not_modified(request_headers, etag, last_modified):
+    """Whether a conditional GET can be answered with 304"""
+    if_none_match = request_headers.get('if-none-match')
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    if_modified_since = request_headers.get('if-modified-since')
+    if if_modified_since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _serve_local(storage, key, request_headers):
+    """
+    Serve a file of the local backend.
+
+    FileResponse answers Range/If-Range requests itself and reads only the
+    requested bytes in chunks; whole files go out through the ASGI pathsend
+    extension (zero-copy sendfile) on servers that support it.
+    """
+    try:
+        path = storage.path(key)
+        stat = os.stat(path)
+    except (ValueError, FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        raise HTTPException(status_code=404, detail="Media not found")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {'ETag': etag, 'Cache-Control': 'private, max-age=3600'}
+    if _not_modified(request_headers, etag, stat.st_mtime):
+        headers['Last-Modified'] = formatdate(stat.st_mtime, usegmt=True)
+        return Response(status_code=304, headers=headers)
+    return FileResponse(
+        path,
+        media_type=mimetypes.guess_type(path)[0] or 'video/mp4',
+        headers=headers,
+        stat_result=stat
+    )
+
+
+def serve_local_media(key, request_headers, expires=None, signature=None):
+    """
+    Response serving a file of the local backend at its URL (LOCAL_STORAGE_BASE_URL).
+
+    Images are public, like on a CDN. Videos are only served through their
+    signed URLs (see LocalStorage.signed_url), so the premium and publish
+    checks of stream sessions can't be skipped by fetching the file directly.
+
+    Raises:
+        HTTPException: 403 for a video without a valid, unexpired signature;
+        404 if there is no such file
+    """
+    storage = get_storage(LocalStorage.name)
+    if (mimetypes.guess_type(key)[0] or '').startswith('video/'):
+        try:
+            valid = bool(expires and signature) and storage.verify_signature(key, expires, signature)
+        except (ValueError, TypeError):
+            valid = False
+        if not valid:
+            raise HTTPException(status_code=403, detail="Invalid or expired media signature")
+    return _serve_local(storage, key, request_headers)
+
+
+_http_client = None
+
+
+def get_http_client():
+    """Shared HTTP client for proxying remote media (created lazily on the running loop)"""
+    global _http_client
+    if _http_client is None:
+        import httpx
+        _http_client = httpx.AsyncClient(timeout=STREAM_UPSTREAM_TIMEOUT_SECONDS, follow_redirects=True)
+    return _http_client
+
+
+async def close_http_client():
+    """Close the proxy HTTP client (called on shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def _serve_remote(storage, key, request_headers):
+    """
+    Relay a remote asset chunk by chunk.
+
+    Range and conditional headers go to the storage server, which does the
+    range slicing and 304s; at most one chunk per stream is held in memory.
+    """
+    url = storage.signed_url(key, resource_type='video', expires_in=STREAM_UPSTREAM_URL_SECONDS)
+    if STREAM_REMOTE_MODE == 'redirect':
+        return RedirectResponse(url, status_code=307)
+
+    http_client = get_http_client()
+    upstream_request = http_client.build_request('GET', url, headers={
+        name: request_headers[name] for name in UPSTREAM_REQUEST_HEADERS if name in request_headers
+    })
+    try:
+        upstream = await http_client.send(upstream_request, stream=True)
+    except Exception as e:
+        print(f"Warning: Failed to fetch video media: {str(e)}")
+        raise HTTPException(status_code=502, detail="Video media unavailable")
+    if upstream.status_code >= 400:
+        await upstream.aclose()
+        raise HTTPException(status_code=502 if upstream.status_code >= 500 else 404, detail="Video media unavailable")
+
+    headers = {name: upstream.headers[name] for name in UPSTREAM_RESPONSE_HEADERS if name in upstream.headers}
+    headers['cache-control'] = 'private, max-age=3600'
+    return StreamingResponse(
+        upstream.aiter_raw(STREAM_CHUNK_SIZE),
+        status_code=upstream.status_code,
+        headers=headers,
+        background=BackgroundTask(upstream.aclose)
+    )
+
+
+async def stream_video(video_id, token, request_headers):
+    """Response streaming a video's media for a valid stream token"""
+    claims = verify_stream_token(token, video_id)
+    asset = claims['asset']
+    storage = get_storage(asset['backend'])
+    if isinstance(storage, LocalStorage):
+        return _serve_local(storage, asset['key'], request_headers)
+    return await _serve_remote(storage, asset['key'], request_headers)
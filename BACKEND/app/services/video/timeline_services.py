@@ -0,0 +1,173 @@
+import os
+from datetime import datetime
+from fastapi import HTTPException
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from app.core.database import client, DATABASE_NAME
+from app.core.cache import response_cache
+from app.core.jobs import enqueue_job, register_job_handler
+from app.utils.pagination_utils import apply_cursor, cursor_sort, decode_cursor, encode_cursor
+from app.repositories.timeline_repository import find_timeline_entries, trim_timeline
+from app.repositories.user_repository import find_user_ids, find_followed_ids
+from app.repositories.video_repository import find_videos
+
+db = client[DATABASE_NAME]
+
+TIMELINE_FANOUT_JOB = 'timeline.fanout'
+
+# Entries kept per user; older ones are trimmed when the timeline is read
+TIMELINE_MAX_ENTRIES = int(os.getenv("TIMELINE_MAX_ENTRIES", "500"))
+# Channels with at least this many followers are not fanned out; their videos are
+# merged into timelines at read time instead
+TIMELINE_FANOUT_MAX_FOLLOWERS = int(os.getenv("TIMELINE_FANOUT_MAX_FOLLOWERS", "10000"))
+TIMELINE_FANOUT_BATCH_SIZE = 1000
+# Recent videos of a channel copied into a timeline when it is followed
+TIMELINE_BACKFILL_VIDEOS = 20
+MEGA_CHANNELS_CACHE_SECONDS = 60
+MEGA_CHANNELS_CACHE_KEY = 'timeline:mega_channels'
+MEGA_CHANNELS_QUERY = {'followers_count': {'$gte': TIMELINE_FANOUT_MAX_FOLLOWERS}}
+
+
+def get_mega_channel_ids():
+    """IDs of channels read on demand instead of fanned out (cached briefly)"""
+    return response_cache.get_or_set(
+        MEGA_CHANNELS_CACHE_KEY,
+        lambda: [str(user['_id']) for user in db['users'].find(MEGA_CHANNELS_QUERY, {'_id': 1})],
+        ttl=MEGA_CHANNELS_CACHE_SECONDS
+    )
+
+
+async def get_mega_channel_ids_async():
+    """get_mega_channel_ids through the async repository, for handlers on the event loop"""
+    return await response_cache.aget_or_set(
+        MEGA_CHANNELS_CACHE_KEY,
+        lambda: find_user_ids(MEGA_CHANNELS_QUERY),
+        ttl=MEGA_CHANNELS_CACHE_SECONDS
+    )
+
+
+def _is_mega_channel(uploader_id):
+    return str(uploader_id) in get_mega_channel_ids()
+
+
+def _entry_write(user_id, video):
+    """Upsert adding a video to one user's timeline"""
+    video_id = str(video['_id'])
+    return UpdateOne(
+        {'user_id': str(user_id), 'video_id': video_id},
+        {'$setOnInsert': {
+            'uploader_id': video.get('uploader_id'),
+            # Timelines are ordered like the videos: created_at, then video ID
+            'created_at': video.get('created_at'),
+            'added_at': datetime.utcnow()
+        }},
+        upsert=True
+    )
+
+
+def enqueue_fanout(video_id, user_id=None):
+    """Queue copying a newly published video into its uploader's followers' timelines"""
+    return enqueue_job(TIMELINE_FANOUT_JOB, {'video_id': str(video_id)}, user_id=user_id)
+
+
+@register_job_handler(TIMELINE_FANOUT_JOB)
+def fan_out_video(payload):
+    """Add a published video to the timeline of every active follower of its uploader"""
+    video = db['videos'].find_one(
+        {'_id': ObjectId(payload['video_id']), 'status': 'published'},
+        {'uploader_id': 1, 'created_at': 1}
+    )
+    if not video or not video.get('uploader_id'):
+        return {'fanned_out': 0}
+    if _is_mega_channel(video['uploader_id']):
+        return {'fanned_out': 0, 'merged_on_read': True}
+
+    fanned_out = 0
+    batch = []
+    followers = db['followers'].find(
+        {'following_id': str(video['uploader_id']), 'status': 'active'},
+        {'follower_id': 1}
+    ).batch_size(TIMELINE_FANOUT_BATCH_SIZE)
+    for follow in followers:
+        batch.append(_entry_write(follow['follower_id'], video))
+        if len(batch) >= TIMELINE_FANOUT_BATCH_SIZE:
+            db['timeline_entries'].bulk_write(batch, ordered=False)
+            fanned_out += len(batch)
+            batch = []
+    if batch:
+        db['timeline_entries'].bulk_write(batch, ordered=False)
+        fanned_out += len(batch)
+    return {'fanned_out': fanned_out}
+
+
+def remove_video_from_timelines(video_id):
+    """Drop a deleted or unpublished video from every timeline"""
+    db['timeline_entries'].delete_many({'video_id': str(video_id)})
+
+
+def backfill_timeline(follower_id, following_id):
+    """Copy a channel's recent videos into a new follower's timeline"""
+    if _is_mega_channel(following_id):
+        return
+    videos = db['videos'].find(
+        {'uploader_id': str(following_id), 'status': 'published'},
+        {'uploader_id': 1, 'created_at': 1}
+    ).sort('created_at', -1).limit(TIMELINE_BACKFILL_VIDEOS)
+    operations = [_entry_write(follower_id, video) for video in videos]
+    if operations:
+        db['timeline_entries'].bulk_write(operations, ordered=False)
+
+
+def remove_channel_from_timeline(follower_id, following_id):
+    """Drop an unfollowed channel's videos from a timeline"""
+    db['timeline_entries'].delete_many({'user_id': str(follower_id), 'uploader_id': str(following_id)})
+
+
+async def get_timeline_video_ids(user_id, limit=20, cursor=None):
+    """
+    Read a page of a user's following timeline.
+
+    Fanned-out entries are merged with the recent videos of any followed mega
+    channels, so the cost depends on the page size and the number of mega
+    channels, not on how many channels the user follows.
+
+    Args:
+        user_id: The reader
+        limit: Page size
+        cursor: next_cursor of the previous page
+
+    Returns:
+        (video ID strings newest first, next_cursor)
+    """
+    user_id = str(user_id)
+    if not cursor:
+        await trim_timeline(user_id, TIMELINE_MAX_ENTRIES)
+
+    page = await find_timeline_entries(user_id, cursor, limit)
+
+    mega_channel_ids = await get_mega_channel_ids_async()
+    if mega_channel_ids:
+        followed = await find_followed_ids(user_id, mega_channel_ids)
+        if followed:
+            # The cursor's tiebreaker is a video ID string; videos are keyed by ObjectId
+            video_cursor = None
+            if cursor:
+                created_at, video_id = decode_cursor(cursor)
+                if not ObjectId.is_valid(str(video_id)):
+                    raise HTTPException(status_code=400, detail="Invalid cursor")
+                video_cursor = encode_cursor(created_at, ObjectId(str(video_id)))
+            videos = await find_videos(
+                apply_cursor({'uploader_id': {'$in': followed}, 'status': 'published'}, video_cursor, 'created_at'),
+                {'created_at': 1},
+                sort=cursor_sort('created_at'),
+                limit=limit
+            )
+            for video in videos:
+                page.setdefault(str(video['_id']), video.get('created_at'))
+
+    # ObjectId hex strings sort like the ObjectIds, so both sources share one order
+    ordered = sorted(page.items(), key=lambda item: (item[1] or datetime.min, item[0]), reverse=True)[:limit]
+    next_cursor = None
+    if len(ordered) == limit:
+        next_cursor = encode_cursor(ordered[-1][1], ordered[-1][0])
+    return [video_id for video_id, _ in ordered], next_cursor
@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta
+from bson.binary import Binary
+from pymongo.errors import DuplicateKeyError
+from app.core.database import client, DATABASE_NAME
+from app.utils.hyperloglog import HyperLogLog
+from app.services.video.analytics_services import get_rolled_up_until, stored_video_ids
+
+db = client[DATABASE_NAME]
+
+# Attempts of a compare-and-set merge before giving up on a batch of viewers
+SKETCH_CAS_ATTEMPTS = 5
+# Hourly rollups are kept this long; older ranges are merged from daily rollups
+HOURLY_RANGE_DAYS = 30
+
+
+def _sketch_document(sketch, version):
+    return {
+        'sketch': Binary(sketch.to_bytes()),
+        'unique_viewers': sketch.count(),
+        'version': version,
+        'updated_at': datetime.utcnow()
+    }
+
+
+def _merge_sketch(video_id, additions, document=None, create=False):
+    """
+    Merge a sketch into a video's stored viewer sketch with compare-and-set.
+
+    The stored sketch is read, merged and written back only if its version is
+    unchanged; a concurrent writer makes the attempt retry with a fresh read.
+    Merges are unions, so retrying can never count a viewer twice.
+
+    Args:
+        video_id: The video
+        additions: Sketch of the viewers to add
+        document: The stored document, if already read
+        create: Insert the sketch if the video has none yet
+
+    Returns:
+        True once merged (or if nothing changed), False if the video has no
+        sketch and create is off, or if every attempt conflicted
+    """
+    for attempt in range(SKETCH_CAS_ATTEMPTS):
+        if document is None or attempt:
+            document = db['video_viewer_sketches'].find_one({'_id': video_id})
+        if document is None:
+            if not create:
+                return False
+            try:
+                db['video_viewer_sketches'].insert_one({'_id': video_id, **_sketch_document(additions, 1)})
+                return True
+            except DuplicateKeyError:
+                continue
+
+        sketch = HyperLogLog.from_bytes(document['sketch'])
+        stored = sketch.to_bytes()
+        sketch.merge(additions)
+        if sketch.to_bytes() == stored:
+            # Only viewers already counted
+            return True
+        result = db['video_viewer_sketches'].update_one(
+            {'_id': video_id, 'version': document['version']},
+            {'$set': _sketch_document(sketch, document['version'] + 1)}
+        )
+        if result.matched_count:
+            return True
+
+    print(f"Warning: Viewer sketch of video {video_id} kept changing; {additions.count()} viewers not merged")
+    return False
+
+
+def record_viewers(viewers_by_video):
+    """
+    Add viewers to the stored sketches of their videos ({video_id: user_ids}).
+
+    Called when buffered views are flushed. Videos without a sketch are skipped;
+    their sketch is built from the views collection on first read.
+    """
+    viewers_by_video = {str(video_id): viewers for video_id, viewers in viewers_by_video.items() if viewers}
+    if not viewers_by_video:
+        return
+    documents = {
+        document['_id']: document
+        for document in db['video_viewer_sketches'].find({'_id': {'$in': list(viewers_by_video)}})
+    }
+    for video_id, viewers in viewers_by_video.items():
+        if video_id in documents:
+            _merge_sketch(video_id, HyperLogLog().update(viewers), documents[video_id])
+
+
+def _sketch_from_views(match):
+    """Sketch of the distinct viewers of the matching views, streamed from a server-side $group"""
+    sketch = HyperLogLog()
+    viewers = db['views'].aggregate([
+        {'$match': {**match, 'user_id': {'$ne': None}}},
+        {'$group': {'_id': '$user_id'}},
+    ], allowDiskUse=True)
+    for viewer in viewers:
+        sketch.add(viewer['_id'])
+    return sketch
+
+
+def get_viewer_sketch(video_id):
+    """A video's lifetime viewer sketch, built from its views on first use (two reads)"""
+    video_id = str(video_id)
+    document = db['video_viewer_sketches'].find_one({'_id': video_id})
+    if document:
+        return HyperLogLog.from_bytes(document['sketch'])
+
+    match = {'video_id': {'$in': stored_video_ids(video_id)}}
+    sketch = _sketch_from_views(match)
+    _merge_sketch(video_id, sketch, create=True)
+    # Views flushed after the read but before the insert were skipped by
+    # record_viewers (no sketch yet); they are in the views collection by now,
+    # so a second read catches them. Merges are unions, so rereading is harmless.
+    late = _sketch_from_views(match)
+    _merge_sketch(video_id, late)
+    return sketch.merge(late)
+
+
+def count_unique_viewers(video_id, start=None, end=None):
+    """
+    Number of distinct signed-in viewers of a video, overall or in [start, end).
+
+    Overall counts read the lifetime sketch. Ranges merge the hourly rollup
+    sketches (daily ones for ranges older than the hourly retention), plus a
+    sketch of the views not yet rolled up.
+    """
+    video_id = str(video_id)
+    if start is None and end is None:
+        return get_viewer_sketch(video_id).count()
+
+    now = datetime.now()
+    start = start or datetime.min
+    end = end or now
+    if start >= now - timedelta(days=HOURLY_RANGE_DAYS):
+        collection, bucket_start = 'video_stats_hourly', start.replace(minute=0, second=0, microsecond=0)
+    else:
+        collection, bucket_start = 'video_stats_daily', start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    sketch = HyperLogLog()
+    rolled_up_until = get_rolled_up_until()
+    if rolled_up_until is not None:
+        for rollup in db[collection].find(
+            {'video_id': video_id, 'bucket': {'$gte': bucket_start, '$lt': min(end, rolled_up_until)}},
+            {'viewers_hll': 1}
+        ):
+            sketch.merge(HyperLogLog.from_bytes(rollup.get('viewers_hll')))
+
+    tail_start = max(start, rolled_up_until) if rolled_up_until else start
+    if tail_start < end:
+        sketch.merge(_sketch_from_views({
+            'video_id': {'$in': stored_video_ids(video_id)},
+            'started_at': {'$gte': tail_start, '$lt': end}
+        }))
+    return sketch.count()
@@ -1,10 +1,56 @@
 from fastapi import HTTPException
-from app.core.database import client
+from app.core.database import client, DATABASE_NAME
 from bson.objectid import ObjectId
 from datetime import datetime
-from app.core.cloudinary_config import delete_from_cloudinary, extract_public_id_from_url
+from app.services.utility.cascade_services import enqueue_video_deletion, video_snapshot, VIDEO_ASSET_FIELDS
+from app.core.storage import with_asset_refs, ASSET_FIELDS
+from app.utils.hydration_utils import attach_uploader_info, attach_uploader_info_async
+from app.utils.pagination_utils import apply_cursor, cursor_sort, build_next_cursor
+from app.services.video.view_aggregator import view_aggregator
+from app.services.video.ranking_services import get_top_ranked_video_ids
+from app.services.video.recommendation_services import get_recommended_video_ids
+from app.services.video.timeline_services import get_timeline_video_ids, enqueue_fanout, remove_video_from_timelines
+from app.services.video.counter_services import apply_pending_counters, apply_pending_counters_async, COUNTER_FOLD_FIELD
+from app.repositories.video_repository import find_video, find_videos, find_published_videos, aggregate_videos
+from app.core.cache import response_cache, VIDEO_FEEDS_TAG, video_tag
+from app.services.video.search_services import (
+    SEARCH_FIELDS_PROJECTION,
+    build_search_fields,
+    build_search_pipeline,
+    needs_search_refresh,
+    refresh_search_fields
+)
 
-db = client['videohub']
+db = client[DATABASE_NAME]
+
+# Feed and details reads are async (app.repositories) and awaited on the event
+# loop; writes still go through the sync client from the threadpool
+
+# Fields a video grid needs; feeds can ship these instead of whole documents
+VIDEO_CARD_FIELDS = (
+    'title', 'thumbnail_url', 'duration', 'views', 'likes', 'comments_count',
+    'uploader_id', 'status', 'is_featured', 'is_premium', 'created_at', 'published_at'
+)
+VIDEO_CARD_PROJECTION = {field: 1 for field in VIDEO_CARD_FIELDS}
+# Whole documents without the internal search fields and counter fold marker
+VIDEO_FULL_PROJECTION = {**SEARCH_FIELDS_PROJECTION, COUNTER_FOLD_FIELD: 0}
+# Feed response shapes: 'card' (VIDEO_CARD_FIELDS) or 'full' (whole document)
+VIDEO_VIEWS = ('card', 'full')
+
+
+def video_projection(view='full', *extra_fields):
+    """Projection for a feed view; extra_fields are kept in card view (e.g. a sort key)"""
+    if view == 'card':
+        return {**VIDEO_CARD_PROJECTION, **{field: 1 for field in extra_fields}}
+    return VIDEO_FULL_PROJECTION
+
+
+def invalidate_video_cache(video_id=None):
+    """Drop cached feeds, and the cached details of one video if given"""
+    if video_id:
+        response_cache.invalidate(VIDEO_FEEDS_TAG, video_tag(video_id))
+    else:
+        response_cache.invalidate(VIDEO_FEEDS_TAG)
 
 
 def create_video(video_data, user_id):
@@ -20,37 +66,75 @@ def create_video(video_data, user_id):
     video_dict['favorites_count'] = 0
     video_dict['created_at'] = datetime.now()
     video_dict['published_at'] = None
+    video_dict.update(build_search_fields(video_dict))
+    # Storage keys are resolved once here, so deletes never parse URLs
+    video_dict.update(with_asset_refs(video_dict, VIDEO_ASSET_FIELDS))
     
     result = db['videos'].insert_one(video_dict)
+    invalidate_video_cache()
     return str(result.inserted_id)
 
 
+def sync_timelines(video_id, old_status, new_status, user_id=None):
+    """Fan a video out to follower timelines when it gets published, remove it when unpublished"""
+    if new_status is None or new_status == old_status:
+        return
+    if new_status == 'published':
+        enqueue_fanout(video_id, user_id)
+    elif old_status == 'published':
+        remove_video_from_timelines(video_id)
+
+
 def get_video_by_id(video_id):
     """Get video by ID"""
-    video = db['videos'].find_one({'_id': ObjectId(video_id)})
+    video = db['videos'].find_one({'_id': ObjectId(video_id)}, VIDEO_FULL_PROJECTION)
     if video:
         video['id'] = str(video['_id'])
         video.pop('_id')
+        apply_pending_counters([video])
         # Add uploader info
-        uploader = db['users'].find_one({'_id': ObjectId(video['uploader_id'])}) if video.get('uploader_id') else None
-        if uploader:
-            video['uploader_username'] = uploader.get('username')
-            video['uploader_display_name'] = uploader.get('display_name')
-            video['uploader_profile_picture'] = uploader.get('profile_picture')
-            video['uploader_followers_count'] = uploader.get('followers_count', 0)
+        attach_uploader_info([video], db)
     return video
 
 
-def get_all_videos(skip=0, limit=20, search=None, category=None, tags=None, sort_by='created_at'):
-    """Get all videos with filters"""
+async def get_video_by_id_async(video_id):
+    """Get video by ID, for handlers on the event loop (None for invalid IDs)"""
+    video = await find_video(video_id, VIDEO_FULL_PROJECTION)
+    if video:
+        video['id'] = str(video.pop('_id'))
+        await _hydrate([video])
+    return video
+
+
+def hide_premium_media(videos):
+    """
+    Blank the media URL and asset of premium videos, in place.
+
+    Their media is only played through a stream session (create_stream_session),
+    which checks the subscription and hands out an expiring URL.
+    """
+    for video in videos:
+        if video and video.get('is_premium'):
+            video['video_url'] = None
+            video.pop(ASSET_FIELDS['video_url'], None)
+    return videos
+
+
+async def _hydrate(videos, with_uploaders=True):
+    """Add pending counters and (optionally) uploader info to a page of videos, hiding premium media"""
+    await apply_pending_counters_async(videos)
+    if with_uploaders:
+        await attach_uploader_info_async(videos)
+    return hide_premium_media(videos)
+
+
+async def get_all_videos(skip=0, limit=20, search=None, category=None, tags=None, sort_by='created_at', cursor=None, view='full'):
+    """
+    Get all videos with filters (cursor is ignored for relevance-ranked search)
+    Returns: (videos, next_cursor)
+    """
     query = {'status': 'published'}
     
-    if search:
-        query['$or'] = [
-            {'title': {'$regex': search, '$options': 'i'}},
-            {'description': {'$regex': search, '$options': 'i'}}
-        ]
-    
     if category:
         query['categories'] = category
     
@@ -58,73 +142,76 @@ def get_all_videos(skip=0, limit=20, search=None, category=None, tags=None, sort
         tag_list = tags.split(',')
         query['tags'] = {'$in': tag_list}
     
-    videos = list(db['videos'].find(query)
-                 .sort(sort_by, -1)
-                 .skip(skip)
-                 .limit(limit))
+    if search:
+        # Search results are ranked by relevance instead of sort_by
+        pipeline = build_search_pipeline(search, query, skip, limit, video_projection(view, 'search_score'))
+        videos = await aggregate_videos(pipeline) if pipeline else []
+    else:
+        query = apply_cursor(query, cursor, sort_by)
+        videos = await find_videos(query, video_projection(view, sort_by), cursor_sort(sort_by), skip, limit)
+    # ids stay ObjectIds; feed routes render them with ORJSONResponse
     for video in videos:
-        video['id'] = str(video['_id'])
-        video.pop('_id')
-        uploader = db['users'].find_one({'_id': ObjectId(video['uploader_id'])}) if video.get('uploader_id') else None
-        if uploader:
-            video['uploader_username'] = uploader.get('username')
-            video['uploader_display_name'] = uploader.get('display_name')
-            video['uploader_profile_picture'] = uploader.get('profile_picture')
-            video['uploader_followers_count'] = uploader.get('followers_count', 0)
-    return videos
+        video['id'] = video.pop('_id')
+    # Built from the stored sort value the next query filters on, before
+    # pending shard counts are added to views/likes
+    next_cursor = None if search else build_next_cursor(videos, limit, sort_by)
+    return await _hydrate(videos), next_cursor
+
 
+async def _get_published_videos_in_order(video_ids, projection=VIDEO_FULL_PROJECTION):
+    """Fetch published videos by ID, keeping the order of video_ids"""
+    video_map = await find_published_videos(video_ids, projection)
+    return [video_map[video_id] for video_id in video_ids if video_id in video_map]
 
-def get_trending_videos(limit=20):
-    """Get trending videos (sorted by views in last 7 days)"""
-    # For now, just sort by views
-    videos = list(db['videos'].find({'status': 'published'})
-                 .sort('views', -1)
-                 .limit(limit))
+
+async def _top_up_by_views(videos, limit, projection):
+    """
+    Published videos by lifetime views to fill a short ranked feed up to limit.
+
+    The (status, views) index serves the sort, so at most limit documents (plus
+    the ones already in the feed) are read however big the catalog is.
+    """
+    ranked_ids = [video['_id'] for video in videos]
+    return await find_videos(
+        {'status': 'published', '_id': {'$nin': ranked_ids}}, projection, sort=[('views', -1)], limit=limit - len(videos)
+    )
+
+
+async def get_trending_videos(limit=20, view='full'):
+    """Get trending videos (time-decayed views, likes and comments from the last 7 days)"""
+    # Read the top-N from the precomputed rankings
+    projection = video_projection(view)
+    videos = await _get_published_videos_in_order(await get_top_ranked_video_ids('trending_score', limit), projection)
+    
+    if len(videos) < limit:
+        # Not enough recent activity (or no ranking run yet): top up by lifetime views
+        videos += await _top_up_by_views(videos, limit, projection)
     
     for video in videos:
-        video['id'] = str(video['_id'])
-        video.pop('_id')
-        uploader = db['users'].find_one({'_id': ObjectId(video['uploader_id'])}) if video.get('uploader_id') else None
-        if uploader:
-            video['uploader_username'] = uploader.get('username')
-            video['uploader_display_name'] = uploader.get('display_name')
-            video['uploader_profile_picture'] = uploader.get('profile_picture')
-            video['uploader_followers_count'] = uploader.get('followers_count', 0)
-    return videos
+        video['id'] = video.pop('_id')
+    return await _hydrate(videos)
 
 
-def get_featured_videos(limit=20):
+async def get_featured_videos(limit=20, view='full'):
     """Get featured videos"""
-    videos = list(db['videos'].find({
+    videos = await find_videos({
         'status': 'published',
         'is_featured': True
-    })
-    .sort('created_at', -1)
-    .limit(limit))
+    }, video_projection(view), sort=[('created_at', -1)], limit=limit)
     
     for video in videos:
-        video['id'] = str(video['_id'])
-        video.pop('_id')
-        uploader = db['users'].find_one({'_id': ObjectId(video['uploader_id'])}) if video.get('uploader_id') else None
-        if uploader:
-            video['uploader_username'] = uploader.get('username')
-            video['uploader_display_name'] = uploader.get('display_name')
-            video['uploader_profile_picture'] = uploader.get('profile_picture')
-            video['uploader_followers_count'] = uploader.get('followers_count', 0)
-    return videos
+        video['id'] = video.pop('_id')
+    return await _hydrate(videos)
 
 
-def get_videos_by_user(user_id, skip=0, limit=20):
+async def get_videos_by_user(user_id, skip=0, limit=20, cursor=None, view='full'):
     """Get videos by user"""
-    videos = list(db['videos'].find({'uploader_id': user_id})
-                 .sort('created_at', -1)
-                 .skip(skip)
-                 .limit(limit))
+    query = apply_cursor({'uploader_id': user_id}, cursor, 'created_at')
+    videos = await find_videos(query, video_projection(view), cursor_sort('created_at'), skip, limit)
     
     for video in videos:
-        video['id'] = str(video['_id'])
-        video.pop('_id')
-    return videos
+        video['id'] = video.pop('_id')
+    return await _hydrate(videos, with_uploaders=False)
 
 
 def update_video(video_id, update_data, user):
@@ -136,11 +223,16 @@ def update_video(video_id, update_data, user):
     if video.get('uploader_id') != user['user_id'] and not is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     update_dict = update_data.dict(exclude_unset=True)
+    update_dict.update(with_asset_refs(update_dict, VIDEO_ASSET_FIELDS))
     db['videos'].update_one(
         {'_id': ObjectId(video_id)},
         {'$set': update_dict}
     )
-    return get_video_by_id(video_id)
+    if needs_search_refresh(update_dict):
+        refresh_search_fields(video_id, db)
+    sync_timelines(video_id, video.get('status'), update_dict.get('status'), user['user_id'])
+    invalidate_video_cache(video_id)
+    return hide_premium_media([get_video_by_id(video_id)])[0]
 
 
 def delete_video(video_id, user_id, is_admin=False):
@@ -151,27 +243,11 @@ def delete_video(video_id, user_id, is_admin=False):
     if video.get('uploader_id') != user_id and not is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    # Delete video file from Cloudinary if it exists
-    if video.get('video_url'):
-        video_public_id = extract_public_id_from_url(video['video_url'])
-        if video_public_id:
-            try:
-                delete_from_cloudinary(video_public_id, resource_type="video")
-            except Exception as e:
-                # Log but don't fail the deletion if Cloudinary delete fails
-                print(f"Warning: Failed to delete video from Cloudinary: {str(e)}")
-    
-    # Delete thumbnail from Cloudinary if it exists
-    if video.get('thumbnail_url'):
-        thumbnail_public_id = extract_public_id_from_url(video['thumbnail_url'])
-        if thumbnail_public_id:
-            try:
-                delete_from_cloudinary(thumbnail_public_id, resource_type="image")
-            except Exception as e:
-                # Log but don't fail the deletion if Cloudinary delete fails
-                print(f"Warning: Failed to delete thumbnail from Cloudinary: {str(e)}")
-    
     result = db['videos'].delete_one({'_id': ObjectId(video_id)})
+    if result.deleted_count:
+        # Storage deletes, dependent documents and counts are removed by the job workers
+        enqueue_video_deletion([video_snapshot(video_id, video)], user_id)
+    invalidate_video_cache(video_id)
     return result.deleted_count > 0
 
 
@@ -193,136 +269,60 @@ def update_video_metadata(video_id, metadata):
             {'_id': ObjectId(video_id)},
             {'$set': update_data}
         )
+        invalidate_video_cache(video_id)
         return result.modified_count > 0
     return False
 
 
 def increment_video_view(video_id):
-    """Increment video view count"""
-    result = db['videos'].update_one(
-        {'_id': ObjectId(video_id)},
-        {'$inc': {'views': 1}}
-    )
-    return result.modified_count > 0
-
-
-def get_hot_videos(limit=20):
-    """Get hot videos (high engagement - likes, comments, shares)"""
-    # Calculate engagement score: likes + comments*2 + shares*3
-    videos = list(db['videos'].aggregate([
-        {'$match': {'status': 'published'}},
-        {'$addFields': {
-            'engagement_score': {
-                '$add': [
-                    {'$ifNull': ['$likes', 0]},
-                    {'$multiply': [{'$ifNull': ['$comments_count', 0]}, 2]},
-                    {'$multiply': [{'$ifNull': ['$shares_count', 0]}, 3]}
-                ]
-            }
-        }},
-        {'$sort': {'engagement_score': -1}},
-        {'$limit': limit}
-    ]))
-    
-    for video in videos:
-        video['id'] = str(video['_id'])
-        video.pop('_id')
-        uploader = db['users'].find_one({'_id': ObjectId(video['uploader_id'])}) if video.get('uploader_id') else None
-        if uploader:
-            video['uploader_username'] = uploader.get('username')
-            video['uploader_display_name'] = uploader.get('display_name')
-            video['uploader_profile_picture'] = uploader.get('profile_picture')
-            video['uploader_followers_count'] = uploader.get('followers_count', 0)
-    return videos
+    """Increment video view count (buffered, flushed in bulk by the view aggregator)"""
+    if not ObjectId.is_valid(video_id):
+        return False
+    view_aggregator.add_view(video_id)
+    return True
 
 
-def get_videos_from_following(user_id, limit=20):
-    """Get videos from users that current user follows"""
-    # Get list of following user IDs
-    following = list(db['followers'].find(
-        {'follower_id': user_id, 'status': 'active'},
-        {'following_id': 1}
-    ))
-    following_ids = [f['following_id'] for f in following]
+async def get_hot_videos(limit=20, view='full'):
+    """Get hot videos (engagement in the last few hours - likes, comments, views)"""
+    projection = video_projection(view)
+    videos = await _get_published_videos_in_order(await get_top_ranked_video_ids('hot_score', limit), projection)
     
-    if not following_ids:
-        return []
+    if len(videos) < limit:
+        # Not enough recent activity: top up by lifetime views, like trending
+        videos += await _top_up_by_views(videos, limit, projection)
     
-    # Get videos from those users
-    videos = list(db['videos'].find({
-        'uploader_id': {'$in': following_ids},
-        'status': 'published'
-    })
-    .sort('created_at', -1)
-    .limit(limit))
+    for video in videos:
+        video['id'] = video.pop('_id')
+    return await _hydrate(videos)
+
+
+async def get_videos_from_following(user_id, limit=20, view='full', cursor=None):
+    """
+    Get videos from users that current user follows, from their timeline
+    Returns: (videos, next_cursor)
+    """
+    video_ids, next_cursor = await get_timeline_video_ids(user_id, limit, cursor)
+    if not video_ids:
+        return [], None
     
+    videos = await _get_published_videos_in_order(video_ids, video_projection(view))
     for video in videos:
-        video['id'] = str(video['_id'])
-        video.pop('_id')
-        uploader = db['users'].find_one({'_id': ObjectId(video['uploader_id'])}) if video.get('uploader_id') else None
-        if uploader:
-            video['uploader_username'] = uploader.get('username')
-            video['uploader_display_name'] = uploader.get('display_name')
-            video['uploader_profile_picture'] = uploader.get('profile_picture')
-            video['uploader_followers_count'] = uploader.get('followers_count', 0)
-    return videos
+        video['id'] = video.pop('_id')
+    return await _hydrate(videos), next_cursor
 
 
-def get_recommended_videos(user_id=None, limit=20):
-    """Get recommended videos based on user's watch history and preferences"""
+async def get_recommended_videos(user_id=None, limit=20, view='full'):
+    """Get recommended videos from the user's precomputed top-K (category/tag affinity, popularity, freshness)"""
     if not user_id:
         # Return featured or trending videos for non-authenticated users
-        return get_trending_videos(limit)
-    
-    # Get user's watch history to find categories/tags they like
-    watch_history = list(db['watch_history'].find(
-        {'user_id': user_id}
-    ).sort('watched_at', -1).limit(50))
-    
-    if not watch_history:
-        return get_trending_videos(limit)
-    
-    # Get video IDs from history
-    watched_video_ids = [ObjectId(wh['video_id']) for wh in watch_history]
-    
-    # Get categories and tags from watched videos
-    watched_videos = list(db['videos'].find(
-        {'_id': {'$in': watched_video_ids}},
-        {'categories': 1, 'tags': 1}
-    ))
+        return await get_trending_videos(limit, view)
     
-    # Collect all categories and tags
-    categories = set()
-    tags = set()
-    for video in watched_videos:
-        if 'categories' in video:
-            if isinstance(video['categories'], list):
-                categories.update(video['categories'])
-            else:
-                categories.add(video['categories'])
-        if 'tags' in video:
-            tags.update(video.get('tags', []))
-    
-    # Find similar videos (not already watched)
-    query = {
-        'status': 'published',
-        '_id': {'$nin': watched_video_ids}
-    }
-    
-    if categories or tags:
-        query['$or'] = []
-        if categories:
-            query['$or'].append({'categories': {'$in': list(categories)}})
-        if tags:
-            query['$or'].append({'tags': {'$in': list(tags)}})
-    
-    # Prioritize by views and recency
-    videos = list(db['videos'].find(query)
-                 .sort([('views', -1), ('created_at', -1)])
-                 .limit(limit))
+    video_ids = await get_recommended_video_ids(user_id, limit)
+    if not video_ids:
+        # No history (or no matching videos) yet
+        return await get_trending_videos(limit, view)
     
+    videos = await _get_published_videos_in_order(video_ids, video_projection(view))
     for video in videos:
-        video['id'] = str(video['_id'])
-        video.pop('_id')
-    
-    return videos
+        video['id'] = video.pop('_id')
+    return await _hydrate(videos, with_uploaders=False)
@@ -0,0 +1,81 @@
+from bson.objectid import ObjectId
+from app.core.database import client, DATABASE_NAME
+
+db = client[DATABASE_NAME]
+
+# Most videos one status request may ask about (a full grid page)
+MAX_STATUS_VIDEO_IDS = 100
+
+PROGRESS_FIELDS = {'video_id': 1, 'watch_position': 1, 'watch_duration': 1, 'completion_percentage': 1, 'is_completed': 1, 'last_watched_at': 1}
+
+
+def get_video_statuses(user_id, video_ids):
+    """
+    Get the current user's like, save, watch-progress and uploader-follow status for many videos.
+
+    One $in query per collection, however many videos are asked about.
+
+    Args:
+        user_id: The current user
+        video_ids: Video ID strings (duplicates and invalid IDs are ignored)
+
+    Returns:
+        {video_id: {liked, disliked, like_type, saved, saved_at, progress, following_uploader, uploader_id}}
+        for every known video
+    """
+    video_ids = list(dict.fromkeys(video_id for video_id in video_ids if ObjectId.is_valid(video_id)))
+    if not video_ids:
+        return {}
+
+    videos = db['videos'].find({'_id': {'$in': [ObjectId(video_id) for video_id in video_ids]}}, {'uploader_id': 1})
+    uploaders = {str(video['_id']): video.get('uploader_id') for video in videos}
+
+    reactions = {
+        like['video_id']: like.get('like_type')
+        for like in db['likes'].find(
+            {'user_id': user_id, 'video_id': {'$in': video_ids}, 'like_type': {'$in': ['like', 'dislike']}},
+            {'video_id': 1, 'like_type': 1}
+        )
+    }
+
+    saved = {
+        saved_video['video_id']: saved_video.get('saved_at')
+        for saved_video in db['saved_videos'].find(
+            {'user_id': user_id, 'video_id': {'$in': video_ids}},
+            {'video_id': 1, 'saved_at': 1}
+        )
+    }
+
+    progress = {}
+    for item in db['watch_history'].find({'user_id': user_id, 'video_id': {'$in': video_ids}}, PROGRESS_FIELDS):
+        item.pop('_id')
+        progress[item.pop('video_id')] = item
+
+    uploader_ids = list({str(uploader_id) for uploader_id in uploaders.values() if uploader_id})
+    followed = set()
+    if uploader_ids:
+        followed = {
+            follow['following_id']
+            for follow in db['followers'].find(
+                {'follower_id': str(user_id), 'following_id': {'$in': uploader_ids}, 'status': 'active'},
+                {'following_id': 1}
+            )
+        }
+
+    statuses = {}
+    for video_id in video_ids:
+        if video_id not in uploaders:
+            continue
+        like_type = reactions.get(video_id)
+        uploader_id = uploaders[video_id]
+        statuses[video_id] = {
+            'liked': like_type == 'like',
+            'disliked': like_type == 'dislike',
+            'like_type': like_type,
+            'saved': video_id in saved,
+            'saved_at': saved.get(video_id),
+            'progress': progress.get(video_id),
+            'uploader_id': uploader_id,
+            'following_uploader': bool(uploader_id) and str(uploader_id) in followed
+        }
+    return statuses
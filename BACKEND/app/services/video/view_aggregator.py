@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
+from app.core.database import client, DATABASE_NAME
+from app.core.background import PeriodicTask, register_background_task
+from app.services.video.counter_services import increment_many_video_counters
+from app.services.video.unique_viewer_services import record_viewers
+
+db = client[DATABASE_NAME]
+
+# Seconds between flushes; at most this much buffered data is lost on a crash
+VIEW_FLUSH_INTERVAL_SECONDS = float(os.getenv("VIEW_FLUSH_INTERVAL_SECONDS", "2"))
+# Pending increments + view records that trigger an immediate flush
+VIEW_MAX_PENDING = int(os.getenv("VIEW_MAX_PENDING", "5000"))
+
+
+class ViewAggregator:
+    """
+    Buffers view increments and view records in memory and writes them in bulk.
+
+    Each flush turns all pending increments into one bulk write to the counter
+    shards (one per video, however many views it got) and all pending records
+    into one insert_many. Loss is bounded: a crash loses at most one flush interval or
+    VIEW_MAX_PENDING entries, and shutdown flushes whatever is left.
+    """
+
+    def __init__(self, db_client, max_pending=VIEW_MAX_PENDING):
+        self.db = db_client
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._increments = defaultdict(int)
+        self._views = []
+        self._oldest_pending_at = None
+        self._stats = {
+            'flushes': 0,
+            'failed_flushes': 0,
+            'increments_flushed': 0,
+            'views_flushed': 0,
+            'dropped': 0,
+            'last_flush_at': None,
+            'last_flush_duration_ms': 0.0,
+            'last_flush_lag_ms': 0.0,
+            'max_flush_lag_ms': 0.0,
+        }
+
+    def add_view(self, video_id, view_doc=None):
+        """Buffer one view of a video, with an optional record for the views collection"""
+        with self._lock:
+            self._increments[str(video_id)] += 1
+            if view_doc is not None:
+                self._views.append(view_doc)
+            if self._oldest_pending_at is None:
+                self._oldest_pending_at = time.monotonic()
+            pending = len(self._increments) + len(self._views)
+
+        if pending >= self.max_pending:
+            self.flush()
+
+    def pending_count(self):
+        with self._lock:
+            return sum(self._increments.values()), len(self._views)
+
+    def flush(self):
+        """Write all buffered increments and view records"""
+        with self._flush_lock:
+            with self._lock:
+                increments, self._increments = self._increments, defaultdict(int)
+                views, self._views = self._views, []
+                oldest_pending_at, self._oldest_pending_at = self._oldest_pending_at, None
+
+            if not increments and not views:
+                return
+
+            started = time.monotonic()
+            try:
+                self._write(increments, views)
+            except Exception as e:
+                print(f"Warning: View flush failed: {str(e)}")
+                self._stats['failed_flushes'] += 1
+                self._requeue(increments, views, oldest_pending_at)
+                return
+
+            finished = time.monotonic()
+            lag_ms = (finished - oldest_pending_at) * 1000 if oldest_pending_at else 0.0
+            self._stats['flushes'] += 1
+            self._stats['increments_flushed'] += sum(increments.values())
+            self._stats['views_flushed'] += len(views)
+            self._stats['last_flush_at'] = datetime.utcnow()
+            self._stats['last_flush_duration_ms'] = (finished - started) * 1000
+            self._stats['last_flush_lag_ms'] = lag_ms
+            self._stats['max_flush_lag_ms'] = max(self._stats['max_flush_lag_ms'], lag_ms)
+
+    def _write(self, increments, views):
+        if views:
+            self._set_completion(views)
+            # _ids are assigned when views are buffered, so a retried flush can't insert
+            # a record twice; duplicate-key errors from the retry are ignored
+            try:
+                self.db['views'].insert_many(views, ordered=False)
+            except BulkWriteError as e:
+                if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                    raise
+            self._record_viewers(views)
+
+        increment_many_video_counters({
+            video_id: {'views': count}
+            for video_id, count in increments.items()
+            if ObjectId.is_valid(video_id)
+        })
+
+    def _record_viewers(self, views):
+        """Merge the signed-in viewers of the batch into the per-video sketches"""
+        viewers_by_video = defaultdict(set)
+        for view in views:
+            if view.get('user_id') is not None:
+                viewers_by_video[str(view['video_id'])].add(view['user_id'])
+        try:
+            record_viewers(viewers_by_video)
+        except Exception as e:
+            # The views are stored; sketches are rebuilt from them if ever lost
+            print(f"Warning: Failed to update viewer sketches: {str(e)}")
+
+    def _set_completion(self, views):
+        """Fill in completion percentage from video durations, one query per flush"""
+        video_ids = {str(view['video_id']) for view in views if ObjectId.is_valid(str(view.get('video_id')))}
+        durations = {}
+        if video_ids:
+            for video in self.db['videos'].find(
+                {'_id': {'$in': [ObjectId(video_id) for video_id in video_ids]}},
+                {'duration': 1}
+            ):
+                durations[str(video['_id'])] = video.get('duration', 1)
+
+        for view in views:
+            duration = durations.get(str(view.get('video_id')))
+            if duration is None:
+                continue
+            view['completion_percentage'] = (view.get('watch_duration', 0) / duration) * 100 if duration > 0 else 0
+            view['is_completed'] = view['completion_percentage'] >= 90
+
+    def _requeue(self, increments, views, oldest_pending_at):
+        """Put a failed batch back, dropping it if the buffer is already full"""
+        with self._lock:
+            pending = len(self._increments) + len(self._views)
+            if pending + len(increments) + len(views) > self.max_pending * 2:
+                self._stats['dropped'] += sum(increments.values())
+                return
+            for video_id, count in increments.items():
+                self._increments[video_id] += count
+            self._views = views + self._views
+            if oldest_pending_at is not None:
+                self._oldest_pending_at = min(self._oldest_pending_at or oldest_pending_at, oldest_pending_at)
+
+    def get_stats(self):
+        """Flush metrics, including how long the oldest pending view has waited"""
+        pending_increments, pending_views = self.pending_count()
+        with self._lock:
+            oldest = self._oldest_pending_at
+        stats = dict(self._stats)
+        stats['pending_increments'] = pending_increments
+        stats['pending_views'] = pending_views
+        stats['current_lag_ms'] = (time.monotonic() - oldest) * 1000 if oldest else 0.0
+        stats['flush_interval_seconds'] = VIEW_FLUSH_INTERVAL_SECONDS
+        return stats
+
+
+view_aggregator = ViewAggregator(db)
+
+register_background_task(PeriodicTask(
+    'view-aggregator',
+    view_aggregator.flush,
+    VIEW_FLUSH_INTERVAL_SECONDS,
+    on_stop=view_aggregator.flush
+))
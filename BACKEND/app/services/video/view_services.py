@@ -1,45 +1,42 @@
 from fastapi import HTTPException
-from app.core.database import client
+from app.core.database import client, DATABASE_NAME
 from bson.objectid import ObjectId
 from datetime import datetime
+from app.utils.pagination_utils import apply_cursor, cursor_sort
+from app.services.video.view_aggregator import view_aggregator
+from app.services.video.analytics_services import get_video_stats, stored_video_ids
+from app.services.video.unique_viewer_services import count_unique_viewers
 
-db = client['videohub']
+db = client[DATABASE_NAME]
 
 
 def record_view(view_data, user_id=None):
-    """Record a video view"""
+    """Record a video view (buffered, written in bulk by the view aggregator)"""
     view_dict = view_data.dict()
+    # Assigned up front so the id can be returned before the record is written
+    view_dict['_id'] = ObjectId()
     view_dict['user_id'] = user_id
     view_dict['started_at'] = datetime.now()
+    view_dict['completion_percentage'] = 0
     view_dict['is_completed'] = False
     
-    # Calculate completion percentage
-    video = db['videos'].find_one({'_id': ObjectId(str(view_data.video_id))})
-    if video:
-        duration = video.get('duration', 1)
-        view_dict['completion_percentage'] = (view_data.watch_duration / duration) * 100 if duration > 0 else 0
-        view_dict['is_completed'] = view_dict['completion_percentage'] >= 90
+    # Completion percentage is filled in at flush time from the video duration
+    view_aggregator.add_view(str(view_data.video_id), view_dict)
     
-    result = db['views'].insert_one(view_dict)
-    
-    # Increment video view count
-    db['videos'].update_one(
-        {'_id': ObjectId(str(view_data.video_id))},
-        {'$inc': {'views': 1}}
-    )
-    
-    return str(result.inserted_id)
+    return str(view_dict['_id'])
 
 
-def get_video_views(video_id):
-    """Get view count for a video"""
-    view_count = db['views'].count_documents({'video_id': video_id})
-    unique_users = len(db['views'].distinct('user_id', {'video_id': video_id}))
+def get_video_views(video_id, start=None, end=None):
+    """Get view count for a video (unique viewers from its HyperLogLog sketch, optionally in [start, end))"""
+    query = {'video_id': {'$in': stored_video_ids(video_id)}}
+    if start or end:
+        query['started_at'] = {**({'$gte': start} if start else {}), **({'$lt': end} if end else {})}
+    view_count = db['views'].count_documents(query)
     
     return {
         "video_id": video_id,
         "total_views": view_count,
-        "unique_viewers": unique_users
+        "unique_viewers": count_unique_viewers(video_id, start, end)
     }
 
 
@@ -52,28 +49,20 @@ def get_video_analytics(video_id, user_id):
     if video.get('uploader_id') != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    # Get views data
-    total_views = db['views'].count_documents({'video_id': int(video_id)})
-    unique_viewers = len(db['views'].distinct('user_id', {'video_id': int(video_id)}))
-    
-    # Get average watch duration
-    views = list(db['views'].find({'video_id': int(video_id)}))
-    avg_watch_duration = sum(v.get('watch_duration', 0) for v in views) / len(views) if views else 0
-    avg_completion = sum(v.get('completion_percentage', 0) for v in views) / len(views) if views else 0
-    
-    # Device breakdown
-    device_counts = {}
-    for view in views:
-        device = view.get('device_type', 'unknown')
-        device_counts[device] = device_counts.get(device, 0) + 1
+    # Read from the hourly/daily rollups (aggregated server-side before the first rollup)
+    stats = get_video_stats(video_id)
+    total_views = stats['views']
+    avg_watch_duration = stats['watch_time'] / total_views if total_views else 0
+    avg_completion = stats['completion_sum'] / total_views if total_views else 0
     
     return {
         "video_id": video_id,
         "total_views": total_views,
-        "unique_viewers": unique_viewers,
+        "unique_viewers": count_unique_viewers(video_id),
         "average_watch_duration": avg_watch_duration,
         "average_completion_percentage": avg_completion,
-        "device_breakdown": device_counts,
+        "completion_histogram": stats['completion_histogram'],
+        "device_breakdown": stats['devices'],
         "likes": video.get('likes', 0),
         "dislikes": video.get('dislikes', 0),
         "comments_count": video.get('comments_count', 0),
@@ -82,10 +71,11 @@ def get_video_analytics(video_id, user_id):
     }
 
 
-def get_user_view_history(user_id, skip=0, limit=20):
+def get_user_view_history(user_id, skip=0, limit=20, cursor=None):
     """Get user's view history"""
-    views = list(db['views'].find({'user_id': user_id})
-                .sort('started_at', -1)
+    query = apply_cursor({'user_id': user_id}, cursor, 'started_at')
+    views = list(db['views'].find(query)
+                .sort(cursor_sort('started_at'))
                 .skip(skip)
                 .limit(limit))
     
@@ -0,0 +1,68 @@
+from bson.objectid import ObjectId
+from app.repositories.user_repository import find_users_by_ids
+
+
+# Maps fields on the user document to the fields added to each video
+UPLOADER_FIELDS = {
+    'username': 'uploader_username',
+    'display_name': 'uploader_display_name',
+    'profile_picture': 'uploader_profile_picture',
+    'followers_count': 'uploader_followers_count',
+}
+
+
+def get_users_by_ids(user_ids, db_client, fields) -> dict:
+    """
+    Fetch several users with a single projected $in query.
+
+    Args:
+        user_ids: Iterable of user ID strings (duplicates and invalid IDs are ignored)
+        db_client: The database client
+        fields: User document fields to project
+
+    Returns:
+        Dict mapping user ID string to the projected user document
+    """
+    object_ids = {ObjectId(user_id) for user_id in user_ids
+                  if user_id and ObjectId.is_valid(str(user_id))}
+    if not object_ids:
+        return {}
+
+    projection = {field: 1 for field in fields}
+    users = db_client['users'].find({'_id': {'$in': list(object_ids)}}, projection)
+    return {str(user['_id']): user for user in users}
+
+
+def attach_uploader_info(videos, db_client):
+    """
+    Add uploader details to a page of videos in one round trip.
+
+    Args:
+        videos: List of video dicts with an 'uploader_id' field
+        db_client: The database client
+
+    Returns:
+        The same list, with uploader_* fields set on each video whose uploader exists
+    """
+    uploaders = get_users_by_ids(_uploader_ids(videos), db_client, UPLOADER_FIELDS.keys())
+    return _copy_uploader_fields(videos, uploaders)
+
+
+async def attach_uploader_info_async(videos):
+    """attach_uploader_info through the async repository, for handlers on the event loop"""
+    uploaders = await find_users_by_ids(_uploader_ids(videos), UPLOADER_FIELDS.keys())
+    return _copy_uploader_fields(videos, uploaders)
+
+
+def _uploader_ids(videos):
+    return {str(video['uploader_id']) for video in videos if video.get('uploader_id')}
+
+
+def _copy_uploader_fields(videos, uploaders):
+    for video in videos:
+        uploader = uploaders.get(str(video.get('uploader_id')))
+        if uploader:
+            for user_field, video_field in UPLOADER_FIELDS.items():
+                video[video_field] = uploader.get(user_field)
+            video['uploader_followers_count'] = uploader.get('followers_count', 0)
+    return videos
@@ -0,0 +1,120 @@
+import hashlib
+import math
+
+# 2^11 one-byte registers (2KB per sketch), about 2.3% standard error
+HLL_PRECISION = 11
+# Up to this many distinct values are kept exactly, as 8-byte hashes
+HLL_EXACT_LIMIT = 128
+
+# Leading byte of the serialized forms
+_EXACT = 0
+_DENSE = 1
+
+
+def _hash64(value) -> int:
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """
+    HyperLogLog cardinality sketch with an exact mode for small sets.
+
+    Until HLL_EXACT_LIMIT distinct values are seen the sketch keeps their
+    hashes and counts exactly (and stays small when stored); past that it
+    switches to registers, whose memory is fixed by the precision however many
+    values are added. Sketches of the same precision merge into the sketch of
+    the union, so hourly/daily sketches can be combined into any range.
+    """
+
+    def __init__(self, precision=HLL_PRECISION, registers=None, exact_limit=HLL_EXACT_LIMIT):
+        self.precision = precision
+        self.size = 1 << precision
+        self.exact_limit = exact_limit
+        self.hashes = set() if registers is None else None
+        self.registers = bytearray(registers) if registers is not None else None
+        if self.registers is not None and len(self.registers) != self.size:
+            raise ValueError("Register count does not match the precision")
+
+    @classmethod
+    def from_bytes(cls, data, precision=HLL_PRECISION):
+        """Load a sketch stored with to_bytes (None or empty gives an empty sketch)"""
+        sketch = cls(precision)
+        if not data:
+            return sketch
+        data = bytes(data)
+        if len(data) == sketch.size:
+            # Bare registers, as stored before the exact mode existed
+            return cls(precision, data)
+        if data[0] == _DENSE:
+            return cls(precision, data[1:])
+        for offset in range(1, len(data), 8):
+            sketch._add_hash(int.from_bytes(data[offset:offset + 8], 'big'))
+        return sketch
+
+    def to_bytes(self) -> bytes:
+        if self.registers is not None:
+            return bytes([_DENSE]) + bytes(self.registers)
+        return bytes([_EXACT]) + b''.join(hashed.to_bytes(8, 'big') for hashed in sorted(self.hashes))
+
+    @property
+    def is_exact(self) -> bool:
+        return self.registers is None
+
+    def _set_register(self, hashed):
+        index = hashed >> (64 - self.precision)
+        remaining = (hashed << self.precision) & ((1 << 64) - 1)
+        # Position of the first 1 bit in the remaining 64 - precision bits
+        rank = min(64 - remaining.bit_length() + 1, 64 - self.precision + 1)
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def _densify(self):
+        hashes, self.hashes = self.hashes, None
+        self.registers = bytearray(self.size)
+        for hashed in hashes:
+            self._set_register(hashed)
+
+    def _add_hash(self, hashed):
+        if self.registers is None:
+            self.hashes.add(hashed)
+            if len(self.hashes) > self.exact_limit:
+                self._densify()
+        else:
+            self._set_register(hashed)
+
+    def add(self, value):
+        """Add a value (compared by its string form)"""
+        self._add_hash(_hash64(value))
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one (the union of both sets)"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches of different precision")
+        if other.registers is None:
+            for hashed in other.hashes:
+                self._add_hash(hashed)
+            return self
+        if self.registers is None:
+            self._densify()
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        """Number of distinct values added (exact in exact mode, estimated after)"""
+        if self.registers is None:
+            return len(self.hashes)
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size * self.size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            # Small cardinalities: linear counting is more accurate
+            estimate = self.size * math.log(self.size / zeros)
+        return int(round(estimate))
+
+    def __len__(self):
+        return self.count()
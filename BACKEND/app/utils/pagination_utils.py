@@ -0,0 +1,94 @@
+import base64
+from typing import Optional
+from bson import json_util
+from bson.objectid import ObjectId
+from fastapi import HTTPException
+
+
+def encode_cursor(sort_value, tiebreak_value) -> str:
+    """
+    Encode the (sort key, tiebreaker) of the last item of a page as an opaque token.
+
+    bson's JSON mode keeps datetimes and ObjectIds typed across the round trip.
+    """
+    payload = json_util.dumps([sort_value, tiebreak_value])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """
+    Decode a cursor token back into (sort_value, tiebreak_value).
+
+    Raises:
+        HTTPException: 400 if the token is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(values, list) or len(values) != 2:
+            raise ValueError("Unexpected cursor payload")
+        return values[0], values[1]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def apply_cursor(query: dict, cursor: Optional[str], sort_field: str, tiebreak_field: str = '_id', direction: int = -1) -> dict:
+    """
+    Restrict a query to the documents after a cursor.
+
+    Args:
+        query: The base filter
+        cursor: Token from a previous page, or None for the first page
+        sort_field: Field the listing is sorted by
+        tiebreak_field: Unique field used as the secondary sort key
+        direction: -1 for descending listings, 1 for ascending
+
+    Returns:
+        The filter to use, unchanged if there is no cursor
+    """
+    if not cursor:
+        return query
+
+    sort_value, tiebreak_value = decode_cursor(cursor)
+    op = '$lt' if direction < 0 else '$gt'
+
+    if sort_field == tiebreak_field:
+        condition = {sort_field: {op: sort_value}}
+    else:
+        condition = {'$or': [
+            {sort_field: {op: sort_value}},
+            {sort_field: sort_value, tiebreak_field: {op: tiebreak_value}}
+        ]}
+
+    return {'$and': [query, condition]} if query else condition
+
+
+def cursor_sort(sort_field: str, tiebreak_field: str = '_id', direction: int = -1) -> list:
+    """Sort specification matching apply_cursor"""
+    if sort_field == tiebreak_field:
+        return [(sort_field, direction)]
+    return [(sort_field, direction), (tiebreak_field, direction)]
+
+
+def build_next_cursor(items: list, limit: int, sort_key: str, id_key: str = 'id', object_id: bool = True) -> Optional[str]:
+    """
+    Build the cursor for the page after `items`.
+
+    Args:
+        items: The current page, as returned to the client
+        limit: The requested page size
+        sort_key: Key of the sort value on each item
+        id_key: Key of the tiebreaker value on each item
+        object_id: Whether the tiebreaker is an ObjectId stored as a string on the item
+
+    Returns:
+        A cursor token, or None when this is the last page
+    """
+    if not items or len(items) < limit:
+        return None
+
+    last = items[-1]
+    tiebreak_value = last.get(id_key)
+    if object_id and tiebreak_value is not None:
+        tiebreak_value = ObjectId(str(tiebreak_value))
+    return encode_cursor(last.get(sort_key), tiebreak_value)
@@ -0,0 +1,83 @@
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
+
+MAX_VIDEO_UPLOAD_BYTES = 500 * 1024 * 1024  # 500MB
+MAX_THUMBNAIL_UPLOAD_BYTES = 10 * 1024 * 1024  # 10MB
+MAX_AVATAR_UPLOAD_BYTES = 5 * 1024 * 1024  # 5MB
+
+# Largest request body per upload route: the file limit plus room for the
+# multipart boundaries and headers around it
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+UPLOAD_ROUTE_LIMITS = {
+    '/videos/upload': MAX_VIDEO_UPLOAD_BYTES,
+    '/videos/admin/upload/video': MAX_VIDEO_UPLOAD_BYTES,
+    '/videos/admin/upload/thumbnail': MAX_THUMBNAIL_UPLOAD_BYTES,
+    '/users/me/avatar': MAX_AVATAR_UPLOAD_BYTES,
+}
+
+
+def _too_large_detail(max_bytes: int) -> str:
+    return f"File size too large. Maximum allowed size is {max_bytes // (1024 * 1024)}MB"
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=400, detail=_too_large_detail(max_bytes))
+
+
+class UploadLimitMiddleware:
+    """
+    Rejects oversized bodies of the upload routes while they are received.
+
+    Starlette parses (and spools) the whole multipart body before a handler
+    runs, so a size check in the handler only fires once everything has been
+    received. This middleware answers a declared Content-Length over the
+    limit before reading anything, and counts the bytes of bodies sent
+    without one, failing the request as soon as they pass the limit.
+    """
+
+    def __init__(self, app, limits=None):
+        self.app = app
+        self.limits = limits or UPLOAD_ROUTE_LIMITS
+
+    async def __call__(self, scope, receive, send):
+        max_bytes = self.limits.get(scope.get('path', '').rstrip('/')) if scope['type'] == 'http' else None
+        if max_bytes is None or scope.get('method') != 'POST':
+            await self.app(scope, receive, send)
+            return
+
+        max_body = max_bytes + MULTIPART_OVERHEAD_BYTES
+        headers = dict(scope.get('headers') or [])
+        try:
+            content_length = int(headers.get(b'content-length', b''))
+        except ValueError:
+            content_length = None
+        if content_length is not None and content_length > max_body:
+            response = JSONResponse({"detail": _too_large_detail(max_bytes)}, status_code=400)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > max_body:
+                    # Raised inside body parsing; FastAPI passes HTTPExceptions through
+                    raise _too_large(max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def check_upload_size(file: UploadFile, max_bytes: int):
+    """
+    Reject a received upload over max_bytes (UploadLimitMiddleware bounds the
+    body of the upload routes; this checks the exact file size).
+
+    Raises:
+        HTTPException: 400 if the upload exceeds max_bytes
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(max_bytes)
@@ -0,0 +1,41 @@
+import asyncio
+import os
+
+# Set before the app is imported: in-memory Mongo and storage, no network
+os.environ['MONGODB_CONNECTION'] = 'mongomock://localhost'
+os.environ['MONGODB_DATABASE'] = 'videohub_test'
+os.environ['STORAGE_BACKEND'] = 'fake'
+os.environ['UPLOAD_STAGING_BACKEND'] = 'fake'
+os.environ['CACHE_BACKEND'] = 'memory'
+os.environ['RANKING_JOB_ENABLED'] = 'false'
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+
+import pytest
+from mongomock.collection import BulkOperationBuilder
+
+# mongomock 4.3 predates the sort option pymongo 4.11+ passes with bulk updates
+_add_update = BulkOperationBuilder.add_update
+BulkOperationBuilder.add_update = lambda self, *args, sort=None, **kwargs: _add_update(self, *args, **kwargs)
+
+from app.core.cache import response_cache
+from app.core.database import client, DATABASE_NAME
+from app.services.video.counter_services import _pending_cache
+
+
+@pytest.fixture
+def db():
+    """The test database, emptied (with the in-process caches) around each test"""
+    _reset()
+    yield client[DATABASE_NAME]
+    _reset()
+
+
+def _reset():
+    client.drop_database(DATABASE_NAME)
+    response_cache.backend.clear()
+    _pending_cache.clear()
+
+
+def run(coroutine):
+    """Run a coroutine to completion on a fresh event loop"""
+    return asyncio.run(coroutine)
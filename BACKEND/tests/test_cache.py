@@ -0,0 +1,58 @@
+import threading
+from conftest import run
+from app.core.cache import ResponseCache, MemoryCacheBackend, MISS
+
+
+def test_load_racing_an_invalidation_of_its_tag_is_not_cached():
+    cache = ResponseCache(MemoryCacheBackend())
+
+    async def load():
+        cache.invalidate('video:a')
+        return 'stale'
+
+    assert run(cache.aget_or_set('key', load, tags=['video:a'])) == 'stale'
+    assert cache.backend.get('key') is MISS
+    assert run(cache.aget_or_set('key', _value('fresh'), tags=['video:a'])) == 'fresh'
+
+
+def test_invalidating_other_tags_does_not_stop_caching():
+    cache = ResponseCache(MemoryCacheBackend())
+
+    def load():
+        cache.invalidate('video:b')
+        return 'value'
+
+    assert cache.get_or_set('key', load, tags=['video:a']) == 'value'
+    assert cache.get_or_set('key', lambda: 'reloaded', tags=['video:a']) == 'value'
+    # Nothing is tracked once no load is running
+    assert cache._tag_invalidated_at == {} and cache._loads_in_flight == 0
+
+
+def test_blocking_backend_is_called_off_the_event_loop():
+    class RecordingBackend(MemoryCacheBackend):
+        blocking = True
+
+        def get(self, key):
+            threads.add(threading.get_ident())
+            return super().get(key)
+
+        def set(self, key, value, ttl, tags=()):
+            threads.add(threading.get_ident())
+            super().set(key, value, ttl, tags)
+
+    threads, loop_threads = set(), set()
+    cache = ResponseCache(RecordingBackend())
+
+    async def load():
+        loop_threads.add(threading.get_ident())
+        return 'value'
+
+    assert run(cache.aget_or_set('key', load)) == 'value'
+    assert run(cache.aget_or_set('key', load)) == 'value'
+    assert threads and not threads & loop_threads
+
+
+def _value(value):
+    async def load():
+        return value
+    return load
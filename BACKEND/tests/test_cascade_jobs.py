@@ -0,0 +1,80 @@
+from datetime import datetime
+from bson.objectid import ObjectId
+from app.core.jobs import JobWorker, get_job
+from app.services.utility import cascade_jobs
+from app.services.utility.cascade_services import enqueue_user_deletion
+
+
+def _user_with_videos(db, count):
+    user_id = ObjectId()
+    db['users'].insert_one({'_id': user_id, 'username': 'gone'})
+    db['categories'].insert_one({'slug': 'music', 'video_count': count})
+    videos = [{'_id': ObjectId(), 'uploader_id': str(user_id), 'categories': ['music'], 'tags': []} for _ in range(count)]
+    for video in videos:
+        db['videos'].insert_one(video)
+        db['likes'].insert_one({'user_id': 'fan', 'video_id': str(video['_id']), 'like_type': 'like'})
+    return str(user_id), videos
+
+
+def _run_jobs(db):
+    # Retries are due at once
+    db['jobs'].update_many({'status': 'queued'}, {'$set': {'run_at': datetime.utcnow()}})
+    JobWorker(db).run_pending()
+
+
+def test_videos_are_deleted_in_batches(db, monkeypatch):
+    monkeypatch.setattr(cascade_jobs, 'USER_CASCADE_BATCH_SIZE', 2)
+    user_id, _ = _user_with_videos(db, 5)
+    job_id = enqueue_user_deletion({'_id': ObjectId(user_id)})
+
+    _run_jobs(db)
+
+    job = get_job(job_id, db)
+    assert job['status'] == 'succeeded'
+    assert job['result']['results']['videos'] == 5 and 'video_batch' not in job['result']
+    assert db['videos'].count_documents({}) == 0 and db['likes'].count_documents({}) == 0
+    assert db['categories'].find_one({'slug': 'music'})['video_count'] == 0
+
+
+def test_retried_batch_does_not_decrement_twice(db, monkeypatch):
+    monkeypatch.setattr(cascade_jobs, 'USER_CASCADE_BATCH_SIZE', 2)
+    user_id, _ = _user_with_videos(db, 3)
+    decrement = cascade_jobs._decrement_slug_counts
+    calls = []
+
+    def fail_once_in_second_batch(collection, slugs):
+        if collection == 'tags':
+            calls.append(slugs)
+            if len(calls) == 2:
+                raise Exception('storage outage')
+        return decrement(collection, slugs)
+
+    monkeypatch.setattr(cascade_jobs, '_decrement_slug_counts', fail_once_in_second_batch)
+    job_id = enqueue_user_deletion({'_id': ObjectId(user_id)})
+
+    _run_jobs(db)
+    assert get_job(job_id, db)['status'] == 'queued'
+    _run_jobs(db)
+
+    assert get_job(job_id, db)['status'] == 'succeeded'
+    assert db['categories'].find_one({'slug': 'music'})['video_count'] == 0
+    assert db['videos'].count_documents({}) == 0
+
+
+def test_replies_to_the_users_comments_are_removed(db):
+    user_id, _ = _user_with_videos(db, 0)
+    video_id = str(ObjectId())
+    comment_id = ObjectId()
+    db['comments'].insert_many([
+        {'_id': comment_id, 'user_id': user_id, 'video_id': video_id, 'parent_comment_id': None},
+        {'user_id': 'other', 'video_id': video_id, 'parent_comment_id': str(comment_id)},
+        {'user_id': 'other', 'video_id': video_id, 'parent_comment_id': None},
+    ])
+    db['videos'].insert_one({'_id': ObjectId(video_id), 'uploader_id': 'other', 'comments_count': 3})
+
+    enqueue_user_deletion({'_id': ObjectId(user_id)})
+    _run_jobs(db)
+
+    assert [comment['parent_comment_id'] for comment in db['comments'].find()] == [None]
+    pending = db['video_counters'].aggregate([{'$group': {'_id': None, 'total': {'$sum': '$comments_count'}}}])
+    assert next(pending)['total'] == -2
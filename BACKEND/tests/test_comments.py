@@ -0,0 +1,63 @@
+import pytest
+from bson.objectid import ObjectId
+from fastapi import HTTPException
+from conftest import run
+from app.schemas.video.comment_schemas import CommentCreate, CommentUpdate
+from app.services.video.counter_services import get_pending_counters
+from app.services.video.comment_services import (
+    create_comment,
+    get_video_comments,
+    update_comment,
+    delete_comment,
+    pin_comment
+)
+
+
+def _setup(db):
+    user_id, owner_id, video_id = ObjectId(), ObjectId(), ObjectId()
+    db['users'].insert_many([
+        {'_id': user_id, 'username': 'ann', 'profile_picture': 'ann.png'},
+        {'_id': owner_id, 'username': 'owner'},
+    ])
+    db['videos'].insert_one({'_id': video_id, 'title': 'video', 'uploader_id': str(owner_id)})
+    return str(user_id), str(owner_id), str(video_id)
+
+
+def _comment(video_id, user_id, text='hi'):
+    return run(create_comment(CommentCreate(video_id=video_id, text=text), user_id))
+
+
+def test_comments_are_listed_with_their_authors(db):
+    user_id, owner_id, video_id = _setup(db)
+    first = _comment(video_id, user_id, 'first')
+    second = _comment(video_id, owner_id, 'second')
+
+    comments = run(get_video_comments(video_id))
+    assert [comment['id'] for comment in comments] == [second, first]
+    assert comments[1]['username'] == 'ann' and comments[1]['user_profile_picture'] == 'ann.png'
+    assert get_pending_counters([video_id], use_cache=False)[video_id]['comments_count'] == 2
+
+
+def test_only_the_author_edits_and_deletes(db):
+    user_id, owner_id, video_id = _setup(db)
+    comment_id = _comment(video_id, user_id)
+
+    with pytest.raises(HTTPException) as error:
+        run(update_comment(comment_id, CommentUpdate(text='edited'), owner_id))
+    assert error.value.status_code == 403
+    assert run(update_comment(comment_id, CommentUpdate(text='edited'), user_id))['is_edited']
+
+    assert run(delete_comment(comment_id, user_id))
+    assert db['comments'].count_documents({}) == 0
+    assert get_pending_counters([video_id], use_cache=False)[video_id] == {}
+
+
+def test_only_the_video_owner_pins(db):
+    user_id, owner_id, video_id = _setup(db)
+    comment_id = _comment(video_id, user_id)
+
+    with pytest.raises(HTTPException) as error:
+        run(pin_comment(comment_id, user_id))
+    assert error.value.status_code == 403
+    assert run(pin_comment(comment_id, owner_id))
+    assert db['comments'].find_one()['is_pinned']
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+import mongomock
+import pytest
+from bson.objectid import ObjectId
+from app.services.video import counter_services
+from app.services.video.counter_services import (
+    increment_video_counters,
+    get_pending_counters,
+    rollup_video_counters,
+    COUNTER_ROLLUP_LEASE_ID
+)
+
+
+@pytest.fixture
+def video(db):
+    video = {'_id': ObjectId(), 'views': 5, 'likes': 1}
+    db['videos'].insert_one(video)
+    return video
+
+
+def test_rollup_folds_shards_into_the_video(db, video):
+    for _ in range(4):
+        increment_video_counters(str(video['_id']), {'views': 2, 'likes': 1})
+    assert get_pending_counters([str(video['_id'])], use_cache=False)[str(video['_id'])] == {'views': 8, 'likes': 4}
+
+    assert rollup_video_counters() == 1
+    stored = db['videos'].find_one({'_id': video['_id']})
+    assert (stored['views'], stored['likes']) == (13, 5)
+    assert db['video_counters'].count_documents({}) == 0
+    assert db['video_counter_folds'].count_documents({}) == 0
+
+
+def test_interrupted_fold_is_replayed_once(db, video, monkeypatch):
+    increment_video_counters(str(video['_id']), {'views': 3})
+    bulk_write = mongomock.collection.Collection.bulk_write
+
+    def crash_on_videos(self, *args, **kwargs):
+        result = bulk_write(self, *args, **kwargs)
+        if self.name == 'videos':
+            raise RuntimeError("crashed after the video write")
+        return result
+
+    monkeypatch.setattr(mongomock.collection.Collection, 'bulk_write', crash_on_videos)
+    with pytest.raises(RuntimeError):
+        rollup_video_counters()
+    monkeypatch.undo()
+
+    # The fold was applied but not cleared; the replay must not add it again
+    assert db['video_counter_folds'].count_documents({}) == 1
+    rollup_video_counters()
+    assert db['videos'].find_one({'_id': video['_id']})['views'] == 8
+    assert db['video_counter_folds'].count_documents({}) == 0
+
+
+def test_rollup_skips_while_another_process_holds_the_lease(db, video):
+    increment_video_counters(str(video['_id']), {'views': 3})
+    db['analytics_state'].insert_one({'_id': COUNTER_ROLLUP_LEASE_ID, 'lease_until': datetime.now() + timedelta(minutes=1)})
+    assert rollup_video_counters() is None
+    assert db['videos'].find_one({'_id': video['_id']})['views'] == 5
@@ -0,0 +1,33 @@
+from pymongo import ASCENDING
+from app.core.indexes import ensure_indexes, reconcile_indexes
+
+SPECS = {
+    'users': [('email_unique', [('email', ASCENDING)], {'unique': True})],
+    'timeline_entries': [('user_created_at', [('user_id', ASCENDING), ('created_at', ASCENDING)], {})],
+}
+
+
+def test_startup_only_creates_missing_indexes(db):
+    db['users'].create_index([('email', ASCENDING)], name='email_1')
+    db['timeline_entries'].create_index([('added_at', ASCENDING)], name='added_at_ttl', expireAfterSeconds=60)
+
+    result = ensure_indexes(db, SPECS)
+    assert result == {
+        'created': ['timeline_entries.user_created_at'],
+        'mismatched': ['users.email_unique'],
+        'retired': ['timeline_entries.added_at_ttl'],
+        'failed': [],
+    }
+    # Nothing existing was touched
+    assert not db['users'].index_information()['email_1'].get('unique')
+    assert 'added_at_ttl' in db['timeline_entries'].index_information()
+
+
+def test_reconcile_rebuilds_and_drops(db):
+    db['users'].create_index([('email', ASCENDING)], name='email_1')
+    db['timeline_entries'].create_index([('added_at', ASCENDING)], name='added_at_ttl', expireAfterSeconds=60)
+
+    result = reconcile_indexes(db, SPECS)
+    assert result['updated'] == ['users.email_unique'] and result['dropped'] == ['timeline_entries.added_at_ttl']
+    assert db['users'].index_information()['email_unique']['unique']
+    assert ensure_indexes(db, SPECS) == {'created': [], 'mismatched': [], 'retired': [], 'failed': []}
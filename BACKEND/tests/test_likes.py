@@ -0,0 +1,101 @@
+from datetime import datetime
+import pytest
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
+from fastapi import HTTPException
+from conftest import run
+from app.services.video import like_services
+from app.schemas.video.like_schemas import LikeCreate
+from app.services.video.counter_services import get_pending_counters
+from app.services.video.like_services import create_like, remove_like, get_like_status, reconcile_like_counts
+
+USER_ID = str(ObjectId())
+
+
+def _video(db):
+    video_id = ObjectId()
+    db['videos'].insert_one({'_id': video_id, 'title': 'video', 'likes': 0, 'dislikes': 0})
+    return str(video_id)
+
+
+def _counters(video_id):
+    pending = get_pending_counters([video_id], use_cache=False)[video_id]
+    return pending.get('likes', 0), pending.get('dislikes', 0)
+
+
+def _react(video_id, like_type, user_id=USER_ID):
+    return run(create_like(LikeCreate(video_id=video_id, like_type=like_type), user_id))
+
+
+def test_like_toggles_on_and_off(db):
+    video_id = _video(db)
+    assert _react(video_id, 'like') == {'action': 'created', 'like_type': 'like'}
+    assert _counters(video_id) == (1, 0)
+    assert run(get_like_status(video_id, USER_ID))['liked']
+
+    assert _react(video_id, 'like') == {'action': 'removed', 'like_type': 'like'}
+    assert _counters(video_id) == (0, 0)
+    assert run(get_like_status(video_id, USER_ID)) == {'liked': False, 'disliked': False, 'like_type': None}
+
+
+def test_switching_reaction_moves_both_counters(db):
+    video_id = _video(db)
+    _react(video_id, 'like')
+    assert _react(video_id, 'dislike') == {'action': 'updated', 'like_type': 'dislike'}
+    assert _counters(video_id) == (0, 1)
+    assert db['likes'].count_documents({}) == 1
+
+
+def test_remove_like_leaves_a_tombstone(db):
+    video_id = _video(db)
+    _react(video_id, 'dislike')
+    assert run(remove_like(video_id, USER_ID))
+    assert db['likes'].find_one({'user_id': USER_ID})['like_type'] is None
+    assert _counters(video_id) == (0, 0)
+    with pytest.raises(HTTPException) as error:
+        run(remove_like(video_id, USER_ID))
+    assert error.value.status_code == 404
+
+
+def test_unknown_reaction_is_rejected(db):
+    with pytest.raises(HTTPException) as error:
+        _react(_video(db), 'love')
+    assert error.value.status_code == 400
+
+
+def test_reconciler_agrees_with_toggled_counters(db):
+    video_id = _video(db)
+    for user_id in ('a', 'b', 'c'):
+        _react(video_id, 'like', user_id)
+    _react(video_id, 'like', 'c')
+    assert reconcile_like_counts(full=True)['repaired'] == 0
+    assert _counters(video_id) == (2, 0)
+
+
+def test_racing_first_click_is_retried_as_an_update(db, monkeypatch):
+    video_id = _video(db)
+    toggle = like_services.toggle_reaction
+    calls = []
+
+    async def insert_raced(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            # Another click inserted the document first
+            db['likes'].insert_one({'user_id': USER_ID, 'video_id': video_id, 'like_type': 'like'})
+            raise DuplicateKeyError('E11000 duplicate key')
+        return await toggle(*args, **kwargs)
+
+    monkeypatch.setattr(like_services, 'toggle_reaction', insert_raced)
+    # The retry sees the other click's like, so this click takes it back
+    assert _react(video_id, 'like') == {'action': 'removed', 'like_type': 'like'}
+    assert len(calls) == 2
+
+
+def test_reconciler_repairs_drifted_counters(db):
+    video_id = _video(db)
+    db['likes'].insert_many([
+        {'user_id': user_id, 'video_id': video_id, 'like_type': 'like', 'updated_at': datetime(2024, 1, 1)}
+        for user_id in ('a', 'b')
+    ])
+    assert reconcile_like_counts(full=True)['repaired'] == 1
+    assert db['videos'].find_one({'_id': ObjectId(video_id)})['likes'] == 2
@@ -0,0 +1,26 @@
+import io
+from bson.objectid import ObjectId
+from app.core.jobs import JobWorker, get_job
+from app.core.storage import get_storage
+from app.services.utility import media_jobs  # noqa: F401 (registers the job handlers)
+from app.services.utility.media_services import queue_upload
+
+
+def test_deferred_upload_is_stored_and_attached_by_the_worker(db):
+    video_id = ObjectId()
+    db['videos'].insert_one({'_id': video_id, 'title': 'video'})
+    storage = get_storage('fake')
+
+    job_id = queue_upload(io.BytesIO(b'thumbnail bytes'), 'thumb.png', 'image', 'videohub/thumbnails', 'admin',
+                          video_id=str(video_id), video_field='thumbnail_url')
+    assert db['videos'].find_one({'_id': video_id}).get('thumbnail_url') is None
+
+    JobWorker(db).run_pending()
+
+    job = get_job(job_id, db)
+    assert job['status'] == 'succeeded'
+    key = job['result']['asset']['key']
+    assert key.startswith('videohub/thumbnails/') and storage.contents[key] == b'thumbnail bytes'
+    video = db['videos'].find_one({'_id': video_id})
+    assert video['thumbnail_url'] == job['result']['secure_url']
+    assert video['thumbnail_asset']['key'] == key
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+import pytest
+from bson.objectid import ObjectId
+from fastapi import HTTPException
+from conftest import run
+from app.services.video.comment_services import get_video_comments, get_comment_replies
+from app.utils.pagination_utils import (
+    encode_cursor,
+    decode_cursor,
+    apply_cursor,
+    cursor_sort,
+    build_next_cursor
+)
+
+START = datetime(2024, 1, 1)
+
+
+def test_cursor_keeps_datetimes_and_object_ids():
+    object_id = ObjectId()
+    assert decode_cursor(encode_cursor(START, object_id)) == (START, object_id)
+
+
+@pytest.mark.parametrize('cursor', ['garbage', encode_cursor(1, 2)[:-3], 'WzFd'])
+def test_malformed_cursor_is_a_bad_request(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_ascending_pages_with_ties_cover_every_document_once(db):
+    # Three documents per timestamp, so pages end in the middle of ties
+    db['items'].insert_many([{'created_at': START + timedelta(minutes=i // 3)} for i in range(10)])
+    seen, cursor = [], None
+    while True:
+        page = list(db['items'].find(apply_cursor({}, cursor, 'created_at', direction=1))
+                    .sort(cursor_sort('created_at', direction=1)).limit(4))
+        seen += [item['_id'] for item in page]
+        cursor = build_next_cursor([{'id': str(item['_id']), **item} for item in page], 4, 'created_at')
+        if cursor is None:
+            break
+    assert seen == [item['_id'] for item in db['items'].find().sort([('created_at', 1), ('_id', 1)])]
+
+
+def test_comment_pages_follow_the_next_cursor(db):
+    video_id = str(ObjectId())
+    db['comments'].insert_many([
+        {'video_id': video_id, 'user_id': None, 'parent_comment_id': None, 'created_at': START + timedelta(minutes=i % 2)}
+        for i in range(5)
+    ])
+    seen, cursor = [], None
+    while True:
+        page = run(get_video_comments(video_id, limit=2, cursor=cursor))
+        seen += [comment['id'] for comment in page]
+        cursor = build_next_cursor(page, 2, 'created_at')
+        if cursor is None:
+            break
+    assert len(seen) == 5 and len(set(seen)) == 5
+
+
+def test_cursor_on_a_filtered_listing_keeps_the_filter(db):
+    db['comments'].insert_many([
+        {'parent_comment_id': 7, 'created_at': START + timedelta(minutes=i)} for i in range(3)
+    ] + [{'parent_comment_id': 8, 'created_at': START + timedelta(minutes=i)} for i in range(3)])
+    first = run(get_comment_replies('7', limit=2))
+    rest = run(get_comment_replies('7', limit=2, cursor=build_next_cursor(first, 2, 'created_at')))
+    assert [reply['parent_comment_id'] for reply in first + rest] == [7, 7, 7]
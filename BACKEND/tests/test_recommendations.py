@@ -0,0 +1,34 @@
+from datetime import datetime
+from bson.objectid import ObjectId
+from app.services.video import recommendation_services
+from app.services.video.recommendation_services import AffinityBuffer, score_candidates
+
+NOW = datetime(2024, 6, 1)
+
+
+def test_scoring_uses_only_the_strongest_keys(monkeypatch):
+    monkeypatch.setattr(recommendation_services, 'AFFINITY_MAX_KEYS', 2)
+    # 'weak' would win on its own, but it is not among the two strongest keys
+    categories = {'music': 5.0, 'games': -4.0, 'weak': 0.5}
+    candidates = [
+        {'categories': ['weak'], 'created_at': NOW},
+        {'categories': ['music'], 'created_at': NOW},
+        {'categories': ['games'], 'created_at': NOW},
+    ]
+    assert score_candidates(candidates, categories, {}, NOW, 3) == [1, 0, 2]
+
+
+def test_flush_trims_the_affinity_document(db, monkeypatch):
+    monkeypatch.setattr(recommendation_services, 'AFFINITY_MAX_KEYS', 2)
+    video_id = ObjectId()
+    db['videos'].insert_one({'_id': video_id, 'categories': ['music'], 'tags': ['a', 'b', 'c']})
+    db['user_affinities'].insert_one({'_id': 'u', 'categories': {'games': 1.0}, 'tags': {'a': 10.0, 'z': -9.0}})
+
+    buffer = AffinityBuffer(db)
+    # At the epoch a signal is stored unscaled
+    buffer.add('u', str(video_id), 1.0, recommendation_services.AFFINITY_EPOCH)
+    buffer.flush()
+
+    document = db['user_affinities'].find_one({'_id': 'u'})
+    assert set(document['categories']) == {'games', 'music'}
+    assert set(document['tags']) == {'a', 'z'}
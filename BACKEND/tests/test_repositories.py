@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from conftest import run
+from app.core.database import get_async_db
+from app.repositories.timeline_repository import find_timeline_entries, trim_timeline
+from app.repositories.user_repository import find_users_by_ids, find_followed_ids
+from app.repositories.video_repository import (
+    find_video,
+    find_videos,
+    find_published_videos,
+    sum_counter_shards,
+    find_top_ranked_video_ids
+)
+from app.services.video.video_services import _get_published_videos_in_order
+from app.utils.pagination_utils import apply_cursor, cursor_sort, encode_cursor
+
+START = datetime(2024, 1, 1)
+
+
+def _insert_videos(db, count, **fields):
+    videos = [
+        {'_id': ObjectId(), 'title': f"video {i}", 'status': 'published', 'views': i,
+         'created_at': START + timedelta(minutes=i), **fields}
+        for i in range(count)
+    ]
+    db['videos'].insert_many(videos)
+    return videos
+
+
+def test_ping_through_the_mongomock_facade(db):
+    assert run(get_async_db().command('ping'))['ok']
+
+
+def test_async_reads_see_sync_writes(db):
+    [video] = _insert_videos(db, 1)
+    assert run(find_video(str(video['_id']), {'title': 1}))['title'] == 'video 0'
+    assert run(find_video('not-an-id')) is None
+
+
+def test_feed_query_sorts_skips_and_limits(db):
+    _insert_videos(db, 5)
+    videos = run(find_videos({'status': 'published'}, {'views': 1}, cursor_sort('views'), skip=1, limit=2))
+    assert [video['views'] for video in videos] == [3, 2]
+
+
+def test_cursor_pages_cover_the_feed_once(db):
+    # Ties on the sort key are broken by _id
+    _insert_videos(db, 7, views=10)
+    seen, cursor = [], None
+    while True:
+        page = run(find_videos(
+            apply_cursor({'status': 'published'}, cursor, 'views'), {'views': 1}, cursor_sort('views'), limit=3
+        ))
+        seen += [video['_id'] for video in page]
+        if len(page) < 3:
+            break
+        cursor = encode_cursor(page[-1]['views'], page[-1]['_id'])
+    assert len(seen) == 7 and len(set(seen)) == 7
+
+
+def test_find_published_videos_skips_drafts_and_invalid_ids(db):
+    published = _insert_videos(db, 2)
+    [draft] = _insert_videos(db, 1, status='draft')
+    ids = [str(published[0]['_id']), str(draft['_id']), 'bogus', str(published[1]['_id'])]
+    assert set(run(find_published_videos(ids))) == {str(published[0]['_id']), str(published[1]['_id'])}
+
+
+def test_published_videos_keep_the_requested_order(db):
+    videos = _insert_videos(db, 4)
+    order = [str(videos[i]['_id']) for i in (2, 0, 3, 1)]
+    assert [str(video['_id']) for video in run(_get_published_videos_in_order(order))] == order
+
+
+def test_counter_shards_are_summed_per_video(db):
+    db['video_counters'].insert_many([
+        {'_id': 'a:0', 'video_id': 'a', 'views': 2},
+        {'_id': 'a:1', 'video_id': 'a', 'views': 3, 'likes': 1},
+        {'_id': 'b:0', 'video_id': 'b', 'views': 7},
+    ])
+    rows = {row['_id']: row for row in run(sum_counter_shards(['a'], ('views', 'likes')))}
+    assert rows == {'a': {'_id': 'a', 'views': 5, 'likes': 1}}
+
+
+def test_top_ranked_ids_skip_zero_scores(db):
+    db['video_rankings'].insert_many([
+        {'_id': 'a', 'hot_score': 1.0}, {'_id': 'b', 'hot_score': 3.0}, {'_id': 'c', 'hot_score': 0},
+    ])
+    assert run(find_top_ranked_video_ids('hot_score', 10)) == ['b', 'a']
+
+
+def test_users_and_follows(db):
+    user_id, other_id = ObjectId(), ObjectId()
+    db['users'].insert_many([{'_id': user_id, 'username': 'ann', 'email': 'x'}, {'_id': other_id, 'username': 'bo'}])
+    db['followers'].insert_many([
+        {'follower_id': 'me', 'following_id': str(user_id), 'status': 'active'},
+        {'follower_id': 'me', 'following_id': str(other_id), 'status': 'blocked'},
+    ])
+    users = run(find_users_by_ids([str(user_id), str(user_id), None, 'bogus'], ['username']))
+    assert users == {str(user_id): {'_id': user_id, 'username': 'ann'}}
+    assert run(find_followed_ids('me', [str(user_id), str(other_id)])) == [str(user_id)]
+
+
+def test_timeline_page_and_trim(db):
+    db['timeline_entries'].insert_many([
+        {'user_id': 'me', 'video_id': f"v{i}", 'created_at': START + timedelta(minutes=i)} for i in range(5)
+    ])
+    assert list(run(find_timeline_entries('me', limit=2))) == ['v4', 'v3']
+    run(trim_timeline('me', 3))
+    assert sorted(entry['video_id'] for entry in db['timeline_entries'].find()) == ['v2', 'v3', 'v4']
@@ -0,0 +1,70 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from bson.objectid import ObjectId
+from fastapi import HTTPException
+from conftest import run
+from app.core.storage import get_storage, asset_ref
+from app.services.video.stream_services import create_stream_session, verify_stream_token, _sign
+from app.services.video.video_services import get_video_by_id_async
+
+
+@pytest.fixture
+def premium_video(db):
+    metadata = get_storage('fake')._store('videohub/videos', 'movie.mp4', 'video', b'data')
+    video = {
+        '_id': ObjectId(), 'title': 'premium', 'status': 'published', 'is_premium': True,
+        'uploader_id': 'uploader', 'video_url': metadata['secure_url'],
+        'video_asset': asset_ref('fake', metadata['public_id'], 'video'),
+    }
+    db['videos'].insert_one(video)
+    return video
+
+
+def test_token_round_trip():
+    token = _sign({'video_id': 'v1', 'asset': {}, 'exp': int(time.time()) + 60})
+    assert verify_stream_token(token, 'v1')['video_id'] == 'v1'
+
+
+@pytest.mark.parametrize('token, video_id', [
+    (_sign({'video_id': 'v1', 'exp': int(time.time()) + 60}), 'v2'),
+    (_sign({'video_id': 'v1', 'exp': int(time.time()) - 1}), 'v1'),
+    (_sign({'video_id': 'v1', 'exp': int(time.time()) + 60})[:-2] + 'xx', 'v1'),
+    ('not-a-token', 'v1'),
+    ('a.b.c', 'v1'),
+])
+def test_invalid_tokens_are_rejected(token, video_id):
+    with pytest.raises(HTTPException) as error:
+        verify_stream_token(token, video_id)
+    assert error.value.status_code == 401
+
+
+def test_token_signed_with_another_secret_is_rejected(monkeypatch):
+    token = _sign({'video_id': 'v1', 'exp': int(time.time()) + 60})
+    monkeypatch.setenv('SECRET_KEY', 'another-secret')
+    with pytest.raises(HTTPException):
+        verify_stream_token(token, 'v1')
+
+
+def test_premium_session_needs_an_active_subscription(db, premium_video):
+    video_id = str(premium_video['_id'])
+    with pytest.raises(HTTPException) as error:
+        create_stream_session(video_id, None)
+    assert error.value.status_code == 401
+    with pytest.raises(HTTPException) as error:
+        create_stream_session(video_id, {'user_id': 'viewer'})
+    assert error.value.status_code == 403
+
+    expires_at = datetime.utcnow() + timedelta(minutes=30)
+    db['time_subscriptions'].insert_one({'user_id': 'viewer', 'expires_at': expires_at})
+    session = create_stream_session(video_id, {'user_id': 'viewer'})
+    claims = verify_stream_token(session['token'], video_id)
+    # The session ends with the subscription
+    assert claims['exp'] <= time.time() + 30 * 60 + 1
+    assert claims['asset'] == premium_video['video_asset']
+
+
+def test_premium_media_is_not_in_read_responses(db, premium_video):
+    video = run(get_video_by_id_async(str(premium_video['_id'])))
+    assert video['video_url'] is None
+    assert 'video_asset' not in video
@@ -0,0 +1,43 @@
+from bson.objectid import ObjectId
+from app.services.video import unique_viewer_services
+from app.services.video.unique_viewer_services import get_viewer_sketch, record_viewers, count_unique_viewers
+from app.utils.hyperloglog import HyperLogLog, HLL_EXACT_LIMIT
+
+
+def test_merge_is_the_union():
+    first = HyperLogLog().update(range(0, 300))
+    second = HyperLogLog().update(range(200, 500))
+    merged = HyperLogLog.from_bytes(first.to_bytes()).merge(second)
+    assert abs(merged.count() - 500) <= 500 * 0.05
+    # Merging again, or in the other order, changes nothing
+    assert merged.to_bytes() == HyperLogLog.from_bytes(merged.to_bytes()).merge(second).to_bytes()
+    assert second.merge(first).to_bytes() == merged.to_bytes()
+
+
+def test_exact_sketches_merge_exactly():
+    merged = HyperLogLog().update(['a', 'b']).merge(HyperLogLog().update(['b', 'c']))
+    assert merged.is_exact and merged.count() == 3
+    # Past the exact limit the merge switches to registers
+    merged.merge(HyperLogLog().update(range(HLL_EXACT_LIMIT)))
+    assert not merged.is_exact
+
+
+def test_viewers_flushed_while_the_sketch_is_built_are_kept(db, monkeypatch):
+    video_id = str(ObjectId())
+    db['views'].insert_one({'video_id': video_id, 'user_id': 'early'})
+    build = unique_viewer_services._sketch_from_views
+    calls = []
+
+    def flush_during_first_read(match):
+        sketch = build(match)
+        if not calls:
+            # A view flush lands before the sketch exists, so record_viewers skips it
+            db['views'].insert_one({'video_id': video_id, 'user_id': 'late'})
+            record_viewers({video_id: {'late'}})
+        calls.append(match)
+        return sketch
+
+    monkeypatch.setattr(unique_viewer_services, '_sketch_from_views', flush_during_first_read)
+    assert get_viewer_sketch(video_id).count() == 2
+    monkeypatch.undo()
+    assert count_unique_viewers(video_id) == 2
@@ -0,0 +1,22 @@
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from conftest import run
+from app.services.video.video_services import get_all_videos
+
+
+def test_views_cursor_uses_stored_views_not_pending_counts(db):
+    videos = [
+        {'_id': ObjectId(), 'title': f"video {i}", 'status': 'published', 'views': 10 * i,
+         'created_at': datetime(2024, 1, 1) + timedelta(minutes=i)}
+        for i in range(6)
+    ]
+    db['videos'].insert_many(videos)
+    # Pending shard counts would move the page's last video past the next page
+    db['video_counters'].insert_many([
+        {'_id': f"{video['_id']}:0", 'video_id': str(video['_id']), 'views': 100} for video in videos
+    ])
+
+    first, cursor = run(get_all_videos(limit=3, sort_by='views'))
+    second, _ = run(get_all_videos(limit=3, sort_by='views', cursor=cursor))
+    assert [video['views'] for video in first] == [150, 140, 130]
+    assert [video['views'] for video in second] == [120, 110, 100]
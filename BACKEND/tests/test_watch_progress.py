@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from pymongo import ASCENDING
+from conftest import run
+from app.services.user.watch_progress_buffer import WatchProgressBuffer
+
+NOW = datetime(2024, 1, 1, 12)
+
+
+def _viewer(db):
+    user_id, video_id = ObjectId(), ObjectId()
+    db['users'].insert_one({'_id': user_id, 'username': 'ann'})
+    db['videos'].insert_one({'_id': video_id, 'title': 'video'})
+    db['watch_history'].create_index([('user_id', ASCENDING), ('video_id', ASCENDING)], unique=True)
+    return str(user_id), str(video_id)
+
+
+def _report(position, last_watched_at, is_completed=False):
+    return {'watch_position': position, 'last_watched_at': last_watched_at, 'is_completed': is_completed}
+
+
+def test_stale_flush_does_not_move_the_position_back(db):
+    user_id, video_id = _viewer(db)
+    # Another process already stored a newer position
+    db['watch_history'].insert_one({'user_id': user_id, 'video_id': video_id, 'watch_position': 300,
+                                    'last_watched_at': NOW})
+    buffer = WatchProgressBuffer(db)
+    buffer._pending[(user_id, video_id)] = _report(120, NOW - timedelta(seconds=30))
+    buffer.flush()
+
+    row = db['watch_history'].find_one({'user_id': user_id})
+    assert row['watch_position'] == 300 and row['last_watched_at'] == NOW
+    assert db['watch_history'].count_documents({}) == 1
+    assert buffer.get_pending(user_id, video_id) is None
+
+
+def test_newer_flush_moves_the_position_forward(db):
+    user_id, video_id = _viewer(db)
+    db['watch_history'].insert_one({'user_id': user_id, 'video_id': video_id, 'watch_position': 120,
+                                    'last_watched_at': NOW - timedelta(seconds=30)})
+    buffer = WatchProgressBuffer(db)
+    buffer._pending[(user_id, video_id)] = _report(300, NOW)
+    buffer.flush()
+
+    assert db['watch_history'].find_one({'user_id': user_id})['watch_position'] == 300
+    assert db['watch_history'].count_documents({}) == 1
+
+
+def test_stale_write_through_is_skipped(db):
+    user_id, video_id = _viewer(db)
+    db['watch_history'].insert_one({'user_id': user_id, 'video_id': video_id, 'watch_position': 300,
+                                    'last_watched_at': NOW})
+    run(WatchProgressBuffer(db)._write_through(user_id, video_id, _report(120, NOW - timedelta(seconds=30))))
+
+    assert db['watch_history'].find_one({'user_id': user_id})['watch_position'] == 300
+
+
+def test_heartbeats_are_buffered_and_pauses_written_through(db):
+    user_id, video_id = _viewer(db)
+    buffer = WatchProgressBuffer(db)
+    run(buffer.add(user_id, video_id, {'watch_position': 10}))
+    assert db['watch_history'].count_documents({}) == 0
+    assert buffer.get_pending(user_id, video_id)['watch_position'] == 10
+
+    run(buffer.add(user_id, video_id, {'watch_position': 20}, 'pause'))
+    assert buffer.get_pending(user_id, video_id) is None
+    assert db['watch_history'].find_one({'user_id': user_id})['watch_position'] == 20
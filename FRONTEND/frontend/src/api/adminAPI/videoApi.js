@@ -1,4 +1,5 @@
 import { axiosInstance } from "../lib/axios";
+import { waitForJob } from "../publicAPI/jobApi";
 
 // Get all videos with filters
 export async function getAllVideos(skip = 0, limit = 50, filters = {}) {
@@ -61,11 +62,18 @@ export async function uploadVideo(file, onUploadProgress) {
     const formData = new FormData();
     formData.append('file', file);
     const response = await axiosInstance.post('/videos/admin/upload/video', formData, {
+      // Stored by the job workers instead of during the request
+      params: { defer: true },
       headers: {
         'Content-Type': 'multipart/form-data',
       },
       onUploadProgress,
     });
+    if (response.status === 202) {
+      // Stored by the job workers; the job result holds the URL and metadata
+      const result = await waitForJob(response.data.job_id);
+      return { ...result, url: result.secure_url };
+    }
     return response.data;
   } catch (error) {
     console.error('Video upload error:', error.response?.data);
@@ -80,11 +88,16 @@ export async function uploadThumbnail(file, onUploadProgress) {
     const formData = new FormData();
     formData.append('file', file);
     const response = await axiosInstance.post('/videos/admin/upload/thumbnail', formData, {
+      params: { defer: true },
       headers: {
         'Content-Type': 'multipart/form-data',
       },
       onUploadProgress,
     });
+    if (response.status === 202) {
+      const result = await waitForJob(response.data.job_id);
+      return { ...result, url: result.secure_url };
+    }
     return response.data;
   } catch (error) {
     console.error('Thumbnail upload error:', error.response?.data);
@@ -0,0 +1,18 @@
+import { axiosInstance } from '../lib/axios';
+
+// Poll a background job (e.g. a queued upload) until it finishes; resolves with its result
+export async function waitForJob(jobId, { intervalMs = 1000, timeoutMs = 10 * 60 * 1000 } = {}) {
+  const deadline = Date.now() + timeoutMs;
+  while (Date.now() < deadline) {
+    const response = await axiosInstance.get(`/jobs/${jobId}`);
+    const job = response.data;
+    if (job.status === 'succeeded') {
+      return job.result;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Background job failed');
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+  throw new Error('Timed out waiting for the background job');
+}
@@ -1,5 +1,6 @@
 
 import { axiosInstance } from "../lib/axios";
+import { waitForJob } from "./jobApi";
 
 // Signup: POST /users/register
 export async function signup({ username, email, password, display_name }) {
@@ -86,13 +87,20 @@ export async function uploadAvatar(file) {
     formData.append('file', file);
     
     const response = await axiosInstance.post('/users/me/avatar', formData, {
+      // Stored by the job workers instead of during the request
+      params: { defer: true },
       headers: {
         'Content-Type': 'multipart/form-data'
       }
     });
+    if (response.status === 202) {
+      // Stored by the job workers
+      const result = await waitForJob(response.data.job_id);
+      return { message: 'Avatar uploaded successfully', profile_picture: result.secure_url };
+    }
     return response.data;
   } catch (error) {
-    throw new Error(error.response?.data?.detail || 'Failed to upload avatar');
+    throw new Error(error.response?.data?.detail || error.message || 'Failed to upload avatar');
   }
 }
 
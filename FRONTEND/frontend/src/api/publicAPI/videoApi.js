@@ -23,7 +23,7 @@ export const getAllVideos = async (skip = 0, limit = 20, search = '', category =
 // Get trending videos
 export const getTrendingVideos = async (limit = 20) => {
   try {
-    const response = await axiosInstance.get(`/videos/trending?limit=${limit}`);
+    const response = await axiosInstance.get(`/videos/trending?limit=${limit}&view=card`);
     return response.data;
   } catch (error) {
     console.error('Error fetching trending videos:', error);
@@ -34,7 +34,7 @@ export const getTrendingVideos = async (limit = 20) => {
 // Get featured videos
 export const getFeaturedVideos = async (limit = 20) => {
   try {
-    const response = await axiosInstance.get(`/videos/featured?limit=${limit}`);
+    const response = await axiosInstance.get(`/videos/featured?limit=${limit}&view=card`);
     return response.data;
   } catch (error) {
     console.error('Error fetching featured videos:', error);
@@ -45,7 +45,7 @@ export const getFeaturedVideos = async (limit = 20) => {
 // Get hot videos (high engagement)
 export const getHotVideos = async (limit = 20) => {
   try {
-    const response = await axiosInstance.get(`/videos/hot?limit=${limit}`);
+    const response = await axiosInstance.get(`/videos/hot?limit=${limit}&view=card`);
     return response.data;
   } catch (error) {
     console.error('Error fetching hot videos:', error);
@@ -56,7 +56,7 @@ export const getHotVideos = async (limit = 20) => {
 // Get videos from following users
 export const getFollowingVideos = async (limit = 20) => {
   try {
-    const response = await axiosInstance.get(`/videos/following?limit=${limit}`);
+    const response = await axiosInstance.get(`/videos/following?limit=${limit}&view=card`);
     return response.data;
   } catch (error) {
     console.error('Error fetching following videos:', error);
@@ -67,7 +67,7 @@ export const getFollowingVideos = async (limit = 20) => {
 // Get recommended videos
 export const getRecommendedVideos = async (limit = 20) => {
   try {
-    const response = await axiosInstance.get(`/videos/recommended?limit=${limit}`);
+    const response = await axiosInstance.get(`/videos/recommended?limit=${limit}&view=card`);
     return response.data;
   } catch (error) {
     console.error('Error fetching recommended videos:', error);
@@ -86,6 +86,18 @@ export const getVideoById = async (videoId) => {
   }
 };
 
+// Start a stream session (access is checked once; the player uses stream_url)
+export const createStreamSession = async (videoId) => {
+  try {
+    const response = await axiosInstance.post(`/videos/${videoId}/stream-session`);
+    const baseURL = (axiosInstance.defaults.baseURL || '').replace(/\/$/, '');
+    return { ...response.data, stream_url: `${baseURL}${response.data.stream_url}` };
+  } catch (error) {
+    console.error('Error starting stream session:', error);
+    throw error;
+  }
+};
+
 // Get user videos
 export const getUserVideos = async (userId, skip = 0, limit = 20) => {
   try {
@@ -3,7 +3,7 @@ import { Link, useParams, useNavigate } from "react-router-dom";
 import { ThumbsUp, ThumbsDown, Bookmark, BookmarkCheck, Share2, ChevronDown, ChevronUp, Play, Send, User } from "lucide-react";
 import { useAuthorizer } from "../../../Auth/Authorizer";
 import NavigationBar from "../../../components/NavigationBar";
-import { getVideoById, incrementVideoView, getTrendingVideos } from "../../../api/publicAPI/videoApi";
+import { getVideoById, incrementVideoView, getTrendingVideos, createStreamSession } from "../../../api/publicAPI/videoApi";
 import { likeVideo, removeLike, getLikeStatus } from "../../../api/publicAPI/likeApi";
 import { createComment, getVideoComments, updateComment, deleteComment } from "../../../api/publicAPI/commentApi";
 import { saveVideo, unsaveVideo, getSaveStatus } from "../../../api/publicAPI/savedVideoApi";
@@ -15,6 +15,7 @@ const VideoPreviewPage = () => {
   const { isAuthenticated, user } = useAuthorizer();
   const [descriptionOpen, setDescriptionOpen] = useState(false);
   const [video, setVideo] = useState(null);
+  const [streamUrl, setStreamUrl] = useState(null);
   const [relatedVideos, setRelatedVideos] = useState([]);
   const [loading, setLoading] = useState(true);
   
@@ -74,6 +75,14 @@ const VideoPreviewPage = () => {
   };
 
   const cancelDeleteComment = () => setDeletingComment(null);
+  useEffect(() => {
+    // Signed stream URL of the video (premium and unpublished videos need one)
+    setStreamUrl(null);
+    createStreamSession(id)
+      .then(session => setStreamUrl(session.stream_url))
+      .catch(() => setStreamUrl(null));
+  }, [id, isAuthenticated]);
+
   useEffect(() => {
     const fetchVideo = async () => {
       try {
@@ -360,14 +369,15 @@ const VideoPreviewPage = () => {
 
           {/* Video Player */}
           <div className="aspect-video bg-black">
-            {video.video_url ? (
+            {streamUrl || video.video_url ? (
               <video
+                key={streamUrl || video.video_url}
                 className="w-full h-full"
                 controls
                 autoPlay
                 poster={video.thumbnail_url}
               >
-                <source src={video.video_url} type="video/mp4" />
+                <source src={streamUrl || video.video_url} type="video/mp4" />
                 Your browser does not support the video tag.
               </video>
             ) : (